@@ -0,0 +1,137 @@
+"""
+Provider batch-API path of MinimalChainable against the batch stand-in.
+
+Starts `benchmarks.standins.batch_server` in-process and, for OpenAI and Anthropic, runs the
+get_midjourney_prompts chain for `--stories` story contents through `run_batch`, then once more
+through `Nodes.batch_midjourney_prompts`. The stand-in fails each request with `--error-rate`.
+
+Checks that every Response is either a validated `MidjourneyPrompts` or an error Response
+(`error` set, "Error: ..." text), that errors match the failures the stand-in injected, and that
+the node returns None exactly for the failed stories. Exits non-zero on a failed check.
+
+Usage: python -m benchmarks.bench_batch_api [--stories 20] [--error-rate 0.2] [--latency uniform:0.5:2]
+           [--output benchmarks/results/batch_api.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.standins import batch_server
+from benchmarks.standins.common import standin_settings
+
+MODELS = {"openai": "gpt-4o", "anthropic": "claude-3-5-sonnet"}
+
+
+def check_responses(responses, return_model) -> Dict[str, Any]:
+    """Count validated and error Responses; raises AssertionError on anything else."""
+    valid = errors = 0
+    for chain in responses:
+        assert len(chain) == 1, f"expected one Response per context, got {len(chain)}"
+        response = chain[0]
+        if response.error is None:
+            assert isinstance(response.response, return_model), f"unvalidated response: {type(response.response).__name__}"
+            assert response.metadata and response.metadata.get("batch_id"), "response without a batch id"
+            valid += 1
+        else:
+            assert isinstance(response.response, str) and response.response.startswith("Error:"), response.response
+            errors += 1
+    return {"valid": valid, "errors": errors}
+
+
+async def run_provider(services, server, client: str, stories: List[str]) -> Dict[str, Any]:
+    from src.langg.models import MidjourneyPrompts
+
+    nodes = services.nodes
+    injected = server.errors_injected
+    started = time.perf_counter()
+    responses = await nodes.minimal_chainable.run_batch(
+        client=client,
+        model=MODELS[client],
+        prompts=nodes.chain_prompt_manager.get_prompt_chain("get_midjourney_prompts"),
+        contexts=[{"story": story} for story in stories],
+        returns_model={0: MidjourneyPrompts},
+    )
+    seconds = time.perf_counter() - started
+    counts = check_responses(responses, MidjourneyPrompts)
+    assert counts["errors"] == server.errors_injected - injected, (
+        f"{counts['errors']} error Responses for {server.errors_injected - injected} injected failures"
+    )
+
+    injected = server.errors_injected
+    prompts = await nodes.batch_midjourney_prompts(stories, client=client, model=MODELS[client])
+    failed = sum(result is None for result in prompts)
+    assert len(prompts) == len(stories), f"{len(prompts)} results for {len(stories)} stories"
+    assert failed == server.errors_injected - injected, f"{failed} None results for {server.errors_injected - injected} injected failures"
+    assert all(isinstance(prompt, dict) for result in prompts if result for prompt in result), "prompts are not dumped"
+
+    return {"run_batch": {**counts, "seconds": round(seconds, 3)}, "batch_midjourney_prompts": {"failed": failed}}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stories", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--latency", default="uniform:0.5:2")
+    parser.add_argument("--poll-seconds", type=float, default=0.2)
+    parser.add_argument("--output", default="benchmarks/results/batch_api.json")
+    args = parser.parse_args()
+
+    server = batch_server.make_server(latency=args.latency, error_rate=args.error_rate).start()
+    scratch = tempfile.mkdtemp(prefix="bench-batch-api-")
+    settings = standin_settings(
+        OPENAI_BASE_URL=f"{server.url}/v1",
+        ANTHROPIC_BASE_URL=server.url,
+        LLM_BATCH_POLL_SECONDS=args.poll_seconds,
+        LLM_BATCH_MAX_WAIT_SECONDS=600,
+        WARM_UP_ON_STARTUP=False,
+        WORKSPACE_ROOT=os.path.join(scratch, "temp"),
+        TTS_CACHE_DIR=os.path.join(scratch, "tts"),
+        TRANSCRIPTION_CACHE_DIR=os.path.join(scratch, "transcriptions"),
+        MJ_CACHE_DIR=os.path.join(scratch, "mj"),
+    )
+    stories = [f"Story {n}: a lighthouse keeper finds a letter from the sea." for n in range(args.stories)]
+
+    from src.core.services import Services
+
+    results, failures = {}, []
+    services = Services(settings)
+    try:
+        for client in MODELS:
+            try:
+                results[client] = asyncio.run(run_provider(services, server, client, stories))
+                print(f"{client:<10} {json.dumps(results[client])}")
+            except AssertionError as e:
+                failures.append(f"{client}: {e}")
+                print(f"{client:<10} FAILED: {e}")
+    finally:
+        services.shutdown()
+        server.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "requests_served": server.requests_served,
+        "errors_injected": server.errors_injected,
+        "results": results,
+        "failures": failures,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
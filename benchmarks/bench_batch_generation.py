@@ -0,0 +1,82 @@
+"""
+Stories/hour of N sequential `/content/generate` calls vs one `/content/generate/batch` call.
+
+Runs against an already running API (e.g. `uvicorn main:app` with the stand-in services
+configured), so every external call is paid exactly as in production.
+
+Usage: python -m benchmarks.bench_batch_generation --directory /tmp/content [--count 4] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import json
+import time
+
+import requests
+
+
+def sequential(args) -> tuple:
+    stories_done = list(args.stories_done)
+    succeeded = 0
+    started = time.perf_counter()
+    for _ in range(args.count):
+        res = requests.post(
+            f"{args.url}/content/generate",
+            json={"stories_done": stories_done, "directory": args.directory},
+            timeout=args.timeout,
+        )
+        if res.status_code == 200:
+            succeeded += 1
+            stories_done.append(res.json()["data"]["story_title"])
+        else:
+            print(f"  sequential call failed: {res.status_code} {res.text[:200]}")
+    return succeeded, time.perf_counter() - started
+
+
+def batch(args) -> tuple:
+    succeeded = 0
+    started = time.perf_counter()
+    with requests.post(
+        f"{args.url}/content/generate/batch",
+        json={"count": args.count, "stories_done": list(args.stories_done), "directory": args.directory},
+        timeout=args.timeout,
+        stream=True,
+    ) as res:
+        res.raise_for_status()
+        for line in res.iter_lines():
+            if not line:
+                continue
+            result = json.loads(line)
+            elapsed = time.perf_counter() - started
+            print(f"  [{elapsed:8.1f}s] story {result['index']}: {result['status']}")
+            succeeded += result["status"] == "success"
+    return succeeded, time.perf_counter() - started
+
+
+def report(name: str, succeeded: int, elapsed: float) -> None:
+    per_hour = succeeded / elapsed * 3600 if elapsed > 0 else 0.0
+    print(f"{name:<12} {succeeded} stories in {elapsed:8.1f}s  -> {per_hour:7.1f} stories/hour")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--directory", required=True)
+    parser.add_argument("--count", type=int, default=4)
+    parser.add_argument("--stories-done", nargs="*", default=[])
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    if not args.skip_sequential:
+        print("sequential /content/generate:")
+        results.append(("sequential", *sequential(args)))
+    print("batch /content/generate/batch:")
+    results.append(("batch", *batch(args)))
+
+    print()
+    for name, succeeded, elapsed in results:
+        report(name, succeeded, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Single-stream vs chunked TTS against the local stand-in server.
+
+Checks that the chunked file is a clean frame sequence whose chunk offsets add up,
+including when the stand-in injects failures that force chunk retries.
+
+Usage: python -m benchmarks.bench_chunked_tts [--chars 3000] [--latency lognormal:0.4:0.3] [--error-rate 0.2]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.standins.common import standin_settings
+from benchmarks.standins.tts_server import make_server
+from src.services.elevenlabs_service import ElevenLabsService
+from src.utils.mp3 import split_frames
+
+SENTENCE = "Los dioses del norte gobernaron el mundo durante siglos. "
+
+
+async def run(args) -> None:
+    server = make_server(latency=args.latency, error_rate=args.error_rate).start()
+    settings = standin_settings(
+        ELEVENLABS_BASE_URL=server.url,
+        ELEVENLABS_CHUNK_MAX_CHARS=args.max_chars,
+        ELEVENLABS_CHUNK_CONCURRENCY=args.concurrency,
+        ELEVENLABS_CHUNK_RETRIES=5,
+    )
+    service = ElevenLabsService(settings)
+    text = (SENTENCE * (args.chars // len(SENTENCE) + 1))[:args.chars]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        single_path = os.path.join(workdir, "single.mp3")
+        chunked_path = os.path.join(workdir, "chunked.mp3")
+
+        server.error_rate = 0.0
+        started = time.perf_counter()
+        assert await service.get_speech_on_file(single_path, text, "female") == single_path
+        single_time = time.perf_counter() - started
+
+        server.error_rate = args.error_rate
+        served_before = server.requests_served
+        started = time.perf_counter()
+        timings = await service.get_speech_on_file_chunked(chunked_path, text, "female")
+        chunked_time = time.perf_counter() - started
+        assert timings is not None, "chunked synthesis failed"
+
+        with open(chunked_path, "rb") as f:
+            data = f.read()
+        frames, duration = split_frames(data)
+        assert sum(length for _, length in frames) == len(data), "chunked file is not a clean frame sequence"
+        assert abs(timings[-1]["end"] - duration) < 1e-6, "chunk offsets do not add up to the file duration"
+        assert all(a["end"] == b["start"] for a, b in zip(timings, timings[1:]))
+
+    print(f"text chars:        {len(text)}")
+    print(f"chunks:            {len(timings)} (requests {server.requests_served - served_before}, injected errors {server.errors_injected})")
+    print(f"audio duration:    {duration:.1f} s")
+    print(f"single stream:     {single_time:.2f} s")
+    print(f"chunked x{args.concurrency}:       {chunked_time:.2f} s")
+    server.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=3000)
+    parser.add_argument("--max-chars", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", default="lognormal:0.4:0.3")
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Run latency with stalling providers, with and without run deadlines.
+
+Starts the chat, TTS and Midjourney stand-ins in-process with "spike" latencies (a share of
+requests stall for minutes, like a hung DeepSeek reasoner call or Midjourney job) and, for
+each mode, runs `--runs` stories `--concurrency` at a time:
+
+- unbounded: no run deadline and no node budgets, i.e. the behaviour before deadlines.
+- deadline: RUN_DEADLINE_SECONDS of `--deadline` with node budgets capped at `--node-ceiling`.
+
+Reports per-run wall time, how many runs produced their content, and deadline misses by node.
+
+Usage: python -m benchmarks.bench_deadlines [--runs 8] [--concurrency 4] [--deadline 60] [--node-ceiling 30]
+           [--llm-latency spike:0.5:0.05:300] [--mj-latency spike:2:0.15:300] [--output benchmarks/results/deadlines.json]
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.bench_pipeline import percentile
+from benchmarks.standins import chat_server, mj_server, tts_server
+from benchmarks.standins.common import standin_settings
+
+
+async def timed_run(services, directory: str, deadline_seconds, slots: asyncio.Semaphore, runs: List[Dict[str, Any]]) -> None:
+    async with slots:
+        run_id = uuid.uuid4().hex
+        started = time.time()
+        try:
+            output = await services.workflow().app.ainvoke(input={
+                "stories_done": [f"bench {run_id}"],
+                "main_path": directory,
+                "run_id": run_id,
+                "workspace": services.workspaces.path_for(run_id),
+                "deadline": None if deadline_seconds is None else started + deadline_seconds,
+            })
+            produced, error = "story_content" in output and not output.get("end"), None
+        except Exception as e:
+            output, produced, error = {}, False, str(e)
+        runs.append({
+            "seconds": time.time() - started,
+            "produced": produced,
+            "error": error,
+            "deadline_misses": output.get("deadline_misses") or [],
+        })
+
+
+async def run_mode(args, settings, directory: str, deadline_seconds) -> Dict[str, Any]:
+    from src.core.services import Services
+
+    services = Services(settings)
+    slots = asyncio.Semaphore(args.concurrency)
+    runs: List[Dict[str, Any]] = []
+    try:
+        await asyncio.gather(*(timed_run(services, directory, deadline_seconds, slots, runs) for _ in range(args.runs)))
+    finally:
+        services.shutdown()
+
+    misses: Dict[str, int] = {}
+    for run in runs:
+        for miss in run["deadline_misses"]:
+            key = f"{miss['node']}:{miss['action']}"
+            misses[key] = misses.get(key, 0) + 1
+    seconds = [run["seconds"] for run in runs]
+    return {
+        "runs": len(runs),
+        "produced": sum(run["produced"] for run in runs),
+        "errors": sorted({run["error"] for run in runs if run["error"]})[:5],
+        "seconds": {
+            "p50": round(percentile(seconds, 50), 3),
+            "p95": round(percentile(seconds, 95), 3),
+            "max": round(max(seconds, default=0.0), 3),
+        },
+        "deadline_misses": dict(sorted(misses.items())),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--deadline", type=float, default=60)
+    parser.add_argument("--node-ceiling", type=float, default=30)
+    parser.add_argument("--llm-latency", default="spike:0.5:0.05:300")
+    parser.add_argument("--tts-latency", default="lognormal:0.3:0.4")
+    parser.add_argument("--mj-latency", default="spike:2:0.15:300")
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--ffmpeg", default="ffmpeg")
+    parser.add_argument("--output", default="benchmarks/results/deadlines.json")
+    args = parser.parse_args()
+
+    chat = chat_server.make_server(latency=args.llm_latency).start()
+    tts = tts_server.make_server(latency=args.tts_latency).start()
+    mj = mj_server.make_server(latency=args.mj_latency).start()
+
+    scratch = tempfile.mkdtemp(prefix="bench-deadlines-")
+    directory = os.path.join(scratch, "content")
+    os.makedirs(directory)
+    common = dict(
+        OPENAI_BASE_URL=f"{chat.url}/v1",
+        DEEPSEEK_BASE_URL=chat.url,
+        ELEVENLABS_BASE_URL=tts.url,
+        MJ_INTERACTIVE_API=mj.url,
+        WHISPER_MODEL_SIZE=args.whisper_model,
+        WHISPER_COMPUTE_TYPE="int8",
+        FFMPEG_BINARY=args.ffmpeg,
+        WARM_UP_ON_STARTUP=False,
+        TTS_CACHE_MAX_BYTES=0,
+        TRANSCRIPTION_CACHE_MAX_BYTES=0,
+        MJ_CACHE_MAX_BYTES=0,
+    )
+
+    modes = {
+        "unbounded": (None, dict(NODE_BUDGET_CEILING_SECONDS={"default": 24 * 3600})),
+        "deadline": (args.deadline, dict(NODE_BUDGET_CEILING_SECONDS={"default": args.node_ceiling})),
+    }
+
+    results = {}
+    try:
+        for name, (deadline_seconds, overrides) in modes.items():
+            settings = standin_settings(
+                **common,
+                **overrides,
+                WORKSPACE_ROOT=os.path.join(scratch, name, "temp"),
+                TTS_CACHE_DIR=os.path.join(scratch, name, "tts"),
+                TRANSCRIPTION_CACHE_DIR=os.path.join(scratch, name, "transcriptions"),
+                MJ_CACHE_DIR=os.path.join(scratch, name, "mj"),
+            )
+            results[name] = asyncio.run(run_mode(args, settings, directory, deadline_seconds))
+            print(
+                f"{name:<10} produced={results[name]['produced']}/{results[name]['runs']}  "
+                f"seconds={json.dumps(results[name]['seconds'])}  misses={json.dumps(results[name]['deadline_misses'])}"
+            )
+    finally:
+        for server in (chat, tts, mj):
+            server.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
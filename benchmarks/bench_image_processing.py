@@ -0,0 +1,63 @@
+"""
+Throughput of the image post-processing stage on a folder of images.
+
+Without --folder, synthetic 1024x1792 images (Midjourney --ar 9:16 size) are generated.
+
+Usage: python -m benchmarks.bench_image_processing [--folder path] [--count 16] [--workers 1 2 4]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from PIL import Image
+
+from benchmarks.standins.common import standin_settings
+from src.services.image_processor import ImageProcessor
+
+
+def synthetic_images(folder: str, count: int) -> None:
+    rng = random.Random(3)
+    for i in range(count):
+        image = Image.effect_noise((1024, 1792), 64).convert("RGB")
+        image.paste((rng.randrange(256), rng.randrange(256), rng.randrange(256)), (0, 0, 512, 896))
+        image.save(os.path.join(folder, f"image_{i:02}.png"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folder")
+    parser.add_argument("--count", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        folder = args.folder
+        if folder is None:
+            folder = os.path.join(workdir, "source")
+            os.makedirs(folder)
+            synthetic_images(folder, args.count)
+
+        for workers in args.workers:
+            processor = ImageProcessor(standin_settings(IMAGE_WORKERS=workers))
+            images = processor.list_images(folder)
+            output_dir = os.path.join(workdir, f"derived_{workers}")
+
+            processor.process_images(images[:1], output_dir)  # start the worker processes
+            started = time.perf_counter()
+            records = processor.process_images(images, output_dir)
+            elapsed = time.perf_counter() - started
+            processor.shutdown()
+
+            assert records is not None, "processing failed"
+            print(f"workers={workers}: {len(images)} images -> {len(records)} files in {elapsed:.2f} s "
+                  f"({len(images) / elapsed:.1f} images/s)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Import-time budget for the API entry point.
+
+Imports `main` in fresh interpreters with `-X importtime`, reports the slowest modules
+and exits non-zero when the best cumulative time is over budget or when a heavy SDK
+that should load lazily is imported eagerly.
+
+Usage: python -m benchmarks.bench_import_time [--module main] [--budget-ms 1000] [--repeat 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+# Loaded on first use or by the startup warm-up, never by importing the app.
+LAZY_MODULES = ["faster_whisper", "ctranslate2", "elevenlabs", "anthropic", "openai", "instructor", "langgraph"]
+
+
+def import_times(module: str) -> Tuple[Dict[str, int], int]:
+    """Cumulative import time in microseconds per module, and the total for `module`."""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        times[name] = int(cumulative)
+    return times, times[module]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    times, total = min(runs, key=lambda run: run[1])
+
+    top_level = {name: us for name, us in times.items() if "." not in name and name != args.module}
+    print(f"import {args.module}: {total / 1000:.1f} ms (best of {args.repeat}, budget {args.budget_ms:.0f} ms)")
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<28} {us / 1000:8.1f} ms")
+
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in times]
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+    if total / 1000 > args.budget_ms:
+        failures.append(f"{total / 1000:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+End-to-end pipeline benchmark against the offline stand-ins.
+
+Starts the chat (OpenAI/DeepSeek), TTS and Midjourney stand-ins in-process, points the
+services at them and runs whole stories through `WorkFlow` directly and through
+`POST /content/generate` (in-process ASGI) at each concurrency level. Writes a JSON
+report with p50/p95/p99 latency, runs/hour, failures and peak RSS, to diff between releases.
+
+Whisper still runs for real: pass `--whisper-model tiny` (or a local model directory)
+to keep it cheap. Without the model files `get_subtitles` fails and, being optional,
+is skipped, so the numbers then exclude transcription.
+
+Usage: python -m benchmarks.bench_pipeline [--modes workflow api] [--concurrency 1 2 4] [--runs 4]
+           [--llm-latency lognormal:2:0.5] [--tts-latency lognormal:0.3:0.4] [--mj-latency uniform:30:90]
+           [--error-rate 0.0] [--output benchmarks/results/pipeline.json]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import statistics
+from typing import Any, Dict, List
+
+from benchmarks.standins import chat_server, mj_server, tts_server
+from benchmarks.standins.common import standin_settings
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_workflow(services, directory: str, index: int) -> None:
+    run_id = uuid.uuid4().hex
+    await services.workflow().app.ainvoke(input={
+        "stories_done": [f"bench {index}"],
+        "main_path": directory,
+        "run_id": run_id,
+        "workspace": f"temp/{run_id}",
+    })
+
+
+async def run_api(client, directory: str, index: int) -> None:
+    # Distinct bodies, so single-flight never coalesces benchmark runs.
+    res = await client.post("/content/generate", json={"stories_done": [f"bench {uuid.uuid4().hex}"], "directory": directory})
+    if res.status_code != 200:
+        raise RuntimeError(f"{res.status_code} {res.text[:200]}")
+
+
+async def run_level(run_one, concurrency: int, runs: int) -> Dict[str, Any]:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def timed(index: int) -> None:
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await run_one(index)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}"[:200])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(index) for index in range(runs)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "succeeded": len(latencies),
+        "failed": len(errors),
+        "errors": sorted(set(errors))[:5],
+        "wall_seconds": round(elapsed, 3),
+        "runs_per_hour": round(len(latencies) / elapsed * 3600, 1) if elapsed > 0 else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies, default=0.0), 3),
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+async def bench(args, services, directory: str) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+
+    if "workflow" in args.modes:
+        results["workflow"] = []
+        for concurrency in args.concurrency:
+            level = await run_level(lambda i: run_workflow(services, directory, i), concurrency, args.runs)
+            print(f"workflow  c={concurrency:<3} {json.dumps(level['latency_seconds'])}  {level['runs_per_hour']} runs/h  failed={level['failed']}")
+            results["workflow"].append(level)
+
+    if "api" in args.modes:
+        import httpx
+        from main import app
+
+        results["api"] = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for concurrency in args.concurrency:
+                level = await run_level(lambda i: run_api(client, directory, i), concurrency, args.runs)
+                print(f"api       c={concurrency:<3} {json.dumps(level['latency_seconds'])}  {level['runs_per_hour']} runs/h  failed={level['failed']}")
+                results["api"].append(level)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", choices=["workflow", "api"], default=["workflow", "api"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--runs", type=int, default=4, help="Runs per concurrency level.")
+    parser.add_argument("--llm-latency", default="lognormal:2:0.5")
+    parser.add_argument("--tts-latency", default="lognormal:0.3:0.4")
+    parser.add_argument("--mj-latency", default="uniform:30:90")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--story-words", type=int, default=190)
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--ffmpeg", default="ffmpeg")
+    parser.add_argument("--output", default="benchmarks/results/pipeline.json")
+    args = parser.parse_args()
+
+    chat = chat_server.make_server(latency=args.llm_latency, error_rate=args.error_rate, story_words=args.story_words).start()
+    tts = tts_server.make_server(latency=args.tts_latency, error_rate=args.error_rate).start()
+    mj = mj_server.make_server(latency=args.mj_latency, error_rate=args.error_rate).start()
+
+    scratch = tempfile.mkdtemp(prefix="bench-pipeline-")
+    settings = standin_settings(
+        OPENAI_BASE_URL=f"{chat.url}/v1",
+        DEEPSEEK_BASE_URL=chat.url,
+        ELEVENLABS_BASE_URL=tts.url,
+        MJ_INTERACTIVE_API=mj.url,
+        WHISPER_MODEL_SIZE=args.whisper_model,
+        WHISPER_COMPUTE_TYPE="int8",
+        FFMPEG_BINARY=args.ffmpeg,
+        TTS_CACHE_DIR=os.path.join(scratch, "cache", "tts"),
+        TRANSCRIPTION_CACHE_DIR=os.path.join(scratch, "cache", "transcriptions"),
+        MJ_CACHE_DIR=os.path.join(scratch, "cache", "mj"),
+        WARM_UP_ON_STARTUP=False,
+    )
+
+    from src.core import services as services_module
+
+    # The API resolves its services through get_services(); install the stand-in ones.
+    services = services_module.Services(settings)
+    services_module._services = services
+    services.warm_up()
+
+    directory = os.path.join(scratch, "content")
+    os.makedirs(directory)
+    try:
+        results = asyncio.run(bench(args, services, directory))
+    finally:
+        services.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            **{key: value for key, value in vars(args).items() if key != "output"},
+            "warm_up_seconds": services.warm_up_seconds,
+            "warm_up_error": services.warm_up_error,
+        },
+        "standins": {
+            name: {"requests": server.requests_served, "errors_injected": server.errors_injected}
+            for name, server in (("chat", chat), ("tts", tts), ("mj", mj))
+        },
+        "llm_prompt_tokens": {"total": chat.prompt_tokens, "cached": chat.cached_tokens},
+        "results": results,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
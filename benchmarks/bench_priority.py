@@ -0,0 +1,186 @@
+"""
+Interactive latency under a background burst, with and without priority lanes.
+
+Starts the chat, TTS and Midjourney stand-ins in-process and, for each mode, runs
+`--background` background stories at once, then `--interactive` interactive ones
+`--interactive-delay` seconds later, all sharing PROVIDER_CONCURRENCY:
+
+- fifo: equal weights and no SLOs, i.e. calls are served in arrival order.
+- weighted: the configured PRIORITY_WEIGHTS / PRIORITY_SLO_SECONDS / PRIORITY_OVERLOAD.
+
+LLM providers get `--llm-concurrency` slots against slow stand-ins, so the provider queues,
+not the stages after them, decide run latency; the priority lanes only act there.
+
+Reports p50/max latency per class, the provider-queue wait per run of each class (from
+SCHEDULER_WAIT), mean waits per provider and class, and admission decisions per provider.
+
+Usage: python -m benchmarks.bench_priority [--background 12] [--interactive 3] [--interactive-delay 2]
+           [--llm-concurrency 2] [--llm-latency lognormal:2:0.3] [--mj-latency uniform:2:4]
+           [--output benchmarks/results/priority.json]
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.bench_pipeline import percentile
+from benchmarks.standins import chat_server, mj_server, tts_server
+from benchmarks.standins.common import standin_settings
+from src.utils.scheduler import BACKGROUND, INTERACTIVE, run_priority
+
+
+async def timed_run(services, directory: str, priority: str, delay: float, latencies: Dict[str, List[float]]) -> None:
+    await asyncio.sleep(delay)
+    run_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    with run_priority(priority):
+        output = await services.workflow().app.ainvoke(input={
+            "stories_done": [f"bench {run_id}"],
+            "main_path": directory,
+            "run_id": run_id,
+            "workspace": f"temp/{run_id}",
+            "priority": priority,
+        })
+    if not output.get("end"):
+        latencies[priority].append(time.perf_counter() - started)
+
+
+async def run_mode(args, settings, directory: str) -> Dict[str, Any]:
+    from src.core.services import Services
+
+    services = Services(settings)
+    latencies: Dict[str, List[float]] = {BACKGROUND: [], INTERACTIVE: []}
+    try:
+        await asyncio.gather(
+            *(timed_run(services, directory, BACKGROUND, 0, latencies) for _ in range(args.background)),
+            *(timed_run(services, directory, INTERACTIVE, args.interactive_delay, latencies) for _ in range(args.interactive)),
+            return_exceptions=True,
+        )
+    finally:
+        services.shutdown()
+
+    from src.utils.metrics import SCHEDULER_DECISIONS, SCHEDULER_WAIT
+
+    decisions: Dict[str, int] = {}
+    for metric in SCHEDULER_DECISIONS.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total") and sample.value:
+                key = f"{sample.labels['provider']}:{sample.labels['priority']}:{sample.labels['decision']}"
+                decisions[key] = int(sample.value)
+    waits: Dict[str, Dict[str, float]] = {}
+    class_waits: Dict[str, float] = {BACKGROUND: 0.0, INTERACTIVE: 0.0}
+    for metric in SCHEDULER_WAIT.collect():
+        for sample in metric.samples:
+            if sample.name.endswith(("_sum", "_count")):
+                key = f"{sample.labels['provider']}:{sample.labels['priority']}"
+                waits.setdefault(key, {})[sample.name.rsplit("_", 1)[1]] = sample.value
+                if sample.name.endswith("_sum"):
+                    class_waits[sample.labels["priority"]] += sample.value
+    SCHEDULER_DECISIONS.clear()
+    SCHEDULER_WAIT.clear()
+
+    runs = {BACKGROUND: args.background, INTERACTIVE: args.interactive}
+    return {
+        priority: {
+            "runs": len(values),
+            "p50": round(percentile(values, 50), 3),
+            "max": round(max(values, default=0.0), 3),
+            "queue_wait_per_run_seconds": round(class_waits[priority] / runs[priority], 3) if runs[priority] else 0.0,
+        }
+        for priority, values in latencies.items()
+    } | {
+        "decisions": decisions,
+        "mean_queue_wait_seconds": {
+            key: round(wait["sum"] / wait["count"], 3) for key, wait in sorted(waits.items()) if wait.get("count")
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--background", type=int, default=12)
+    parser.add_argument("--interactive", type=int, default=3)
+    parser.add_argument("--interactive-delay", type=float, default=2.0)
+    parser.add_argument("--llm-concurrency", type=int, default=2)
+    parser.add_argument("--llm-latency", default="lognormal:2:0.3")
+    parser.add_argument("--tts-latency", default="lognormal:0.3:0.4")
+    parser.add_argument("--mj-latency", default="uniform:2:4")
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--ffmpeg", default="ffmpeg")
+    parser.add_argument("--output", default="benchmarks/results/priority.json")
+    args = parser.parse_args()
+
+    chat = chat_server.make_server(latency=args.llm_latency).start()
+    tts = tts_server.make_server(latency=args.tts_latency).start()
+    mj = mj_server.make_server(latency=args.mj_latency).start()
+
+    scratch = tempfile.mkdtemp(prefix="bench-priority-")
+    directory = os.path.join(scratch, "content")
+    os.makedirs(directory)
+    common = dict(
+        OPENAI_BASE_URL=f"{chat.url}/v1",
+        DEEPSEEK_BASE_URL=chat.url,
+        ELEVENLABS_BASE_URL=tts.url,
+        MJ_INTERACTIVE_API=mj.url,
+        WHISPER_MODEL_SIZE=args.whisper_model,
+        WHISPER_COMPUTE_TYPE="int8",
+        FFMPEG_BINARY=args.ffmpeg,
+        WARM_UP_ON_STARTUP=False,
+        # Stage limits would serialize runs before they reach the provider queues.
+        STAGE_CONCURRENCY={},
+        PROVIDER_CONCURRENCY={
+            **standin_settings().PROVIDER_CONCURRENCY,
+            **{provider: args.llm_concurrency for provider in ("deepseek", "openai", "anthropic")},
+        },
+        TTS_CACHE_MAX_BYTES=0,
+        TRANSCRIPTION_CACHE_MAX_BYTES=0,
+        MJ_CACHE_MAX_BYTES=0,
+    )
+
+    modes = {
+        "fifo": standin_settings(
+            **common,
+            TTS_CACHE_DIR=os.path.join(scratch, "fifo", "tts"),
+            TRANSCRIPTION_CACHE_DIR=os.path.join(scratch, "fifo", "transcriptions"),
+            MJ_CACHE_DIR=os.path.join(scratch, "fifo", "mj"),
+            PRIORITY_WEIGHTS={INTERACTIVE: 1, BACKGROUND: 1},
+            PRIORITY_SLO_SECONDS={},
+        ),
+        "weighted": standin_settings(
+            **common,
+            TTS_CACHE_DIR=os.path.join(scratch, "weighted", "tts"),
+            TRANSCRIPTION_CACHE_DIR=os.path.join(scratch, "weighted", "transcriptions"),
+            MJ_CACHE_DIR=os.path.join(scratch, "weighted", "mj"),
+        ),
+    }
+
+    results = {}
+    try:
+        for name, settings in modes.items():
+            results[name] = asyncio.run(run_mode(args, settings, directory))
+            print(f"{name:<9} interactive {json.dumps(results[name][INTERACTIVE])}  background {json.dumps(results[name][BACKGROUND])}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "provider_concurrency": modes["weighted"].PROVIDER_CONCURRENCY,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
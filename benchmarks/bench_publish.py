@@ -0,0 +1,68 @@
+"""
+Publish a story folder across filesystems: legacy `move_all_files` vs `publish_folder`.
+
+The source defaults to tmpfs (/dev/shm) and the destination to a disk-backed
+directory, so every file crosses devices.
+
+Usage: python -m benchmarks.bench_publish [--files 12] [--size-mb 8] [--src-root /dev/shm] [--dest-root /var/tmp]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from src.services.localfile_service import LocalFileService
+
+
+def populate(folder: str, files: int, size: int) -> None:
+    os.makedirs(folder, exist_ok=True)
+    block = os.urandom(1024 * 1024)
+    for i in range(files):
+        with open(os.path.join(folder, f"artifact_{i:03}.bin"), "wb") as f:
+            for _ in range(size // len(block)):
+                f.write(block)
+
+
+def timed(label: str, fn) -> float:
+    started = time.perf_counter()
+    assert fn(), f"{label} failed"
+    elapsed = time.perf_counter() - started
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--size-mb", type=int, default=8)
+    parser.add_argument("--src-root", default="/dev/shm")
+    parser.add_argument("--dest-root", default="/var/tmp")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    src_root = tempfile.mkdtemp(dir=args.src_root)
+    dest_root = tempfile.mkdtemp(dir=args.dest_root)
+    size = args.size_mb * 1024 * 1024
+    try:
+        cross_device = os.stat(src_root).st_dev != os.stat(dest_root).st_dev
+        print(f"{args.files} files x {args.size_mb} MiB, cross-device: {cross_device}")
+
+        populate(os.path.join(src_root, "a"), args.files, size)
+        legacy = timed("move_all_files", lambda: LocalFileService.move_all_files(
+            os.path.join(src_root, "a"), os.path.join(dest_root, "legacy")))
+
+        populate(os.path.join(src_root, "b"), args.files, size)
+        published = timed("publish_folder", lambda: LocalFileService.publish_folder(
+            os.path.join(src_root, "b"), os.path.join(dest_root, "published"), workers=args.workers))
+
+        assert sorted(os.listdir(os.path.join(dest_root, "published"))) == sorted(os.listdir(os.path.join(dest_root, "legacy")))
+        total_mb = args.files * args.size_mb
+        print(f"move_all_files  {legacy:7.3f} s  {total_mb / legacy:8.1f} MiB/s (no fsync, not atomic)")
+        print(f"publish_folder  {published:7.3f} s  {total_mb / published:8.1f} MiB/s (fsynced, atomic rename)")
+    finally:
+        shutil.rmtree(src_root, ignore_errors=True)
+        shutil.rmtree(dest_root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
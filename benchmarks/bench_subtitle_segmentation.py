@@ -0,0 +1,66 @@
+"""
+Compare the legacy `combine_word_segments` loop with the array-backed segmentation.
+
+Usage: python -m benchmarks.bench_subtitle_segmentation [--words 100000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from src.services.subtitle_generator import SubtitleGenerator
+from src.utils.subtitles import WordTimings, segment_word_timings
+
+VOCABULARY = [" la", " historia", " de", " los", " dioses", " que", " gobernaron", " el", " mundo.", " y,", " nadie", " sabe?"]
+
+
+def synthetic_words(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    words = []
+    t = 0.0
+    for _ in range(count):
+        start = t + (rng.random() * 0.9 if rng.random() < 0.05 else rng.random() * 0.05)
+        end = start + 0.1 + rng.random() * 0.3
+        words.append(SimpleNamespace(start=start, end=end, word=rng.choice(VOCABULARY)))
+        t = end
+    return words
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    words = synthetic_words(args.words)
+    timings = WordTimings.from_words(words)
+
+    # The legacy method does not touch `self`, so it is called unbound to avoid loading Whisper.
+    legacy = SubtitleGenerator.combine_word_segments(None, words)
+    vectorized = segment_word_timings(timings)
+    assert legacy == vectorized, "segmentation results differ"
+
+    legacy_time = best_of(args.repeat, lambda: SubtitleGenerator.combine_word_segments(None, words))
+    build_time = best_of(args.repeat, lambda: WordTimings.from_words(words))
+    vectorized_time = best_of(args.repeat, lambda: segment_word_timings(timings))
+    limited_time = best_of(args.repeat, lambda: segment_word_timings(timings, max_chars=42, max_duration=3.0))
+
+    print(f"words:                      {args.words}")
+    print(f"subtitle lines:             {len(vectorized)}")
+    print(f"legacy combine_word_segments {legacy_time * 1000:9.2f} ms")
+    print(f"WordTimings.from_words       {build_time * 1000:9.2f} ms")
+    print(f"segment_word_timings         {vectorized_time * 1000:9.2f} ms  ({legacy_time / vectorized_time:.1f}x)")
+    print(f"  + max_chars/max_duration   {limited_time * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
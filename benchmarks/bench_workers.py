@@ -0,0 +1,201 @@
+"""
+Scale-out benchmark: throughput of the run queue with 1, 2, 4... worker processes.
+
+Starts the chat, TTS and Midjourney stand-ins in-process, then for each level spawns that
+many `worker.py` processes on a fresh queue, enqueues `--runs-per-worker` runs per worker
+and waits for them all. Reports runs/hour, the speedup over one worker and the scaling
+efficiency (speedup / workers), plus per-run latency from enqueue to result. Caches are
+disabled so every run does the whole pipeline.
+
+With `--cpu-workers K`, the level's workers only serve the "default" pool and K more
+serve "cpu" (get_subtitles, see STAGE_POOLS), so every run is handed off twice.
+
+Usage: python -m benchmarks.bench_workers [--workers 1 2 4] [--runs-per-worker 4] [--cpu-workers 0]
+           [--llm-latency lognormal:0.5:0.3] [--tts-latency lognormal:0.3:0.4] [--mj-latency uniform:2:4]
+           [--output benchmarks/results/workers.json]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import signal
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Any, Dict, List
+
+from benchmarks.bench_pipeline import percentile
+from benchmarks.standins import chat_server, mj_server, tts_server
+from src.services.run_queue import RunQueue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker_env(overrides: Dict[str, Any]) -> Dict[str, str]:
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONUNBUFFERED="1")
+    for name, value in overrides.items():
+        env[name] = value if isinstance(value, str) else json.dumps(value)
+    return env
+
+
+def start_worker(env: Dict[str, str], pools: List[str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "worker.py"), "--pools", *pools, "--concurrency", "1"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def wait_ready(log_paths: List[str], timeout: float = 300) -> None:
+    """Workers log "serving pools" once warmed up."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all("serving pools" in open(path).read() for path in log_paths):
+            return
+        time.sleep(0.2)
+    raise TimeoutError("Workers did not start; see their logs in the scratch directory")
+
+
+def run_level(args, overrides: Dict[str, Any], scratch: str, workers: int) -> Dict[str, Any]:
+    level_dir = os.path.join(scratch, f"workers-{workers}")
+    os.makedirs(level_dir)
+    queue_path = os.path.join(level_dir, "runs.sqlite3")
+    env = worker_env({**overrides, "RUN_QUEUE_PATH": queue_path})
+
+    pools = [["default"] if args.cpu_workers else ["default", "cpu"]] * workers + [["cpu"]] * args.cpu_workers
+    logs = [os.path.join(level_dir, f"worker-{i}.log") for i in range(len(pools))]
+    processes = [start_worker(env, worker_pools, log) for worker_pools, log in zip(pools, logs)]
+    try:
+        wait_ready(logs)
+        queue = RunQueue(queue_path)
+        started = time.time()
+        run_ids = []
+        for index in range(workers * args.runs_per_worker):
+            run_id = uuid.uuid4().hex
+            run_ids.append(queue.enqueue({
+                "stories_done": [f"bench {run_id}"],
+                "main_path": os.path.join(scratch, "output"),
+                "run_id": run_id,
+                "workspace": f"temp/{run_id}",
+            }, run_id=run_id))
+
+        while any(status in ("queued", "running") for status in queue.counts()):
+            if any(process.poll() is not None for process in processes):
+                raise RuntimeError("A worker exited; see its log in the scratch directory")
+            time.sleep(0.2)
+        runs = [queue.get(run_id) for run_id in run_ids]
+        queue.close()
+    finally:
+        for process in processes:
+            process.send_signal(signal.SIGTERM)
+        for process in processes:
+            process.wait(timeout=60)
+
+    succeeded = [run for run in runs if run["status"] == "succeeded"]
+    finished = max(run["updated_at"] for run in runs)
+    latencies = [run["updated_at"] - run["created_at"] for run in succeeded]
+    elapsed = finished - started
+    return {
+        "workers": workers,
+        "cpu_workers": args.cpu_workers,
+        "runs": len(runs),
+        "succeeded": len(succeeded),
+        "failed": len(runs) - len(succeeded),
+        "errors": sorted({run["error"] for run in runs if run["status"] != "succeeded"})[:5],
+        "handoffs": sum(segment["outcome"].startswith("handed off") for run in runs for segment in run["history"]),
+        "wall_seconds": round(elapsed, 3),
+        "runs_per_hour": round(len(succeeded) / elapsed * 3600, 1) if elapsed > 0 else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "max": round(max(latencies, default=0.0), 3),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--runs-per-worker", type=int, default=4)
+    parser.add_argument("--cpu-workers", type=int, default=0)
+    parser.add_argument("--llm-latency", default="lognormal:0.5:0.3")
+    parser.add_argument("--tts-latency", default="lognormal:0.3:0.4")
+    parser.add_argument("--mj-latency", default="uniform:2:4")
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--ffmpeg", default="ffmpeg")
+    parser.add_argument("--output", default="benchmarks/results/workers.json")
+    args = parser.parse_args()
+
+    servers = [
+        chat_server.make_server(latency=args.llm_latency),
+        tts_server.make_server(latency=args.tts_latency),
+        mj_server.make_server(latency=args.mj_latency),
+    ]
+    for server in servers:
+        server.start()
+    chat, tts, mj = servers
+
+    scratch = tempfile.mkdtemp(prefix="bench-workers-")
+    os.makedirs(os.path.join(scratch, "output"))
+    overrides = {
+        "TELEGRAM_TOKEN": "stand-in",
+        "ADMINISTRATOR_IDS": [],
+        "PROJECT_FLAG": "stand-in",
+        "ELEVENLABS_API_KEY": "stand-in",
+        "OPENAI_API_KEY": "stand-in",
+        "ANTHROPIC_API_KEY": "stand-in",
+        "DEEPSEEK_API_KEY": "stand-in",
+        "OPENAI_BASE_URL": f"{chat.url}/v1",
+        "DEEPSEEK_BASE_URL": chat.url,
+        "ELEVENLABS_BASE_URL": tts.url,
+        "MJ_INTERACTIVE_API": mj.url,
+        "WHISPER_MODEL_SIZE": args.whisper_model,
+        "WHISPER_COMPUTE_TYPE": "int8",
+        "FFMPEG_BINARY": args.ffmpeg,
+        "RUN_QUEUE_POLL_SECONDS": 0.2,
+        "TTS_CACHE_DIR": os.path.join(scratch, "cache", "tts"),
+        "TTS_CACHE_MAX_BYTES": 0,
+        "TRANSCRIPTION_CACHE_DIR": os.path.join(scratch, "cache", "transcriptions"),
+        "TRANSCRIPTION_CACHE_MAX_BYTES": 0,
+        "MJ_CACHE_DIR": os.path.join(scratch, "cache", "mj"),
+        "MJ_CACHE_MAX_BYTES": 0,
+    }
+
+    levels = []
+    try:
+        for workers in args.workers:
+            level = run_level(args, overrides, scratch, workers)
+            baseline = levels[0] if levels else level
+            speedup = level["runs_per_hour"] / baseline["runs_per_hour"] if baseline["runs_per_hour"] else 0.0
+            level["speedup"] = round(speedup, 2)
+            level["efficiency"] = round(speedup / (workers / baseline["workers"]), 2)
+            levels.append(level)
+            print(
+                f"workers={workers:<3} {level['runs_per_hour']:>8} runs/h  speedup={level['speedup']:<5} "
+                f"efficiency={level['efficiency']:<5} p50={level['latency_seconds']['p50']}s  "
+                f"failed={level['failed']}  handoffs={level['handoffs']}"
+            )
+    finally:
+        for server in servers:
+            server.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "levels": levels,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Workspace manager cost and recovery: how long admission checks and janitor sweeps take
+with many workspaces on disk, and whether the workspaces of a crashed process are reclaimed.
+
+Creates `--workspaces` workspaces of `--files` files each in a scratch root. Half are leased
+by a "crashed" manager that never renews its leases, the rest by a live one that keeps
+renewing them. The janitor then sweeps until the crashed leases expire.
+
+Usage: python -m benchmarks.bench_workspaces [--workspaces 200] [--files 40] [--file-bytes 65536]
+           [--output benchmarks/results/workspaces.json]
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+from typing import List
+
+from benchmarks.bench_pipeline import percentile
+from src.services.workspace import WorkspaceManager
+
+
+def timed(f, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        f()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workspaces", type=int, default=200)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--file-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--lease-seconds", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", default="benchmarks/results/workspaces.json")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench-workspaces-")
+    options = dict(quota_bytes=2**50, reserve_bytes=0, min_free_bytes=0, lease_seconds=args.lease_seconds)
+    crashed = WorkspaceManager(root, **options)
+    crashed.owner = "crashed-host-1"
+    live = WorkspaceManager(root, **options)
+    payload = os.urandom(args.file_bytes)
+    try:
+        for index in range(args.workspaces):
+            manager = crashed if index % 2 else live
+            path = manager.acquire(f"run{index:05}")
+            for n in range(args.files):
+                with open(os.path.join(path, f"file{n:03}.bin"), "wb") as f:
+                    f.write(payload)
+        total = args.workspaces * args.files * args.file_bytes
+
+        admit = timed(live.admit, args.repeat)
+        sweep = timed(live.sweep, args.repeat)
+
+        # Crashed leases may already have expired during the timed sweeps.
+        started = time.perf_counter()
+        while len(live.usage()) > args.workspaces - args.workspaces // 2:
+            time.sleep(args.lease_seconds / 4)
+            live.sweep()
+        recovered_after = time.perf_counter() - started
+        left = live.usage()
+        reclaimed = args.workspaces - len(left)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "bytes_on_disk": total,
+        "admit_seconds": {"p50": round(percentile(admit, 50), 4), "max": round(max(admit), 4)},
+        "sweep_seconds": {"p50": round(percentile(sweep, 50), 4), "max": round(max(sweep), 4)},
+        "crashed_workspaces_reclaimed": reclaimed,
+        "seconds_to_reclaim_after_timing": round(recovered_after, 2),
+        "live_workspaces_left": len(left),
+    }
+    print(json.dumps({key: value for key, value in report.items() if key not in ("args", "platform")}, indent=2))
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Stand-in for the OpenAI Batch API and the Anthropic Message Batches API.
+
+OpenAI: `POST /v1/files` (multipart JSONL upload), `GET /v1/files/{id}/content`,
+`POST /v1/batches`, `GET /v1/batches/{id}`. Anthropic: `POST /v1/messages/batches`,
+`GET /v1/messages/batches/{id}`, `GET /v1/messages/batches/{id}/results`.
+
+A batch completes after a sampled latency; each request then fails with `error_rate`
+or is answered like the chat stand-in does (schema-shaped tool calls, or text).
+
+Usage: python -m benchmarks.standins.batch_server --port 8304 --latency uniform:5:20 --error-rate 0.05
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from typing import Any, Dict, List
+
+from benchmarks.standins.chat_server import anthropic_message, chat_completion
+from benchmarks.standins.common import LatencyModel, StandInHandler, StandInServer
+
+
+class BatchServer(StandInServer):
+    def __init__(self, *args, story_words: int = 190, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.story_words = story_words
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.results: Dict[str, bytes] = {}
+
+    def add_file(self, content: bytes) -> str:
+        file_id = f"file-{uuid.uuid4().hex}"
+        with self._lock:
+            self.files[file_id] = content
+        return file_id
+
+    def schedule(self, batch_id: str, complete) -> None:
+        timer = threading.Timer(self.latency.sample(), complete, args=(batch_id,))
+        timer.daemon = True
+        timer.start()
+
+    def _fails(self) -> bool:
+        with self._lock:
+            self.requests_served += 1
+            if random.random() < self.error_rate:
+                self.errors_injected += 1
+                return True
+        return False
+
+    def complete_openai(self, batch_id: str) -> None:
+        batch = self.batches[batch_id]
+        outputs: List[str] = []
+        errors: List[str] = []
+        for line in self.files[batch["input_file_id"]].decode().splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            if self._fails():
+                errors.append(json.dumps({
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 500, "request_id": uuid.uuid4().hex, "body": {"error": {"message": "injected failure"}}},
+                    "error": None,
+                }))
+                continue
+            outputs.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": chat_completion(request["body"], self.story_words)},
+                "error": None,
+            }, ensure_ascii=False))
+
+        batch.update(
+            status="completed",
+            completed_at=int(time.time()),
+            output_file_id=self.add_file("\n".join(outputs).encode()) if outputs else None,
+            error_file_id=self.add_file("\n".join(errors).encode()) if errors else None,
+            request_counts={"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)},
+        )
+
+    def complete_anthropic(self, batch_id: str) -> None:
+        batch = self.batches[batch_id]
+        lines: List[str] = []
+        succeeded = errored = 0
+        for request in batch.pop("_requests"):
+            if self._fails():
+                errored += 1
+                result = {"type": "errored", "error": {"type": "error", "error": {"type": "api_error", "message": "injected failure"}}}
+            else:
+                succeeded += 1
+                result = {"type": "succeeded", "message": anthropic_message(request["params"], self.story_words)}
+            lines.append(json.dumps({"custom_id": request["custom_id"], "result": result}, ensure_ascii=False))
+
+        self.results[batch_id] = "\n".join(lines).encode()
+        batch.update(
+            processing_status="ended",
+            ended_at=_now(),
+            results_url=f"{self.url}/v1/messages/batches/{batch_id}/results",
+            request_counts={"processing": 0, "succeeded": succeeded, "errored": errored, "canceled": 0, "expired": 0},
+        )
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+class BatchHandler(StandInHandler):
+    server: BatchServer
+
+    def do_POST(self) -> None:
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/v1/files":
+            self._upload()
+        elif path == "/v1/batches":
+            self._create_openai()
+        elif path == "/v1/messages/batches":
+            self._create_anthropic()
+        else:
+            self.send_json({"error": {"message": "not found"}}, status=404)
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0].rstrip("/")
+        if match := re.fullmatch(r"/v1/files/([\w-]+)/content", path):
+            content = self.server.files.get(match.group(1))
+            if content is None:
+                self.send_json({"error": {"message": "file not found"}}, status=404)
+            else:
+                self._send_bytes(content, "application/jsonl")
+        elif match := re.fullmatch(r"/v1/batches/([\w-]+)", path):
+            self._send_batch(match.group(1))
+        elif match := re.fullmatch(r"/v1/messages/batches/([\w-]+)/results", path):
+            results = self.server.results.get(match.group(1))
+            if results is None:
+                self.send_json({"type": "error", "error": {"type": "not_found_error", "message": "no results yet"}}, status=404)
+            else:
+                self._send_bytes(results, "application/binary")
+        elif match := re.fullmatch(r"/v1/messages/batches/([\w-]+)", path):
+            self._send_batch(match.group(1))
+        else:
+            self.send_json({"error": {"message": "not found"}}, status=404)
+
+    def _send_bytes(self, content: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_batch(self, batch_id: str) -> None:
+        batch = self.server.batches.get(batch_id)
+        if batch is None:
+            self.send_json({"error": {"message": "batch not found"}}, status=404)
+        else:
+            self.send_json({key: value for key, value in batch.items() if not key.startswith("_")})
+
+    def _upload(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        message = BytesParser(policy=default_policy).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw
+        )
+        content, filename, purpose = b"", "batch.jsonl", "batch"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                content = part.get_payload(decode=True) or b""
+                filename = part.get_filename() or filename
+            elif name == "purpose":
+                purpose = part.get_content().strip()
+
+        file_id = self.server.add_file(content)
+        self.send_json({
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        })
+
+    def _create_openai(self) -> None:
+        body = self.read_json()
+        if body.get("input_file_id") not in self.server.files:
+            self.send_json({"error": {"message": "input file not found"}}, status=400)
+            return
+
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "completion_window": body.get("completion_window", "24h"),
+            "input_file_id": body["input_file_id"],
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "metadata": body.get("metadata"),
+        }
+        self.server.batches[batch_id] = batch
+        self.server.schedule(batch_id, self.server.complete_openai)
+        self.send_json(batch)
+
+    def _create_anthropic(self) -> None:
+        body = self.read_json()
+        requests = body.get("requests") or []
+        batch_id = f"msgbatch_{uuid.uuid4().hex}"
+        batch = {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "in_progress",
+            "request_counts": {"processing": len(requests), "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": _now(),
+            "expires_at": _now(),
+            "ended_at": None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": None,
+            "_requests": requests,
+        }
+        self.server.batches[batch_id] = batch
+        self.server.schedule(batch_id, self.server.complete_anthropic)
+        self._send_batch(batch_id)
+
+
+def make_server(port: int = 0, latency: str = "fixed:0", error_rate: float = 0.0, story_words: int = 190) -> BatchServer:
+    return BatchServer(("127.0.0.1", port), BatchHandler, LatencyModel.parse(latency), error_rate, story_words=story_words)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8304)
+    parser.add_argument("--latency", default="uniform:5:20")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--story-words", type=int, default=190)
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.error_rate, args.story_words)
+    print(f"Batch stand-in listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,222 @@
+"""
+Stand-in for OpenAI-compatible chat completions (OpenAI and DeepSeek).
+
+Answers `POST [/v1]/chat/completions`. Requests with tools (instructor's structured
+output) get a tool call whose arguments are synthesized from the tool's JSON schema;
+plain requests get a Spanish-looking paragraph. Usage counts approximate 4 chars/token.
+A system message seen before is reported as cached prompt tokens (OpenAI and DeepSeek
+fields), like provider prefix caching. `chat_completion` and `anthropic_message` also
+answer the batch stand-in's requests.
+
+Usage: python -m benchmarks.standins.chat_server --port 8301 --latency lognormal:2:0.5 --error-rate 0.05
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import time
+from typing import Any, Dict, Optional
+
+from benchmarks.standins.common import LatencyModel, StandInHandler, StandInServer
+
+WORDS = [
+    "los", "dioses", "del", "norte", "gobernaron", "el", "mundo", "durante", "siglos", "y", "nadie",
+    "sabe", "por", "qué", "la", "ciudad", "perdida", "guardaba", "un", "secreto", "antiguo", "que",
+    "cambió", "historia", "de", "sus", "habitantes", "cuando", "llegó", "tormenta",
+]
+
+
+def paragraph(rng: random.Random, words: int) -> str:
+    sentences, current = [], []
+    for _ in range(words):
+        current.append(rng.choice(WORDS))
+        if len(current) >= rng.randint(8, 16):
+            sentences.append(" ".join(current).capitalize() + ".")
+            current = []
+    if current:
+        sentences.append(" ".join(current).capitalize() + ".")
+    return " ".join(sentences)
+
+
+class SchemaSynthesizer:
+    """Builds a value matching a JSON schema; long-text fields get a story-sized paragraph."""
+
+    def __init__(self, rng: random.Random, story_words: int) -> None:
+        self.rng = rng
+        self.story_words = story_words
+        self.counter = itertools.count(1)
+
+    def value(self, schema: Dict[str, Any], root: Dict[str, Any], name: str = "") -> Any:
+        if "$ref" in schema:
+            target = root
+            for part in schema["$ref"].lstrip("#/").split("/"):
+                target = target[part]
+            return self.value(target, root, name)
+        for combinator in ("anyOf", "oneOf", "allOf"):
+            if combinator in schema:
+                options = [option for option in schema[combinator] if option.get("type") != "null"]
+                return self.value(options[0] if options else {"type": "null"}, root, name)
+
+        kind = schema.get("type", "object" if "properties" in schema else "string")
+        if kind == "object":
+            return {key: self.value(sub, root, key) for key, sub in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self.value(schema.get("items", {}), root, name) for _ in range(self.rng.randint(3, 5))]
+        if kind == "integer":
+            return next(self.counter)
+        if kind == "number":
+            return round(self.rng.random() * 100, 2)
+        if kind == "boolean":
+            return False
+        if kind == "null":
+            return None
+        if "content" in name or "story" == name:
+            return paragraph(self.rng, self.story_words)
+        if "genre" in name:
+            return self.rng.choice(["female", "male"])
+        return f"{' '.join(self.rng.sample(WORDS, 3))} {next(self.counter)}"
+
+
+def _tool(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The function instructor asked for (OpenAI format), if any."""
+    tools = body.get("tools") or []
+    if not tools:
+        return None
+    chosen = body.get("tool_choice") if isinstance(body.get("tool_choice"), dict) else {}
+    name = chosen.get("function", {}).get("name")
+    for tool in tools:
+        if name is None or tool["function"]["name"] == name:
+            return tool["function"]
+    return tools[0]["function"]
+
+
+def _content_chars(content: Any) -> int:
+    if isinstance(content, list):
+        return sum(len(str(block.get("text") or "")) for block in content)
+    return len(str(content or ""))
+
+
+def chat_completion(body: Dict[str, Any], story_words: int, cached_chars: int = 0) -> Dict[str, Any]:
+    """An OpenAI chat completion answering `body`."""
+    synthesizer = SchemaSynthesizer(random.Random(), story_words)
+    prompt_chars = sum(_content_chars(message.get("content")) for message in body.get("messages", []))
+    tool = _tool(body)
+
+    message: Dict[str, Any] = {"role": "assistant", "content": None}
+    if tool is not None:
+        schema = tool.get("parameters", {})
+        arguments = json.dumps(synthesizer.value(schema, schema), ensure_ascii=False)
+        message["tool_calls"] = [{
+            "id": f"call_{time.time_ns()}",
+            "type": "function",
+            "function": {"name": tool["name"], "arguments": arguments},
+        }]
+        completion_chars = len(arguments)
+    else:
+        message["content"] = paragraph(synthesizer.rng, story_words)
+        completion_chars = len(message["content"])
+
+    return {
+        "id": f"chatcmpl-standin-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stand-in"),
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if tool is not None else "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": completion_chars // 4,
+            "total_tokens": (prompt_chars + completion_chars) // 4,
+            "prompt_tokens_details": {"cached_tokens": cached_chars // 4},
+            "prompt_cache_hit_tokens": cached_chars // 4,
+            "prompt_cache_miss_tokens": (prompt_chars - cached_chars) // 4,
+        },
+    }
+
+
+def anthropic_message(params: Dict[str, Any], story_words: int) -> Dict[str, Any]:
+    """An Anthropic message answering `params`: a tool_use block when a tool is forced, else text."""
+    synthesizer = SchemaSynthesizer(random.Random(), story_words)
+    prompt_chars = sum(_content_chars(message.get("content")) for message in params.get("messages", []))
+    tools = params.get("tools") or []
+
+    if tools:
+        schema = tools[0].get("input_schema", {})
+        value = synthesizer.value(schema, schema)
+        content = [{"type": "tool_use", "id": f"toolu_{time.time_ns()}", "name": tools[0]["name"], "input": value}]
+        completion_chars = len(json.dumps(value, ensure_ascii=False))
+    else:
+        text = paragraph(synthesizer.rng, story_words)
+        content = [{"type": "text", "text": text}]
+        completion_chars = len(text)
+
+    return {
+        "id": f"msg_standin_{time.time_ns()}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "stand-in"),
+        "content": content,
+        "stop_reason": "tool_use" if tools else "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": prompt_chars // 4, "output_tokens": completion_chars // 4},
+    }
+
+
+class ChatHandler(StandInHandler):
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") not in ("/chat/completions", "/v1/chat/completions"):
+            self.send_json({"error": {"message": "not found"}}, status=404)
+            return
+
+        body = self.read_json()
+        if not self.simulate():
+            return
+
+        cached_chars = self.server.cached_prefix(body.get("messages", []))
+        self.send_json(chat_completion(body, self.server.story_words, cached_chars))
+
+
+class ChatServer(StandInServer):
+    def __init__(self, *args, story_words: int = 190, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.story_words = story_words
+        self.prefixes = set()
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def cached_prefix(self, messages: list) -> int:
+        """Characters of the leading system message if it was seen before, else 0 (and remember it)."""
+        prompt_chars = sum(len(str(message.get("content") or "")) for message in messages)
+        cached = 0
+        if messages and messages[0].get("role") == "system":
+            system = str(messages[0].get("content") or "")
+            digest = hashlib.sha256(system.encode()).hexdigest()
+            with self._lock:
+                if digest in self.prefixes:
+                    cached = len(system)
+                self.prefixes.add(digest)
+        with self._lock:
+            self.prompt_tokens += prompt_chars // 4
+            self.cached_tokens += cached // 4
+        return cached
+
+
+def make_server(port: int = 0, latency: str = "fixed:0", error_rate: float = 0.0, story_words: int = 190) -> ChatServer:
+    return ChatServer(("127.0.0.1", port), ChatHandler, LatencyModel.parse(latency), error_rate, story_words=story_words)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8301)
+    parser.add_argument("--latency", default="lognormal:2:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--story-words", type=int, default=190)
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.error_rate, args.story_words)
+    print(f"Chat stand-in listening on {server.url}")
+    server.serve_forever()
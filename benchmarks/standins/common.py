@@ -0,0 +1,112 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+class LatencyModel:
+    """Latency distribution for a stand-in: fixed, uniform, lognormal or spike, in seconds."""
+
+    def __init__(
+        self, kind: str = "fixed", mean: float = 0.0, spread: float = 0.0, stall: float = 0.0, seed: Optional[int] = None
+    ) -> None:
+        self.kind = kind
+        self.mean = mean
+        self.spread = spread
+        self.stall = stall
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """
+        Parse `fixed:0.2`, `uniform:0.1:0.5`, `lognormal:0.3:0.5` (mean, sigma) or
+        `spike:0.5:0.1:120` (0.5s, but a 0.1 share of requests stall for 120s).
+        """
+        kind, *values = spec.split(":")
+        numbers = [float(v) for v in values] + [0.0, 0.0, 0.0]
+        return cls(kind, numbers[0], numbers[1], numbers[2])
+
+    def sample(self) -> float:
+        if self.kind == "uniform":
+            return self.rng.uniform(self.mean, self.spread)
+        if self.kind == "lognormal":
+            return self.rng.lognormvariate(0.0, self.spread) * self.mean
+        if self.kind == "spike":
+            return self.stall if self.rng.random() < self.spread else self.mean
+        return self.mean
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], handler, latency: LatencyModel, error_rate: float = 0.0) -> None:
+        super().__init__(address, handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests_served = 0
+        self.errors_injected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            self.requests_served += 1
+            if random.random() < self.error_rate:
+                self.errors_injected += 1
+                return True
+        return False
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: StandInServer
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, payload, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate(self) -> bool:
+        """Sleep for a sampled latency; answer 500 and return False when a fault is injected."""
+        time.sleep(self.server.latency.sample())
+        if self.server.should_fail():
+            self.send_json({"detail": "injected failure"}, status=500)
+            return False
+        return True
+
+
+def standin_settings(**overrides):
+    """Settings with placeholder credentials, for pointing services at stand-ins."""
+    from src.core.settings import Settings
+
+    values = dict(
+        TELEGRAM_TOKEN="stand-in",
+        ADMINISTRATOR_IDS=[],
+        PROJECT_FLAG="stand-in",
+        ELEVENLABS_API_KEY="stand-in",
+        OPENAI_API_KEY="stand-in",
+        ANTHROPIC_API_KEY="stand-in",
+        DEEPSEEK_API_KEY="stand-in",
+        MJ_INTERACTIVE_API="http://127.0.0.1:9",
+    )
+    values.update(overrides)
+    return Settings(_env_file=None, **values)
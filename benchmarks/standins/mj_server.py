@@ -0,0 +1,68 @@
+"""
+Stand-in for the Midjourney interactive server.
+
+Answers `POST /generate_images` by writing one placeholder image per prompt into
+`prompts_data.directory`, as the real server does, after a sampled latency.
+
+Usage: python -m benchmarks.standins.mj_server --port 8303 --latency uniform:30:90 --error-rate 0.05
+"""
+import argparse
+import os
+
+from PIL import Image, ImageDraw
+
+from benchmarks.standins.common import LatencyModel, StandInHandler, StandInServer
+
+
+def placeholder_image(path: str, index: int, size: tuple) -> None:
+    width, height = size
+    image = Image.new("RGB", size, ((index * 67) % 256, (index * 131) % 256, (index * 29) % 256))
+    draw = ImageDraw.Draw(image)
+    # A few shapes so encoders and resizers get real work instead of a flat colour.
+    for step in range(0, max(width, height), max(width, height) // 12):
+        draw.ellipse((step - width // 4, step // 2, step + width // 4, step // 2 + height // 3), outline=(255, 255, 255), width=6)
+    image.save(path)
+
+
+class MJHandler(StandInHandler):
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/generate_images":
+            self.send_json({"detail": "not found"}, status=404)
+            return
+
+        body = self.read_json()
+        if not self.simulate():
+            return
+
+        prompts_data = body.get("prompts_data", {})
+        directory = prompts_data.get("directory")
+        if not directory or not os.path.isdir(directory):
+            self.send_json({"detail": f"directory {directory} does not exist"}, status=400)
+            return
+
+        images = []
+        for prompt in prompts_data.get("img_prompts", []):
+            index = prompt.get("prompt_num", len(images) + 1)
+            path = os.path.join(directory, f"image_{index:02}.png")
+            placeholder_image(path, index, self.server.image_size)
+            images.append(path)
+
+        self.send_json({"status": "success", "images": images})
+
+
+def make_server(port: int = 0, latency: str = "fixed:0", error_rate: float = 0.0, image_size: tuple = (928, 1664)) -> StandInServer:
+    server = StandInServer(("127.0.0.1", port), MJHandler, LatencyModel.parse(latency), error_rate)
+    server.image_size = image_size
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8303)
+    parser.add_argument("--latency", default="uniform:30:90")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.error_rate)
+    print(f"Midjourney stand-in listening on {server.url}")
+    server.serve_forever()
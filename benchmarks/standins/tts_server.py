@@ -0,0 +1,68 @@
+"""
+Stand-in for the ElevenLabs text-to-speech endpoints.
+
+Answers `POST /v1/text-to-speech/{voice_id}[/stream]` with synthetic MPEG-1 Layer III
+frames (ID3 tag and Info frame included) whose duration is proportional to the text.
+
+Usage: python -m benchmarks.standins.tts_server --port 8302 --latency lognormal:0.3:0.4 --error-rate 0.1
+"""
+import argparse
+import re
+import time
+
+from benchmarks.standins.common import LatencyModel, StandInHandler, StandInServer
+
+FRAME_SAMPLES = 1152
+SAMPLE_RATE = 44100
+# 128 kbps, 44.1 kHz, no padding, joint stereo -> 417 byte frames.
+FRAME_HEADER = bytes([0xFF, 0xFB, 0x90, 0x64])
+FRAME_LENGTH = 417
+ID3_TAG = b"ID3\x04\x00\x00\x00\x00\x00\x00"
+
+
+def synthetic_mp3(seconds: float) -> bytes:
+    frames = max(1, round(seconds * SAMPLE_RATE / FRAME_SAMPLES))
+    info = bytearray(FRAME_HEADER + bytes(FRAME_LENGTH - 4))
+    info[36:40] = b"Info"
+    frame = FRAME_HEADER + bytes(FRAME_LENGTH - 4)
+    return ID3_TAG + bytes(info) + frame * frames
+
+
+class TTSHandler(StandInHandler):
+    chars_per_second = 15.0
+    stream_chunk = 4096
+
+    def do_POST(self) -> None:
+        if not re.match(r"^/v1/text-to-speech/[^/?]+(/stream)?(\?|$)", self.path):
+            self.send_json({"detail": "not found"}, status=404)
+            return
+
+        body = self.read_json()
+        if not self.simulate():
+            return
+
+        audio = synthetic_mp3(len(body.get("text", "")) / self.chars_per_second)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        for offset in range(0, len(audio), self.stream_chunk):
+            self.wfile.write(audio[offset:offset + self.stream_chunk])
+            self.wfile.flush()
+            time.sleep(self.server.latency.sample() / 50)
+
+
+def make_server(port: int = 0, latency: str = "fixed:0", error_rate: float = 0.0) -> StandInServer:
+    return StandInServer(("127.0.0.1", port), TTSHandler, LatencyModel.parse(latency), error_rate)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8302)
+    parser.add_argument("--latency", default="fixed:0.2")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.error_rate)
+    print(f"TTS stand-in listening on {server.url}")
+    server.serve_forever()
@@ -1,9 +1,31 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.core.services import get_services
+from src.utils.tracing import configure_tracing
 from src.routes.generate_content import content_router
+from src.routes.health import health_router
+from src.routes.metrics import metrics_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    services = get_services()
+    configure_tracing(services.settings)
+    # Liveness is immediate; /health/ready turns green once the warm-up has loaded everything.
+    warm_up = asyncio.create_task(asyncio.to_thread(services.warm_up)) if services.settings.WARM_UP_ON_STARTUP else None
+    janitor = asyncio.create_task(services.workspaces.janitor(services.settings.WORKSPACE_JANITOR_INTERVAL_SECONDS))
+    yield
+    janitor.cancel()
+    if warm_up is not None:
+        await warm_up
+    services.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,4 +35,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(content_router)
\ No newline at end of file
+app.include_router(content_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
@@ -0,0 +1,181 @@
+import time
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Collection, Dict, Optional
+
+from src.core.settings import Settings
+from src.langg.nodes import Nodes
+from src.utils.limits import StageLimiter
+from src.utils.singleflight import SingleFlight
+from src.utils.scheduler import ProviderScheduler
+from src.utils.deadlines import NodeBudgets
+from src.services.pchain.chainable import MinimalChainable
+from src.services.pchain.routing import RoutingPolicy
+from src.services.localfile_service import LocalFileService
+from src.services.audio_cache import AudioCache
+from src.services.image_cache import ImageCache
+from src.services.workspace import WorkspaceManager
+from src.services.elevenlabs_service import ElevenLabsService
+from src.services.subtitle_generator import SubtitleGenerator
+from src.services.image_processor import ImageProcessor
+from src.services.video_renderer import VideoRenderer
+from src.services.transcription_cache import TranscriptionCache
+from src.services.pchain.chain_prompt_manager import ChainPromptManager
+
+if TYPE_CHECKING:
+    from src.langg.graph import WorkFlow
+    from src.services.run_queue import RunQueue
+
+logger = logging.getLogger(__name__)
+
+
+class Services:
+    """
+    Process-wide services shared by every run. Building them is cheap: provider SDKs,
+    LangGraph and the Whisper model are only loaded on first use, or ahead of it by
+    `warm_up()`, which the app runs in the background at startup.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.image_processor = ImageProcessor(settings)
+        chain_prompt_manager = ChainPromptManager()
+        self.routing_policy = RoutingPolicy(settings, chain_prompt_manager)
+        self.scheduler = ProviderScheduler(settings)
+        self.workspaces = WorkspaceManager(
+            settings.WORKSPACE_ROOT,
+            quota_bytes=settings.WORKSPACE_QUOTA_BYTES,
+            reserve_bytes=settings.WORKSPACE_RUN_RESERVE_BYTES,
+            min_free_bytes=settings.WORKSPACE_MIN_FREE_BYTES,
+            lease_seconds=settings.WORKSPACE_LEASE_SECONDS,
+            orphan_seconds=settings.WORKSPACE_ORPHAN_SECONDS,
+        )
+        self.nodes = Nodes(
+            settings=settings,
+            chain_prompt_manager=chain_prompt_manager,
+            minimal_chainable=MinimalChainable(settings, routing_policy=self.routing_policy, scheduler=self.scheduler),
+            elevenlabs_service=ElevenLabsService(
+                settings,
+                cache=AudioCache(settings.TTS_CACHE_DIR, settings.TTS_CACHE_MAX_BYTES),
+                scheduler=self.scheduler,
+            ),
+            subtitle_generator=SubtitleGenerator(
+                cache=TranscriptionCache(settings.TRANSCRIPTION_CACHE_DIR, settings.TRANSCRIPTION_CACHE_MAX_BYTES),
+                num_workers=len(settings.OUTPUT_LANGUAGES),
+                model_size=settings.WHISPER_MODEL_SIZE,
+                compute_type=settings.WHISPER_COMPUTE_TYPE,
+            ),
+            local_file_service=LocalFileService(),
+            image_processor=self.image_processor,
+            video_renderer=VideoRenderer(settings),
+            image_cache=ImageCache(
+                settings.MJ_CACHE_DIR,
+                settings.MJ_CACHE_MAX_BYTES,
+                namespace=settings.MJ_CACHE_NAMESPACE,
+                near_duplicate_distance=settings.MJ_CACHE_NEAR_DUPLICATE_DISTANCE,
+            ),
+            scheduler=self.scheduler,
+            workspaces=self.workspaces,
+        )
+        self.stage_limiter = StageLimiter(settings.STAGE_CONCURRENCY)
+        self.single_flight = SingleFlight(ttl=settings.SINGLE_FLIGHT_TTL_SECONDS)
+        self.node_budgets = NodeBudgets(
+            settings.NODE_BUDGET_CEILING_SECONDS,
+            percentile=settings.NODE_BUDGET_PERCENTILE,
+            headroom=settings.NODE_BUDGET_HEADROOM,
+            min_samples=settings.NODE_BUDGET_MIN_SAMPLES,
+            floor_seconds=settings.NODE_BUDGET_FLOOR_SECONDS,
+        )
+
+        self.warm_up_seconds: Optional[float] = None
+        self.warm_up_error: Optional[str] = None
+        self._workflows: Dict[str, "WorkFlow"] = {}
+        self._workflows_lock = threading.Lock()
+        self._run_queue: Optional["RunQueue"] = None
+
+    def workflow(self, entry_point: str = "choose_story", pools: Optional[Collection[str]] = None) -> "WorkFlow":
+        """
+        Compiled graph for `entry_point`; compiled graphs are reused by concurrent runs. Workers
+        pass the pools they serve, so stages of other pools hand the run off instead of running.
+        """
+        key = entry_point if pools is None else f"{entry_point}@{','.join(sorted(pools))}"
+        if key not in self._workflows:
+            with self._workflows_lock:
+                if key not in self._workflows:
+                    from src.langg.graph import StateGraph, WorkFlow
+                    from src.langg.state import ContentState
+
+                    self._workflows[key] = WorkFlow(
+                        self.nodes,
+                        StateGraph(ContentState),
+                        entry_point=entry_point,
+                        stage_limiter=self.stage_limiter,
+                        stage_pools=self.settings.STAGE_POOLS,
+                        pools=pools,
+                        node_budgets=self.node_budgets,
+                    )
+        return self._workflows[key]
+
+    @property
+    def run_queue(self) -> "RunQueue":
+        if self._run_queue is None:
+            with self._workflows_lock:
+                if self._run_queue is None:
+                    from src.services.run_queue import RunQueue
+
+                    self._run_queue = RunQueue(
+                        self.settings.RUN_QUEUE_PATH,
+                        lease_seconds=self.settings.RUN_QUEUE_LEASE_SECONDS,
+                        max_attempts=self.settings.RUN_QUEUE_MAX_ATTEMPTS,
+                    )
+        return self._run_queue
+
+    def warm_up(self, whisper: bool = True) -> None:
+        """
+        Load SDKs, compile the graphs and load the Whisper model (skipped with `whisper=False`,
+        e.g. on workers that never run get_subtitles). Blocking; run it in a thread.
+        """
+        started = time.perf_counter()
+        try:
+            self.nodes.minimal_chainable.warm_up()
+            self.nodes.elevenlabs_service.client
+            self.workflow("choose_story")
+            self.workflow("verify_path_and_create_folder")
+            if whisper:
+                self.nodes.subtitle_generator.model
+            self.warm_up_seconds = time.perf_counter() - started
+            logger.info(f"Services warmed up in {self.warm_up_seconds:.1f}s")
+        except Exception as e:
+            self.warm_up_error = str(e)
+            logger.error(f"Warm-up failed: {e}")
+
+    @property
+    def ready(self) -> bool:
+        return self.nodes.subtitle_generator.loaded and len(self._workflows) > 0
+
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "whisper_loaded": self.nodes.subtitle_generator.loaded,
+            "workflows": sorted(self._workflows),
+            "warm_up_seconds": self.warm_up_seconds,
+            "warm_up_error": self.warm_up_error,
+        }
+
+    def shutdown(self) -> None:
+        self.image_processor.shutdown()
+        if self._run_queue is not None:
+            self._run_queue.close()
+
+
+_services: Optional[Services] = None
+_services_lock = threading.Lock()
+
+
+def get_services() -> Services:
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = Services(Settings())
+    return _services
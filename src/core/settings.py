@@ -1,7 +1,11 @@
-from typing import List
+from typing import Dict, List, Optional
 
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Languages get_story writes the story in (see StoryContent).
+STORY_LANGUAGES = ("es", "en")
+
 
 class Settings(BaseSettings):
     TELEGRAM_TOKEN: str
@@ -9,14 +13,173 @@ class Settings(BaseSettings):
     PROJECT_FLAG: str
 
     ELEVENLABS_API_KEY: str
+    ELEVENLABS_MODEL_ID: str = "eleven_multilingual_v2"
+    # <codec>_<sample rate>_<bitrate>, e.g. mp3_44100_128 or mp3_22050_32
+    ELEVENLABS_OUTPUT_FORMAT: str = "mp3_44100_128"
+    ELEVENLABS_BASE_URL: Optional[str] = None
+    ELEVENLABS_CHUNKED: bool = False
+    ELEVENLABS_CHUNK_MAX_CHARS: int = 800
+    ELEVENLABS_CHUNK_CONCURRENCY: int = 3
+    ELEVENLABS_CHUNK_RETRIES: int = 2
 
     OPENAI_API_KEY: str
     OPENAI_MODEL_NAME: str = "gpt-4o"
+    OPENAI_BASE_URL: Optional[str] = None
     ANTHROPIC_API_KEY: str
     ANTHROPIC_MODEL_NAME: str = "claude-3-5-sonnet"
+    ANTHROPIC_BASE_URL: Optional[str] = None
     DEEPSEEK_API_KEY: str
     DEEPSEEK_MODEL_NAME: str = "deepseek-chat"
+    DEEPSEEK_BASE_URL: str = "https://api.deepseek.com"
+
+    # USD per million tokens by "client:model", merged over the built-in table (see pchain/pricing.py).
+    LLM_PRICES: Dict[str, Dict[str, float]] = {}
+    # Soft LLM spend per run: once reached, chains are routed to their cheapest candidate.
+    RUN_BUDGET_USD: Optional[float] = None
+    # Routes failing more than this over the last ROUTING_WINDOW calls are skipped while another is healthy.
+    ROUTING_MIN_SUCCESS_RATE: float = 0.8
+    ROUTING_MIN_SAMPLES: int = 5
+    ROUTING_WINDOW: int = 20
+    ROUTING_COOLDOWN_SECONDS: int = 300
+
+    # Provider batch APIs (MinimalChainable.run_batch) for work that can wait: half price, own rate limits.
+    LLM_BATCH_POLL_SECONDS: float = 30
+    LLM_BATCH_COMPLETION_WINDOW: str = "24h"
+    LLM_BATCH_MAX_WAIT_SECONDS: float = 26 * 3600
+
+    # faster-whisper model size (or a local model directory) and compute type.
+    WHISPER_MODEL_SIZE: str = "medium"
+    WHISPER_COMPUTE_TYPE: str = "float32"
 
     MJ_INTERACTIVE_API: str
 
-    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
\ No newline at end of file
+    # Audio/subtitle tracks produced per story; the primary one also feeds the video render.
+    OUTPUT_LANGUAGES: List[str] = ["es", "en"]
+    PRIMARY_LANGUAGE: str = "es"
+
+    IMAGE_TARGET_ASPECTS: List[str] = ["9:16"]
+    IMAGE_FORMATS: List[str] = ["webp", "jpeg"]
+    IMAGE_MAX_EDGE: int = 1920
+    IMAGE_THUMBNAIL_EDGE: int = 320
+    IMAGE_QUALITY: int = 82
+    IMAGE_WORKERS: Optional[int] = None
+
+    FFMPEG_BINARY: str = "ffmpeg"
+    VIDEO_WIDTH: int = 1080
+    VIDEO_HEIGHT: int = 1920
+    VIDEO_FPS: int = 30
+    # libx264 preset/CRF: faster presets and higher CRF trade quality for CPU time.
+    VIDEO_PRESET: str = "veryfast"
+    VIDEO_CRF: int = 23
+    VIDEO_SEGMENT_WORKERS: int = 2
+    VIDEO_THREADS_PER_SEGMENT: int = 2
+    VIDEO_SUBTITLE_MAX_WORDS: int = 4
+    VIDEO_SUBTITLE_MAX_CHARS: int = 28
+    VIDEO_SUBTITLE_STYLE: str = "FontName=Arial,FontSize=16,Bold=1,Outline=2,Alignment=2,MarginV=60"
+
+    # Load SDKs, graphs and the Whisper model in the background at startup instead of on the first request.
+    WARM_UP_ON_STARTUP: bool = True
+
+    # "none", "file" (JSON lines in TRACING_FILE) or "otlp" (OTLP/HTTP to OTLP_ENDPOINT).
+    TRACING_EXPORTER: str = "none"
+    TRACING_FILE: str = "traces/spans.jsonl"
+    OTLP_ENDPOINT: Optional[str] = None
+    PROFILE_DIR: str = "profiles"
+
+    # Completed /content/generate results are replayed to duplicate requests for this long.
+    SINGLE_FLIGHT_TTL_SECONDS: int = 600
+
+    BATCH_MAX_STORIES: int = 10
+    BATCH_MAX_CONCURRENT_STORIES: int = 3
+    # Runs allowed inside each graph stage at once, shared by every run in the process.
+    STAGE_CONCURRENCY: Dict[str, int] = {
+        "get_mj_images": 1,
+        "get_story_audio": 2,
+        "get_subtitles": 1,
+        "render_video": 1,
+    }
+
+    # Provider calls allowed at once, shared by every run in the process; each provider has a
+    # weighted-fair queue in front. Providers left out are not queued.
+    PROVIDER_CONCURRENCY: Dict[str, int] = {
+        "deepseek": 8,
+        "openai": 8,
+        "anthropic": 4,
+        "elevenlabs": 3,
+        "midjourney": 1,
+    }
+    # Priority classes: "interactive" (/content/generate, /content/generate/stream) and
+    # "background" (batches, queued runs unless asked otherwise). A class whose projected
+    # queue wait exceeds its SLO is admitted anyway, deferred (up to PRIORITY_MAX_DEFER_SECONDS)
+    # or rejected, per PRIORITY_OVERLOAD.
+    PRIORITY_WEIGHTS: Dict[str, float] = {"interactive": 8, "background": 1}
+    PRIORITY_SLO_SECONDS: Dict[str, float] = {"interactive": 30, "background": 120}
+    PRIORITY_OVERLOAD: Dict[str, str] = {"interactive": "admit", "background": "defer"}
+    PRIORITY_MAX_DEFER_SECONDS: float = 600
+
+    # Run deadline by priority, counted from when the run is accepted (queueing included). Each
+    # node gets min(its budget, the time left): the NODE_BUDGET_PERCENTILE of its recent latency
+    # times NODE_BUDGET_HEADROOM, capped by its NODE_BUDGET_CEILING_SECONDS, which is also the
+    # budget until NODE_BUDGET_MIN_SAMPLES runs are seen. Optional stages (process_images,
+    # get_subtitles, render_video) are skipped when they would not fit before the deadline.
+    RUN_DEADLINE_SECONDS: Dict[str, float] = {"interactive": 1800, "background": 4 * 3600}
+    NODE_BUDGET_CEILING_SECONDS: Dict[str, float] = {
+        "default": 300,
+        "choose_story": 600,
+        "get_story": 600,
+        "get_mj_images": 1200,
+        "get_story_audio": 900,
+        "get_subtitles": 900,
+        "render_video": 1200,
+    }
+    NODE_BUDGET_PERCENTILE: float = 99
+    NODE_BUDGET_HEADROOM: float = 2.0
+    NODE_BUDGET_MIN_SAMPLES: int = 20
+    NODE_BUDGET_FLOOR_SECONDS: float = 10
+
+    # "local" runs /content/generate in the API process; "queue" hands it to worker processes
+    # (python worker.py) through the run queue. POST /content/runs always queues.
+    RUN_EXECUTION: str = "local"
+    RUN_QUEUE_PATH: str = "queue/runs.sqlite3"
+    RUN_QUEUE_LEASE_SECONDS: float = 60
+    RUN_QUEUE_MAX_ATTEMPTS: int = 3
+    RUN_QUEUE_POLL_SECONDS: float = 1.0
+    # Worker pool of each stage (the rest run on "default" workers) and the pools a worker serves.
+    STAGE_POOLS: Dict[str, str] = {"get_subtitles": "cpu"}
+    WORKER_POOLS: List[str] = ["default", "cpu"]
+    WORKER_CONCURRENCY: int = 1
+
+    # Run workspaces. A run is only admitted while every workspace, leased ones counted at
+    # WORKSPACE_RUN_RESERVE_BYTES or more, fits in the quota and the disk keeps
+    # WORKSPACE_MIN_FREE_BYTES free. The janitor renews this process's leases and deletes
+    # workspaces whose lease expired or that sat unleased for WORKSPACE_ORPHAN_SECONDS.
+    WORKSPACE_ROOT: str = "temp"
+    WORKSPACE_QUOTA_BYTES: int = 50 * 1024 * 1024 * 1024
+    WORKSPACE_RUN_RESERVE_BYTES: int = 2 * 1024 * 1024 * 1024
+    WORKSPACE_MIN_FREE_BYTES: int = 5 * 1024 * 1024 * 1024
+    WORKSPACE_LEASE_SECONDS: float = 120
+    WORKSPACE_ORPHAN_SECONDS: float = 6 * 3600
+    WORKSPACE_JANITOR_INTERVAL_SECONDS: float = 30
+
+    TRANSCRIPTION_CACHE_DIR: str = "cache/transcriptions"
+    TRANSCRIPTION_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    TTS_CACHE_DIR: str = "cache/tts"
+    TTS_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+
+    # Midjourney images by normalized prompt. Change the namespace to stop serving images made
+    # with older Midjourney settings; the distance is in dHash bits and must stay below 4.
+    MJ_CACHE_DIR: str = "cache/mj"
+    MJ_CACHE_MAX_BYTES: int = 10 * 1024 * 1024 * 1024
+    MJ_CACHE_NAMESPACE: str = ""
+    MJ_CACHE_NEAR_DUPLICATE_DISTANCE: int = 3
+
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
+
+    @model_validator(mode="after")
+    def check_languages(self) -> "Settings":
+        unsupported = [language for language in self.OUTPUT_LANGUAGES if language not in STORY_LANGUAGES]
+        if unsupported:
+            raise ValueError(f"OUTPUT_LANGUAGES {unsupported} are not story languages {list(STORY_LANGUAGES)}")
+        if self.PRIMARY_LANGUAGE not in self.OUTPUT_LANGUAGES:
+            raise ValueError(f"PRIMARY_LANGUAGE {self.PRIMARY_LANGUAGE!r} must be one of OUTPUT_LANGUAGES {self.OUTPUT_LANGUAGES}")
+        return self
\ No newline at end of file
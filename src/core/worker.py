@@ -0,0 +1,165 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from src.core.services import Services
+from src.services.run_queue import Lease, RunQueue, StageHandoff
+from src.services.workspace import WorkspaceQuotaExceeded
+from src.utils.costs import track_costs
+from src.utils.graph import story_result
+from src.utils.metrics import RUNS_IN_FLIGHT, WORKER_SEGMENTS
+from src.utils.scheduler import INTERACTIVE, run_priority
+from src.utils.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Executes queued runs: `concurrency` slots each claim a run of the served pools, run the
+    graph from the run's checkpoint and hand the outcome back to the queue, heartbeating the
+    lease meanwhile. A run that loses its lease is cancelled here, as another worker owns it.
+    """
+
+    def __init__(
+        self,
+        services: Services,
+        queue: RunQueue,
+        pools: List[str],
+        concurrency: int = 1,
+        poll_seconds: float = 1.0,
+        worker_id: Optional[str] = None,
+    ) -> None:
+        self.services = services
+        self.queue = queue
+        self.pools = pools
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop claiming runs; runs in progress are finished."""
+        self.stopping.set()
+
+    async def run(self) -> None:
+        logger.info(f"Worker {self.worker_id} serving pools {self.pools} with {self.concurrency} slots")
+        await asyncio.gather(*(self._slot() for _ in range(self.concurrency)))
+
+    async def _has_room(self) -> bool:
+        try:
+            await asyncio.to_thread(self.services.workspaces.admit)
+            return True
+        except WorkspaceQuotaExceeded as e:
+            logger.warning(f"Worker {self.worker_id} not claiming runs: {e}")
+            return False
+
+    async def _slot(self) -> None:
+        while not self.stopping.is_set():
+            # Runs are only claimed while there is disk for their workspace.
+            lease = await asyncio.to_thread(self.queue.claim, self.worker_id, self.pools) if await self._has_room() else None
+            if lease is None:
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.execute(lease)
+
+    async def _heartbeat(self, lease: Lease, task: asyncio.Task) -> None:
+        """
+        Renew the lease every third of its length. Failed renewals (e.g. a locked database) are
+        retried sooner; if none succeeds while a third of the lease is left, the run is cancelled
+        as on lease loss, since another worker may reclaim it once the lease runs out.
+        """
+        interval = self.queue.lease_seconds / 3
+        renewed = time.monotonic()
+        delay = interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                held = await asyncio.to_thread(self.queue.heartbeat, lease, self.worker_id)
+            except Exception as e:
+                left = renewed + self.queue.lease_seconds - time.monotonic()
+                logger.warning(f"Worker {self.worker_id} could not renew the lease on {lease.run_id} ({left:.0f}s left): {e}")
+                delay = interval / 3
+                if left <= interval:
+                    task.cancel("lease renewal failed")
+                    return
+                continue
+
+            if not held:
+                task.cancel("lease lost")
+                return
+            renewed = time.monotonic()
+            delay = interval
+
+    async def execute(self, lease: Lease) -> str:
+        """Run one segment of a queued run; returns its outcome."""
+        logger.info(f"Worker {self.worker_id} running {lease.run_id} from {lease.entry_point} (attempt {lease.attempt})")
+        workflow = self.services.workflow(lease.entry_point, pools=self.pools)
+        workspaces = self.services.workspaces
+        await asyncio.to_thread(workspaces.acquire, lease.run_id, False)
+        started = time.perf_counter()
+
+        with (
+            RUNS_IN_FLIGHT.track_inprogress(),
+            start_span("content run", {"run_id": lease.run_id, "worker_id": self.worker_id, "entry_point": lease.entry_point}),
+            track_costs(self.services.settings.RUN_BUDGET_USD, carried=lease.costs) as costs,
+            run_priority(lease.state.get("priority") or INTERACTIVE),
+        ):
+            task = asyncio.create_task(workflow.app.ainvoke(input=lease.state))
+            heartbeat = asyncio.create_task(self._heartbeat(lease, task))
+            try:
+                output: Optional[Dict[str, Any]] = await task
+                error: Optional[BaseException] = None
+            except asyncio.CancelledError:
+                if heartbeat.done():
+                    workspaces.forget(lease.run_id)
+                    WORKER_SEGMENTS.labels("lease_lost").inc()
+                    logger.warning(f"Worker {self.worker_id} lost the lease on {lease.run_id}; dropped it")
+                    return "lease_lost"
+                raise
+            except Exception as e:
+                output, error = None, e
+            finally:
+                heartbeat.cancel()
+
+        segment = {"seconds": round(time.perf_counter() - started, 3)}
+        if isinstance(error, StageHandoff):
+            outcome, saved = "handed_off", await asyncio.to_thread(
+                self.queue.hand_off, lease, self.worker_id, error, costs.summary(), segment
+            )
+        elif error is not None:
+            logger.error(f"Run {lease.run_id} failed: {error}")
+            outcome = "retrying" if lease.attempt < self.queue.max_attempts else "failed"
+            saved = await asyncio.to_thread(self.queue.fail, lease, self.worker_id, str(error), segment)
+        elif output.get("end") or "story_content" not in output:
+            # The graph ended on its own (e.g. no valid story), so running it again would not help.
+            outcome, saved = "failed", await asyncio.to_thread(
+                self.queue.fail, lease, self.worker_id, "Run ended before the content was generated", segment, False
+            )
+        else:
+            result = {
+                **story_result(output),
+                "folder_path": output.get("folder_path"),
+                "run_id": lease.run_id,
+                "cost": costs.summary(),
+            }
+            outcome, saved = "succeeded", await asyncio.to_thread(self.queue.complete, lease, self.worker_id, result, segment)
+
+        if not saved:
+            outcome = "lease_lost"
+            logger.warning(f"Worker {self.worker_id} lost the lease on {lease.run_id} before handing it back")
+            workspaces.forget(lease.run_id)
+        elif outcome in ("handed_off", "retrying"):
+            # Kept for the worker that picks the run up next.
+            await asyncio.to_thread(workspaces.detach, lease.run_id)
+        else:
+            await asyncio.to_thread(workspaces.release, lease.run_id)
+        WORKER_SEGMENTS.labels(outcome).inc()
+        return outcome
@@ -1,30 +1,85 @@
+from typing import Callable, Collection, Dict, List, Optional
+
 from langgraph.graph import END, StateGraph, graph
 
 from src.langg.nodes import Nodes
 from src.utils.graph import check_story_edge
+from src.utils.limits import StageLimiter
+from src.services.run_queue import DEFAULT_POOL, StageHandoff
+from src.utils.costs import attribute_costs
+from src.utils.deadlines import NodeBudgets, enforce_deadline
+from src.utils.metrics import instrument_node
+from src.utils.tracing import trace_node
 
 class WorkFlow:
-    def __init__(self, nodes: Nodes, state_graph: StateGraph):
+    def __init__(
+        self,
+        nodes: Nodes,
+        state_graph: StateGraph,
+        entry_point: str = "choose_story",
+        stage_limiter: Optional[StageLimiter] = None,
+        stage_pools: Optional[Dict[str, str]] = None,
+        pools: Optional[Collection[str]] = None,
+        node_budgets: Optional[NodeBudgets] = None,
+    ):
         self.nodes = nodes
         self.workflow_app = state_graph
+        self.entry_point = entry_point
+        self.stage_limiter = stage_limiter
+        # Worker pool of each stage; with `pools` set, stages of other pools raise StageHandoff instead of running.
+        self.stage_pools = stage_pools or {}
+        self.pools = pools
+        self.node_budgets = node_budgets
         self.app: graph.CompiledGraph
 
         self._compile_workflow()
 
+    def _wrap_node(self, name: str, node: Callable, downstream: List[str]) -> Callable:
+        pool = self.stage_pools.get(name, DEFAULT_POOL)
+        if self.pools is not None and pool not in self.pools:
+            async def hand_off(state):
+                raise StageHandoff(name, pool, dict(state))
+
+            return hand_off
+
+        # Metrics and budgets wrap the node itself, so time spent queueing for a stage slot is not
+        # counted as node latency (it still counts against the run deadline).
+        optional = getattr(node, "optional", False)
+        node = attribute_costs(name, node)
+        if self.node_budgets is not None and name != "clean_up_temp":
+            node = enforce_deadline(name, node, self.node_budgets, optional, downstream)
+        node = instrument_node(name, node)
+        if self.stage_limiter is not None:
+            node = self.stage_limiter.wrap(name, node)
+        return trace_node(name, node)
+
     def _compile_workflow(self):
 
         # NODES
-        self.workflow_app.add_node("choose_story", self.nodes.choose_story)
-        self.workflow_app.add_node("check_story", self.nodes.check_story)
-        self.workflow_app.add_node("verify_path_and_create_folder", self.nodes.verify_path_and_create_folder)
-        self.workflow_app.add_node("get_story", self.nodes.get_story)
-        self.workflow_app.add_node("get_midjourney_prompts", self.nodes.get_midjourney_prompts)
-        self.workflow_app.add_node("get_mj_images", self.nodes.get_mj_images)
-        self.workflow_app.add_node("get_story_audio", self.nodes.get_story_audio)
-        self.workflow_app.add_node("get_subtitles", self.nodes.get_subtitles)
-        self.workflow_app.add_node("create_json", self.nodes.create_json)
-        self.workflow_app.add_node("move_files", self.nodes.move_files)
-        self.workflow_app.add_node("clean_up_temp", self.nodes.clean_up_node)
+        nodes = {
+            "choose_story": self.nodes.choose_story,
+            "check_story": self.nodes.check_story,
+            "verify_path_and_create_folder": self.nodes.verify_path_and_create_folder,
+            "get_story": self.nodes.get_story,
+            "get_midjourney_prompts": self.nodes.get_midjourney_prompts,
+            "get_mj_images": self.nodes.get_mj_images,
+            "process_images": self.nodes.process_images,
+            "get_story_audio": self.nodes.get_story_audio,
+            "get_subtitles": self.nodes.get_subtitles,
+            "render_video": self.nodes.render_video,
+            "create_json": self.nodes.create_json,
+            "move_files": self.nodes.move_files,
+            "write_manifest": self.nodes.write_manifest,
+            "clean_up_temp": self.nodes.clean_up_node,
+        }
+        # Required stages after each one, whose typical latency optional stages must leave room for.
+        order = list(nodes)
+        for index, (name, node) in enumerate(nodes.items()):
+            downstream = [
+                stage for stage in order[index + 1:]
+                if stage != "clean_up_temp" and not getattr(nodes[stage], "optional", False)
+            ]
+            self.workflow_app.add_node(name, self._wrap_node(name, node, downstream))
 
         # EDGES
         self.workflow_app.add_conditional_edges(
@@ -59,6 +114,11 @@ class WorkFlow:
         self.workflow_app.add_conditional_edges(
             "get_mj_images",
             lambda x: x.get("end", False),
+            {True: "clean_up_temp", False: "process_images"},
+        )
+        self.workflow_app.add_conditional_edges(
+            "process_images",
+            lambda x: x.get("end", False),
             {True: "clean_up_temp", False: "get_story_audio"},
         )
         self.workflow_app.add_conditional_edges(
@@ -69,6 +129,11 @@ class WorkFlow:
         self.workflow_app.add_conditional_edges(
             "get_subtitles",
             lambda x: x.get("end", False),
+            {True: "clean_up_temp", False: "render_video"},
+        )
+        self.workflow_app.add_conditional_edges(
+            "render_video",
+            lambda x: x.get("end", False),
             {True: "clean_up_temp", False: "create_json"},
         )
         self.workflow_app.add_conditional_edges(
@@ -76,10 +141,15 @@ class WorkFlow:
             lambda x: x.get("end", False),
             {True: "clean_up_temp", False: "move_files"},
         )
+        self.workflow_app.add_conditional_edges(
+            "move_files",
+            lambda x: x.get("end", False),
+            {True: "clean_up_temp", False: "write_manifest"},
+        )
         
-        self.workflow_app.add_edge("move_files", "clean_up_temp")
+        self.workflow_app.add_edge("write_manifest", "clean_up_temp")
         self.workflow_app.add_edge("clean_up_temp", END)
 
-        self.workflow_app.set_entry_point("choose_story")
+        self.workflow_app.set_entry_point(self.entry_point)
 
         self.app = self.workflow_app.compile()
\ No newline at end of file
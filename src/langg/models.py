@@ -14,6 +14,9 @@ class ChooseStory(BaseModel):
     recommend_narrator_genre: str
     carpet_name: str = Field(alias="carpet_name_es", description="This is the name of the carpet in Spanish, based on story_title use only three words.")
 
+class ChooseStories(BaseModel):
+    stories: list[ChooseStory]
+
 class CheckStory(BaseModel):
     story_title: str
     is_story_done: bool
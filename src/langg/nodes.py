@@ -1,21 +1,36 @@
+import os
 import json
-import random
+import asyncio
+import hashlib
 import shutil
 import requests
+from contextlib import nullcontext
 from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 from loguru import logger
 
 from src.core.settings import Settings
 from src.langg.state import ContentState
 from src.utils.nodes import required_node, optional_node
+from src.utils.artifacts import hashed_open, media_type_for, record_file
+from src.utils.mp3 import split_frames
 from src.services.pchain.chainable import MinimalChainable
 from src.services.localfile_service import LocalFileService
 from src.services.elevenlabs_service import ElevenLabsService
 from src.services.subtitle_generator import SubtitleGenerator
+from src.services.image_processor import ImageProcessor
+from src.services.image_cache import ImageCache
+from src.services.workspace import WorkspaceManager
+from src.services.video_renderer import VideoRenderer
 from src.services.pchain.chain_prompt_manager import ChainPromptManager
+from src.utils.metrics import MJ_CACHE_REQUESTS, MJ_NEAR_DUPLICATES, directory_size
+from src.utils.scheduler import ProviderScheduler
+from src.utils.deadlines import time_left, within_deadline
 from src.langg.models import (
     ExceptionDict,
     ChooseStory,
+    ChooseStories,
     CheckStory,
     StoryContent,
     MidjourneyPrompts
@@ -31,6 +46,11 @@ class Nodes:
         elevenlabs_service: ElevenLabsService,
         subtitle_generator: SubtitleGenerator,
         local_file_service: LocalFileService,
+        image_processor: ImageProcessor,
+        video_renderer: VideoRenderer,
+        image_cache: Optional[ImageCache] = None,
+        scheduler: Optional[ProviderScheduler] = None,
+        workspaces: Optional[WorkspaceManager] = None,
     ) -> None:
         self.settings = settings
         self.chain_prompt_manager = chain_prompt_manager
@@ -38,9 +58,19 @@ class Nodes:
         self.elevenlabs_service = elevenlabs_service
         self.subtitle_generator = subtitle_generator
         self.local_file_service = local_file_service
+        self.image_processor = image_processor
+        self.video_renderer = video_renderer
+        self.image_cache = image_cache
+        self.scheduler = scheduler
+        self.workspaces = workspaces
 
         self.mj_interactive_endpoint = f"{settings.MJ_INTERACTIVE_API}/generate_images"
 
+    @staticmethod
+    def _workspace(state: ContentState) -> str:
+        """Per-run working directory; runs without one share the legacy `temp/` folder."""
+        return state.get("workspace") or "temp"
+
     # @required_node()
     async def choose_story(self, state: ContentState):
         logger.info("Choosing story...")
@@ -48,6 +78,7 @@ class Nodes:
         choose_story_prompts =  self.chain_prompt_manager.get_prompt_chain("choose_story")
 
         choose_story_responses = await self.minimal_chainable.run(
+            chain="choose_story",
             prompts=choose_story_prompts,
             client="deepseek",
             model="deepseek-reasoner",
@@ -58,6 +89,7 @@ class Nodes:
 
         parse_story_prompts =  self.chain_prompt_manager.get_prompt_chain("parse_output")
         parse_story_responses = await self.minimal_chainable.run(
+            chain="parse_output",
             prompts=parse_story_prompts,
             client="deepseek",
             model="deepseek-chat",
@@ -77,12 +109,67 @@ class Nodes:
 
         return state
     
+    async def choose_stories(self, stories_done: List[str], count: int) -> List[ChooseStory]:
+        """
+        Pick `count` new stories in a single selection step, for batch runs. Titles already
+        done or repeated within the batch are dropped and carpet names are made unique, so
+        fewer than `count` stories may come back.
+        """
+        logger.info(f"Choosing {count} stories...")
+
+        choose_stories_responses = await self.minimal_chainable.run(
+            chain="choose_stories",
+            prompts=self.chain_prompt_manager.get_prompt_chain("choose_stories"),
+            client="deepseek",
+            model="deepseek-reasoner",
+            context={
+                "stories_count": count,
+                "stories_done_list": stories_done
+            }
+        )
+
+        parse_stories_responses = await self.minimal_chainable.run(
+            chain="parse_output",
+            prompts=self.chain_prompt_manager.get_prompt_chain("parse_output"),
+            client="deepseek",
+            model="deepseek-chat",
+            context={
+                "input_string": choose_stories_responses[0].response,
+                "output_format": ChooseStories.model_json_schema()
+            },
+            returns_model={
+                0: ChooseStories
+            }
+        )
+
+        seen_titles = {title.strip().casefold() for title in stories_done}
+        carpet_names = set()
+        chosen: List[ChooseStory] = []
+        for story in parse_stories_responses[0].response.stories:
+            title = story.story_title.strip().casefold()
+            if title in seen_titles:
+                continue
+            seen_titles.add(title)
+
+            carpet_name, suffix = story.carpet_name, 2
+            while carpet_name.casefold() in carpet_names:
+                carpet_name = f"{story.carpet_name} {suffix}"
+                suffix += 1
+            carpet_names.add(carpet_name.casefold())
+            story.carpet_name = carpet_name
+
+            chosen.append(story)
+
+        logger.info(f"Stories chosen: {[story.story_title for story in chosen[:count]]}")
+        return chosen[:count]
+
     async def check_story(self, state: ContentState):
         logger.info("Checking story...")
 
         check_story_prompts =  self.chain_prompt_manager.get_prompt_chain("check_story")
 
         check_story_responses = await self.minimal_chainable.run(
+            chain="check_story",
             prompts=check_story_prompts,
             client="deepseek",
             model="deepseek-chat",
@@ -111,6 +198,7 @@ class Nodes:
             raise Exception(f"Could not create folder {state['main_path']}/{state['story_carpet_name']}")
         
         state["folder_path"] = folder_path
+        os.makedirs(self._workspace(state), exist_ok=True)
         logger.info(f"Folder created: {folder_path}")
 
         return state
@@ -121,6 +209,7 @@ class Nodes:
 
         story_content_prompts = self.chain_prompt_manager.get_prompt_chain("get_story")
         story_content_responses = await self.minimal_chainable.run(
+            chain="get_story",
             prompts=story_content_prompts,
             model="deepseek-reasoner",
             client="deepseek",
@@ -131,6 +220,7 @@ class Nodes:
 
         parse_story_prompts =  self.chain_prompt_manager.get_prompt_chain("parse_output")
         parse_story_responses = await self.minimal_chainable.run(
+            chain="parse_output",
             prompts=parse_story_prompts,
             client="deepseek",
             model="deepseek-chat",
@@ -143,7 +233,22 @@ class Nodes:
             }
         )
 
-        state["story_content"] = parse_story_responses[0].response.story_content_spanish
+        story = parse_story_responses[0].response
+        contents = {"es": story.story_content_spanish, "en": story.story_content_english}
+        primary = self.settings.PRIMARY_LANGUAGE
+        if not contents[primary].strip():
+            # Every later stage needs the primary track, so there is nothing to salvage.
+            logger.error(f"Story {state['story_title']!r} came back without its {primary} text; ending the run")
+            state["end"] = True
+            return state
+
+        state["story_content"] = contents[primary]
+        state["story_contents"] = {
+            language: contents[language]
+            for language in self.settings.OUTPUT_LANGUAGES
+            if contents.get(language)
+        }
+        state["narrator_genre"] = story.recommend_narrator_genre
         logger.info("Got story content!")
 
         return state
@@ -155,6 +260,7 @@ class Nodes:
         midjourney_prompts = self.chain_prompt_manager.get_prompt_chain("get_midjourney_prompts")
 
         midjourney_prompts_responses = await self.minimal_chainable.run(
+            chain="get_midjourney_prompts",
             prompts=midjourney_prompts,
             model="deepseek-chat",
             client="deepseek",
@@ -170,79 +276,328 @@ class Nodes:
         logger.info("Got midjourney prompts!")
 
         return state
-    
-    @required_node()
-    def get_mj_images(self, state: ContentState):
-        logger.info("Getting midjourney images...")
 
-        res = requests.post(
-            url=self.mj_interactive_endpoint,
-            json={
-                "prompts_data": {
-                    "directory": str(Path("temp").absolute()),
-                    "img_prompts": state["midjourney_prompts"]
-                },
-                "encrypted_cookies": None,
-                "key": None
+    async def batch_midjourney_prompts(
+        self, stories: List[str], client: str = "openai", model: str = "gpt-4o"
+    ) -> List[Optional[List[dict]]]:
+        """
+        Midjourney prompts for many story contents at once through the provider batch API, for
+        background regeneration; None for the stories whose request failed.
+        """
+        logger.info(f"Getting midjourney prompts for {len(stories)} stories in a batch...")
+
+        responses = await self.minimal_chainable.run_batch(
+            client=client,
+            model=model,
+            prompts=self.chain_prompt_manager.get_prompt_chain("get_midjourney_prompts"),
+            contexts=[{"story": story} for story in stories],
+            returns_model={
+                0: MidjourneyPrompts
             }
         )
+
+        return [
+            None if response[0].error is not None else response[0].response.model_dump()["prompts"]
+            for response in responses
+        ]
+
+    async def _generate_images(self, directory: str, prompts: List[Dict[str, Any]]) -> None:
+        # The Midjourney slot is awaited on the event loop, so queued runs do not hold worker threads.
+        async with (
+            within_deadline("Midjourney request"),
+            self.scheduler.slot("midjourney") if self.scheduler is not None else nullcontext(),
+        ):
+            # The thread cannot be cancelled, so the request itself also gives up at the deadline.
+            remaining = time_left()
+            res = await asyncio.to_thread(
+                requests.post,
+                timeout=None if remaining is None else max(remaining, 1),
+                url=self.mj_interactive_endpoint,
+                json={
+                    "prompts_data": {
+                        "directory": str(Path(directory).absolute()),
+                        "img_prompts": prompts
+                    },
+                    "encrypted_cookies": None,
+                    "key": None
+                }
+            )
         if res.status_code != 200:
             raise Exception(f"Error generating images: {res.text}")
 
+    def _serve_cached_images(self, prompts: List[Dict[str, Any]], workspace: str) -> List[Dict[str, Any]]:
+        """
+        Link the images of prompts already in the image cache into the workspace; returns the
+        prompts still to generate. Images are named `mj_<prompt_num>_<n>` so their sorted order
+        stays the prompt order whether they were cached or generated.
+        """
+        missing = []
+        for prompt in prompts:
+            key = self.image_cache.make_key(prompt["prompt"])
+            if self.image_cache.serve(key, workspace, f"mj_{prompt['prompt_num']:02}") is None:
+                missing.append(prompt)
+        MJ_CACHE_REQUESTS.labels(outcome="hit").inc(len(prompts) - len(missing))
+        MJ_CACHE_REQUESTS.labels(outcome="miss").inc(len(missing))
+        return missing
+
+    def _cache_generated_images(self, state: ContentState, workspace: str, staging: str, prompts: List[Dict[str, Any]]) -> bool:
+        """
+        Move the images generated into `staging` to the workspace and add them to the image cache.
+        False, leaving them in `staging`, when they cannot be matched to their prompts.
+        """
+        generated = self.image_processor.list_images(staging)
+        assigned = ImageCache.assign(generated, [prompt["prompt_num"] for prompt in prompts])
+        if assigned is None:
+            logger.warning(f"Could not match {len(generated)} images to {len(prompts)} prompts; not caching them")
+            return False
+
+        duplicates = state.get("image_duplicates") or []
+        for prompt in prompts:
+            images = []
+            for n, image in enumerate(assigned[prompt["prompt_num"]]):
+                destination = os.path.join(workspace, f"mj_{prompt['prompt_num']:02}_{n}{Path(image).suffix.lower()}")
+                shutil.move(image, destination)
+                images.append(destination)
+
+            found = self.image_cache.store(self.image_cache.make_key(prompt["prompt"]), prompt["prompt"], images)
+            for duplicate in found:
+                logger.warning(
+                    f"{duplicate['image']} is a near duplicate ({duplicate['distance']} bits) of an image "
+                    f"for another prompt: {duplicate['prompt']!r}"
+                )
+            MJ_NEAR_DUPLICATES.inc(len(found))
+            duplicates.extend({"prompt_num": prompt["prompt_num"], **duplicate} for duplicate in found)
+        state["image_duplicates"] = duplicates
+        return True
+
+    def _move_generated_images(self, workspace: str, staging: str) -> None:
+        """Move unmatched images to the workspace as `mj_<n>`, keeping the order the server gave them."""
+        for n, image in enumerate(self.image_processor.list_images(staging)):
+            shutil.move(image, os.path.join(workspace, f"mj_{n:03}{Path(image).suffix.lower()}"))
+
+    @staticmethod
+    def _discard_served_images(workspace: str, staging: str) -> None:
+        for image in Path(workspace).glob("mj_*"):
+            image.unlink(missing_ok=True)
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+    @staticmethod
+    def _record_images(state: ContentState, workspace: str) -> None:
+        # Images are written by the Midjourney server, so they are the only artifacts hashed by reading them back.
+        artifacts = state.setdefault("artifacts", [])
+        for image in sorted(Path(workspace).glob("*")):
+            if image.is_file() and media_type_for(str(image)).startswith("image/"):
+                artifacts.append(record_file(str(image)))
+
+    @required_node()
+    async def get_mj_images(self, state: ContentState):
+        logger.info("Getting midjourney images...")
+        workspace = self._workspace(state)
+        prompts = state["midjourney_prompts"]
+
+        if self.image_cache is None:
+            await self._generate_images(workspace, prompts)
+        else:
+            missing = await asyncio.to_thread(self._serve_cached_images, prompts, workspace)
+            if not missing:
+                logger.info(f"All {len(prompts)} midjourney prompts served from the image cache")
+            else:
+                # Generated in a staging folder so the new files can be told apart.
+                staging = os.path.join(workspace, ".mj")
+                os.makedirs(staging, exist_ok=True)
+                try:
+                    await self._generate_images(staging, missing)
+                    cached = await asyncio.to_thread(self._cache_generated_images, state, workspace, staging, missing)
+                    if not cached and len(missing) < len(prompts):
+                        # Unmatched images cannot be ordered among the cached ones, so every prompt is generated afresh.
+                        logger.warning("Discarding the images served from the cache and generating every prompt")
+                        await asyncio.to_thread(self._discard_served_images, workspace, staging)
+                        await self._generate_images(staging, prompts)
+                        cached = await asyncio.to_thread(self._cache_generated_images, state, workspace, staging, prompts)
+                    if not cached:
+                        await asyncio.to_thread(self._move_generated_images, workspace, staging)
+                finally:
+                    shutil.rmtree(staging, ignore_errors=True)
+
+        await asyncio.to_thread(self._record_images, state, workspace)
         logger.info("Got midjourney images!")
         return state
-    
+
+    @staticmethod
+    def _choose_voice(state: ContentState) -> str:
+        """Voice from the recommended narrator genre, else stable per story title so TTS cache hits are possible."""
+        genre = (state.get("narrator_genre") or "").strip().lower()
+        if genre.startswith(("fem", "muj", "wom")):
+            return "female"
+        if genre.startswith(("male", "masc", "homb", "man")):
+            return "male"
+
+        digest = hashlib.sha256(state["story_title"].encode("utf-8")).digest()
+        return ["female", "male"][digest[0] % 2]
+
+    @optional_node()
+    def process_images(self, state: ContentState):
+        logger.info("Processing midjourney images...")
+
+        workspace = self._workspace(state)
+        images = self.image_processor.list_images(workspace)
+        records = self.image_processor.process_images(images, f"{workspace}/derived")
+        if records is None:
+            raise Exception("Could not process images")
+
+        state.setdefault("artifacts", []).extend(records)
+        state["derived_images"] = [record["path"] for record in records]
+        logger.info(f"Processed {len(images)} images into {len(records)} derived files!")
+
+        return state
+
+    async def _synthesize_track(self, state: ContentState, language: str, voice: str) -> Dict[str, Any]:
+        folder = f"{self._workspace(state)}/{language}"
+        os.makedirs(folder, exist_ok=True)
+        filename = f"{folder}/{state['story_carpet_name']}.mp3"
+
+        if self.settings.ELEVENLABS_CHUNKED:
+            audio_chunks = await self.elevenlabs_service.get_speech_on_file_chunked(
+                filename=filename,
+                text=state["story_contents"][language],
+                voice=voice,
+                artifacts=state.setdefault("artifacts", []),
+            )
+            if audio_chunks is None:
+                raise Exception(f"Could not generate {language} audio")
+
+            logger.info(f"Got {language} audio in {len(audio_chunks)} chunks!")
+            return {"audio_file": filename, "audio_chunks": audio_chunks}
+
+        audio = await self.elevenlabs_service.get_speech_on_file(
+            filename=filename,
+            text=state["story_contents"][language],
+            voice=voice,
+            on_first_chunk=lambda filename: logger.info(f"Audio streaming into {filename}"),
+            artifacts=state.setdefault("artifacts", []),
+        )
+        if audio is None:
+            raise Exception(f"Could not generate {language} audio")
+
+        logger.info(f"Got {language} audio!")
+        return {"audio_file": audio}
+
     @required_node()
-    def get_story_audio(self, state: ContentState):
+    async def get_story_audio(self, state: ContentState):
         logger.info("Generating audio")
 
-        voices = ["female", "male"]
+        voice = self._choose_voice(state)
+        languages = list(state["story_contents"])
+        results = await asyncio.gather(*(self._synthesize_track(state, language, voice) for language in languages))
 
-        audio = self.elevenlabs_service.get_speech_on_file(
-            filename=f"temp/{state['story_carpet_name']}.mp3",
-            text=state["story_content"],
-            voice=voices[random.randint(0, 1)]
-        )
+        tracks = state.get("tracks") or {}
+        for language, track in zip(languages, results):
+            tracks[language] = {**tracks.get(language, {}), **track}
+        state["tracks"] = tracks
 
-        state["audio_file"] = audio
-        logger.info("Got story audio!")
+        primary = tracks[self.settings.PRIMARY_LANGUAGE]
+        state["audio_file"] = primary["audio_file"]
+        state["audio_chunks"] = primary.get("audio_chunks")
+
+        metrics = self.elevenlabs_service.metrics
+        if metrics["seconds"] > 0:
+            logger.info(f"TTS throughput so far: {metrics['bytes'] / metrics['seconds'] / 1024:.1f} KiB/s")
 
         return state
     
-    @optional_node()
-    def get_subtitles(self, state: ContentState):
-        logger.info("Generating subtitles")
-
+    def _transcribe_track(self, state: ContentState, language: str) -> Dict[str, Any]:
+        audio_file = state["tracks"][language]["audio_file"]
+        word_timings = self.subtitle_generator.get_word_timings(audio_file, language=language)
         subtitles_file = self.subtitle_generator.get_subtitles(
-            audio_file=state["audio_file"],
+            audio_file=audio_file,
             str_name=state["story_carpet_name"],
-            segment_type="word"
+            segment_type="word",
+            artifacts=state.setdefault("artifacts", []),
+            timings=word_timings,
+            output_dir=f"{self._workspace(state)}/{language}",
         )
 
         if subtitles_file is None:
-            raise Exception("Could not generate subtitles")
+            raise Exception(f"Could not generate {language} subtitles")
+
+        return {"subtitles_file": subtitles_file, "word_timings": word_timings}
 
-        state["subtitles_file"] = subtitles_file
+    @optional_node()
+    async def get_subtitles(self, state: ContentState):
+        logger.info("Generating subtitles")
+
+        # Whisper releases the GIL, so the languages share the warm model from worker threads.
+        languages = list(state["tracks"])
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self._transcribe_track, state, language) for language in languages)
+        )
+        for language, track in zip(languages, results):
+            state["tracks"][language].update(track)
+
+        primary = state["tracks"][self.settings.PRIMARY_LANGUAGE]
+        state["subtitles_file"] = primary["subtitles_file"]
+        state["word_timings"] = primary["word_timings"]
         logger.info("Got subtitles!")
 
         return state
+
+    @optional_node()
+    def render_video(self, state: ContentState):
+        logger.info("Rendering video")
+
+        audio_file = state["audio_file"]
+        duration = next(
+            (record["duration"] for record in state.get("artifacts", []) if record["path"] == audio_file and record.get("duration")),
+            None,
+        )
+        if duration is None:
+            with open(audio_file, "rb") as f:
+                _, duration = split_frames(f.read())
+
+        workspace = self._workspace(state)
+        if self.workspaces is not None:
+            # Segments plus the final video take about as much as the images and audio they encode.
+            self.workspaces.ensure_space(state.get("run_id") or workspace, 2 * directory_size(workspace))
+        video_file = f"{workspace}/{state['story_carpet_name']}.mp4"
+        stats = self.video_renderer.render(
+            images=self.image_processor.list_images(workspace),
+            audio_file=audio_file,
+            duration=duration,
+            output=video_file,
+            workdir=f"{workspace}/.render",
+            timings=state.get("word_timings"),
+        )
+        if stats is None:
+            raise Exception("Could not render video")
+
+        shutil.rmtree(f"{workspace}/.render", ignore_errors=True)
+        state.setdefault("artifacts", []).append({**record_file(video_file), "duration": duration})
+        state["video_file"] = video_file
+        state["render_stats"] = stats
+        logger.info(
+            f"Rendered {stats['segments']} segments in {stats['render_seconds']:.1f}s "
+            f"(real-time factor {stats['real_time_factor']:.2f})"
+        )
+
+        return state
     
     @required_node()
     def create_json(self, state: ContentState):
         logger.info("Creating json")
 
-        if not self.local_file_service.create_empty_file(path="/temp",file_name="story.json"):
-            raise Exception("Could not create json file")
-        
         json_data = {
             "story_title": state["story_title"],
             "story_content": state["story_content"],
+            "story_contents": state.get("story_contents", {}),
             "midjourney_prompts": state["midjourney_prompts"],
         }
-        with open(f"temp/story.json", "w", encoding="utf-8") as f:
-            json.dump(json_data, f, ensure_ascii=False)
+        json_file = f"{self._workspace(state)}/story.json"
+        with hashed_open(json_file) as f:
+            f.write(json.dumps(json_data, ensure_ascii=False))
 
-        state["json_file"] = "/temp/story.json"
+        state.setdefault("artifacts", []).append(f.record(json_file))
+        state["json_file"] = json_file
 
         return state
     
@@ -250,21 +605,55 @@ class Nodes:
     def move_files(self, state: ContentState):
         logger.info("Moving files")
 
-        if not self.local_file_service.move_all_files(src_folder="temp", dest_folder=state["folder_path"]):
+        if not self.local_file_service.publish_folder(src_folder=self._workspace(state), dest_folder=state["folder_path"]):
             raise Exception("Could not move files")
         
         logger.info("Moved files!")
 
         return state
 
+    @required_node()
+    def write_manifest(self, state: ContentState):
+        logger.info("Writing manifest")
+
+        artifacts = []
+        for record in state.get("artifacts", []):
+            artifacts.append({**record, "path": Path(os.path.relpath(record["path"], self._workspace(state))).as_posix()})
+
+        manifest = {
+            "story_title": state["story_title"],
+            "folder": os.path.basename(state["folder_path"]),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "artifacts": artifacts,
+        }
+        manifest_file = f"{state['folder_path'].rstrip('/')}.manifest.json"
+        data = json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
+        if not self.local_file_service.write_file_atomic(manifest_file, data):
+            raise Exception(f"Could not write manifest {manifest_file}")
+
+        state["manifest_file"] = manifest_file
+        logger.info(f"Manifest written: {manifest_file}")
+
+        return state
+
     def clean_up_node(self, state: ContentState):
         logger.info("Cleaning up")
-        temp_path = Path("temp")
+        run_id = state.get("run_id")
+        if self.workspaces is not None and run_id and state.get("workspace") == self.workspaces.path_for(run_id):
+            self.workspaces.release(run_id)
+            return state
 
+        temp_path = Path(self._workspace(state))
         for f in temp_path.glob("*"):
+            # The legacy shared folder also holds other runs' workspaces.
+            if not state.get("workspace") and (f.name.startswith(".") or (self.workspaces and self.workspaces.is_leased(f.name))):
+                continue
             if f.is_dir():
                 shutil.rmtree(f)
             elif f.is_file():
                 f.unlink()
 
+        if state.get("workspace"):
+            shutil.rmtree(temp_path, ignore_errors=True)
+
         return state
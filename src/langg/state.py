@@ -2,13 +2,30 @@ from typing_extensions import TypedDict, List, Dict, Any, Optional
 
 class ContentState(TypedDict):
     main_path: str
+    run_id: Optional[str] = None
+    workspace: Optional[str] = None
+    priority: Optional[str] = None
+    deadline: Optional[float] = None
+    deadline_misses: Optional[List[Dict[str, Any]]] = None
+    end: Optional[bool] = None
     stories_done: List[str]
     story_title: str
     story_carpet_name: str
     valid_story: bool
     folder_path: str
     story_content: str
+    story_contents: Dict[str, str]
+    tracks: Dict[str, Dict[str, Any]]
+    narrator_genre: Optional[str] = None
     midjourney_prompts: List[Dict[str, Any]]
+    derived_images: Optional[List[str]] = None
+    image_duplicates: Optional[List[Dict[str, Any]]] = None
     audio_file: str
+    audio_chunks: Optional[List[Dict[str, Any]]] = None
     subtitles_file: Optional[str] = None
-    json_file: str
\ No newline at end of file
+    word_timings: Optional[Any] = None
+    video_file: Optional[str] = None
+    render_stats: Optional[Dict[str, Any]] = None
+    json_file: str
+    artifacts: List[Dict[str, Any]]
+    manifest_file: Optional[str] = None
\ No newline at end of file
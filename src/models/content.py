@@ -1,5 +1,27 @@
+import os
+from typing import Literal, Optional
+
 from pydantic import BaseModel, Field
 
 class GenerateInput(BaseModel):
     stories_done: list[str] = Field(description="List of stories already generated. (e.g. ['story_title_1', 'story_title_2', ...])")
-    directory: str = Field(description="Complete path to the directory where the content will be saved. (e.g. C:/Users/Brayan/Desktop/content)")
\ No newline at end of file
+    directory: str = Field(description="Complete path to the directory where the content will be saved. (e.g. C:/Users/Brayan/Desktop/content)")
+    profile: bool = Field(default=False, description="Capture a sampling profile of the run and return the flamegraph location.")
+    priority: Optional[Literal["interactive", "background"]] = Field(
+        default=None,
+        description="Priority of the run's provider calls. Defaults to interactive, or background for POST /content/runs.",
+    )
+
+    def normalized(self) -> dict:
+        """Canonical form used to spot duplicate requests: order, case and padding of titles do not matter."""
+        return {
+            "stories_done": sorted({story.strip().casefold() for story in self.stories_done}),
+            "directory": os.path.normpath(self.directory.strip()),
+            "profile": self.profile,
+        }
+
+class BatchGenerateInput(BaseModel):
+    count: int = Field(ge=1, description="Number of distinct stories to generate.")
+    stories_done: list[str] = Field(description="List of stories already generated. (e.g. ['story_title_1', 'story_title_2', ...])")
+    directory: str = Field(description="Complete path to the directory where the content will be saved. (e.g. C:/Users/Brayan/Desktop/content)")
+    priority: Literal["interactive", "background"] = Field(default="background", description="Priority of the stories' provider calls.")
@@ -1,23 +1,50 @@
+import os
+import json
+import time
+import uuid
+import asyncio
 import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
 
-from src.langg.nodes import Nodes
-from src.langg.graph import WorkFlow
-from src.langg.graph import StateGraph
-from src.core.settings import Settings
-from src.langg.state import ContentState
-from src.models.content import GenerateInput
-from src.services.pchain.chainable import MinimalChainable
-from src.services.localfile_service import LocalFileService
-from src.services.elevenlabs_service import ElevenLabsService
-from src.services.subtitle_generator import SubtitleGenerator
-from src.services.pchain.chain_prompt_manager import ChainPromptManager
+from src.core.services import get_services
+from src.services.workspace import WorkspaceQuotaExceeded
+from src.utils.events import ProgressTracker, format_sse
+from src.utils.graph import story_result
+from src.utils.singleflight import KeyConflict, fingerprint
+from src.utils.costs import track_costs
+from src.utils.scheduler import BACKGROUND, INTERACTIVE, run_priority
+from src.utils.deadlines import deadline_at
+from src.utils.metrics import RUNS_IN_FLIGHT
+from src.utils.tracing import start_span
+from src.utils.profiling import RunProfiler
+from src.models.content import GenerateInput, BatchGenerateInput
 
 logger = logging.getLogger(__name__)
 
 content_router = APIRouter(tags=["content"], prefix="/content")
 
+# Progress of recent streamed runs, by run id, so their artifacts can be downloaded.
+MAX_TRACKED_RUNS = 256
+SSE_KEEPALIVE_SECONDS = 15
+_runs: "OrderedDict[str, ProgressTracker]" = OrderedDict()
+_background_runs = set()
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+async def acquire_workspace(run_id: str) -> str:
+    """Lease a new workspace for the run, or answer 507 while the workspaces are over quota."""
+    try:
+        return await asyncio.to_thread(get_services().workspaces.acquire, run_id)
+    except WorkspaceQuotaExceeded as e:
+        raise HTTPException(status.HTTP_507_INSUFFICIENT_STORAGE, str(e), headers={"Retry-After": "60"})
+
 
 @content_router.post(
     "/generate",
@@ -31,31 +58,275 @@ content_router = APIRouter(tags=["content"], prefix="/content")
         },
     },
 )
-async def generate_content(body: GenerateInput):
+async def generate_content(
+    body: GenerateInput,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None),
+):
     logger.info("Generate Content request received!")
-    settings = Settings()
-    chain_prompt_manager = ChainPromptManager()
-    minimal_chainable = MinimalChainable(settings)
-    local_file_service = LocalFileService()
-    elevenlabs_service = ElevenLabsService(settings)
-    subtitle_generator = SubtitleGenerator()
-
-    nodes = Nodes(
-        settings=settings,
-        chain_prompt_manager=chain_prompt_manager,
-        minimal_chainable=minimal_chainable,
-        elevenlabs_service=elevenlabs_service,
-        subtitle_generator=subtitle_generator,
-        local_file_service=local_file_service,
-    )
-    workflow = WorkFlow(nodes, StateGraph(ContentState))
-    output = await workflow.app.ainvoke(input={"stories_done": body.stories_done, "main_path": body.directory})
+    services = get_services()
 
+    # Duplicates (same Idempotency-Key, or the same normalized body) share one run.
+    body_hash = fingerprint(body.normalized())
+    key = f"idempotency:{idempotency_key}" if idempotency_key else f"body:{body_hash}"
+    try:
+        data, outcome = await services.single_flight.run(
+            key,
+            lambda: run_generation(body),
+            body_hash=body_hash,
+        )
+    except KeyConflict as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+
+    logger.info(f"Generate Content request {outcome} ({key})")
+    response.headers["X-Single-Flight"] = outcome
     return {
         "message": "Success. Content generated on directory destiny successfully!",
-        "data": {
-            "story_title": output["story_title"],
-            "story_content": output["story_content"],
-            "midjourney_prompts": output["midjourney_prompts"],
-        }
-    }
\ No newline at end of file
+        "data": data
+    }
+
+
+def run_deadline(priority: str) -> Optional[float]:
+    seconds = get_services().settings.RUN_DEADLINE_SECONDS.get(priority)
+    return None if seconds is None else time.time() + seconds
+
+
+def run_input(body: GenerateInput, run_id: str, priority: str = INTERACTIVE) -> Dict[str, Any]:
+    priority = body.priority or priority
+    return {
+        "stories_done": body.stories_done,
+        "main_path": body.directory,
+        "run_id": run_id,
+        "workspace": get_services().workspaces.path_for(run_id),
+        "priority": priority,
+        "deadline": run_deadline(priority),
+    }
+
+
+async def run_generation(body: GenerateInput) -> Dict[str, Any]:
+    services = get_services()
+    if services.settings.RUN_EXECUTION == "queue":
+        return await run_queued(body)
+
+    workflow = services.workflow()
+    run_id = new_run_id()
+    await acquire_workspace(run_id)
+    profiler = RunProfiler(body.profile, services.settings.PROFILE_DIR, run_id)
+    try:
+        with (
+            RUNS_IN_FLIGHT.track_inprogress(),
+            start_span("content run", {"run_id": run_id}),
+            profiler,
+            track_costs(services.settings.RUN_BUDGET_USD) as costs,
+            run_priority(body.priority or INTERACTIVE),
+        ):
+            output = await workflow.app.ainvoke(input=run_input(body, run_id))
+    finally:
+        await asyncio.to_thread(services.workspaces.release, run_id)
+
+    result = {**story_result(output), "run_id": run_id, "cost": costs.summary()}
+    if profiler.path is not None:
+        result["profile"] = f"{content_router.prefix}/profiles/{run_id}"
+    return result
+
+
+async def run_queued(body: GenerateInput) -> Dict[str, Any]:
+    """Run on the worker processes and wait for the result."""
+    services = get_services()
+    run_id = new_run_id()
+    await asyncio.to_thread(services.run_queue.enqueue, run_input(body, run_id), run_id=run_id)
+    run = await services.run_queue.wait(run_id, services.settings.RUN_QUEUE_POLL_SECONDS)
+    if run["status"] != "succeeded":
+        raise Exception(f"Run {run_id} failed: {run['error']}")
+    return run["result"]
+
+
+@content_router.post("/runs", status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_run(body: GenerateInput):
+    """Queue a run for the workers; poll GET /content/runs/{run_id} for its result."""
+    run_id = new_run_id()
+    await asyncio.to_thread(get_services().run_queue.enqueue, run_input(body, run_id, BACKGROUND), run_id=run_id)
+    return {"run_id": run_id, "status": "queued", "url": f"{content_router.prefix}/runs/{run_id}"}
+
+
+@content_router.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    run = await asyncio.to_thread(get_services().run_queue.get, run_id)
+    if run is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Unknown run")
+    return run
+
+
+@content_router.post(
+    "/generate/batch",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {
+            "description": "One JSON line per story, in completion order.",
+            "content": {
+                "application/x-ndjson": {"example": {}}
+            },
+        },
+    },
+)
+async def generate_content_batch(body: BatchGenerateInput):
+    logger.info(f"Generate Content batch request received! ({body.count} stories)")
+    services = get_services()
+    settings = services.settings
+    if body.count > settings.BATCH_MAX_STORIES:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, f"count must be at most {settings.BATCH_MAX_STORIES}")
+
+    # The batch shares one deadline, counted from the request.
+    deadline = run_deadline(body.priority)
+    try:
+        with run_priority(body.priority), deadline_at(deadline):
+            stories = await services.nodes.choose_stories(body.stories_done, body.count)
+    except Exception as e:
+        raise HTTPException(status.HTTP_502_BAD_GATEWAY, f"Could not choose stories: {e}")
+
+    workflow = services.workflow("verify_path_and_create_folder")
+    stories_done = body.stories_done + [story.story_title for story in stories]
+    story_slots = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENT_STORIES)
+
+    async def run_story(index: int, story) -> dict:
+        async with story_slots:
+            run_id = new_run_id()
+            try:
+                workspace = await asyncio.to_thread(services.workspaces.acquire, run_id)
+                with (
+                    RUNS_IN_FLIGHT.track_inprogress(),
+                    start_span("content run", {"run_id": run_id, "batch_index": index}),
+                    track_costs(settings.RUN_BUDGET_USD) as costs,
+                    run_priority(body.priority),
+                ):
+                    output = await workflow.app.ainvoke(input={
+                        "stories_done": stories_done,
+                        "main_path": body.directory,
+                        "story_title": story.story_title,
+                        "story_carpet_name": story.carpet_name,
+                        "run_id": run_id,
+                        "workspace": workspace,
+                        "priority": body.priority,
+                        "deadline": deadline,
+                    })
+                return {
+                    "index": index,
+                    "status": "success",
+                    "run_id": run_id,
+                    "data": {**story_result(output), "folder_path": output.get("folder_path")},
+                    "cost": costs.summary(),
+                }
+            except Exception as e:
+                logger.error(f"Story {story.story_title} failed: {e}")
+                return {"index": index, "status": "error", "story_title": story.story_title, "error": str(e)}
+            finally:
+                await asyncio.to_thread(services.workspaces.release, run_id)
+
+    async def results():
+        for result in asyncio.as_completed([run_story(i, story) for i, story in enumerate(stories)]):
+            yield json.dumps(await result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@content_router.post(
+    "/generate/stream",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {
+            "description": "Server-sent events: run, node_start, node_end, retry, artifact, then result or error.",
+            "content": {
+                "text/event-stream": {"example": ""}
+            },
+        },
+    },
+)
+async def generate_content_stream(body: GenerateInput):
+    logger.info("Generate Content stream request received!")
+    services = get_services()
+    workflow = services.workflow()
+
+    run_id = new_run_id()
+    workspace = await acquire_workspace(run_id)
+    tracker = ProgressTracker(workspace)
+    _runs[run_id] = tracker
+    while len(_runs) > MAX_TRACKED_RUNS:
+        _runs.popitem(last=False)
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    # The run is detached from the response, so a client that disconnects does not cancel it.
+    async def run():
+        RUNS_IN_FLIGHT.inc()
+        try:
+            with (
+                start_span("content run", {"run_id": run_id}),
+                track_costs(services.settings.RUN_BUDGET_USD) as costs,
+                run_priority(body.priority or INTERACTIVE),
+            ):
+                async for event in workflow.app.astream_events(run_input(body, run_id), version="v2"):
+                    for name, data in tracker.translate(event):
+                        if name == "artifact":
+                            data["url"] = f"{content_router.prefix}/runs/{run_id}/artifacts/{data['path']}"
+                        queue.put_nowait((name, data))
+
+            output = tracker.output or {}
+            if output.get("end") or "story_content" not in output:
+                queue.put_nowait(("error", {"error": "Run ended before the content was generated"}))
+            else:
+                queue.put_nowait((
+                    "result",
+                    {**story_result(output), "folder_path": output.get("folder_path"), "cost": costs.summary()},
+                ))
+        except Exception as e:
+            logger.error(f"Run {run_id} failed: {e}")
+            queue.put_nowait(("error", {"error": str(e)}))
+        finally:
+            RUNS_IN_FLIGHT.dec()
+            await asyncio.to_thread(services.workspaces.release, run_id)
+            queue.put_nowait(None)
+
+    task = asyncio.create_task(run())
+    _background_runs.add(task)
+    task.add_done_callback(_background_runs.discard)
+
+    async def events():
+        yield format_sse("run", {"run_id": run_id})
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if item is None:
+                break
+            yield format_sse(*item)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@content_router.get("/runs/{run_id}/artifacts/{path:path}")
+async def get_run_artifact(run_id: str, path: str):
+    tracker = _runs.get(run_id)
+    if tracker is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Unknown run")
+
+    file = tracker.resolve(path)
+    if file is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Artifact not available")
+    return FileResponse(file)
+
+
+@content_router.get("/profiles/{run_id}")
+async def get_run_profile(run_id: str):
+    if not run_id.isalnum():
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Unknown profile")
+
+    path = os.path.join(get_services().settings.PROFILE_DIR, f"{run_id}.html")
+    if not os.path.isfile(path):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Unknown profile")
+    return FileResponse(path, media_type="text/html")
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from src.core.services import get_services
+
+health_router = APIRouter(tags=["health"], prefix="/health")
+
+
+@health_router.get("/live")
+async def live():
+    return {"status": "alive"}
+
+
+@health_router.get("/ready")
+async def ready():
+    readiness = get_services().readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
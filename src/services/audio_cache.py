@@ -0,0 +1,67 @@
+import json
+import hashlib
+import unicodedata
+from typing import Any, Dict, Optional
+
+from src.services.disk_cache import DiskCache, file_digest
+from src.services.localfile_service import LocalFileService
+
+
+class AudioCache(DiskCache):
+    """
+    Content-addressed store of synthesized speech.
+
+    Entries are keyed by (normalized text, voice id, model, output format) and hits
+    are hardlinked (or reflinked) into the run workspace instead of copied. Writers
+    replace files rather than rewrite them (see `hashed_open`), and hits are checked
+    against the stored checksum.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        super().__init__(directory, max_bytes, suffix=".audio")
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def make_key(self, text: str, voice_id: str, model_id: str, output_format: str) -> str:
+        payload = [self.normalize_text(text), voice_id, model_id, output_format]
+        return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def serve(self, key: str, destination: str) -> Optional[str]:
+        """
+        Link the cached audio for `key` to `destination`; returns the link method or None on a miss.
+        Entries whose data no longer matches the stored checksum (a linked copy was edited in
+        place) are dropped and count as a miss.
+        """
+        path = self.locate(key)
+        if path is None:
+            self.count(hit=False)
+            return None
+
+        meta = self.read_meta(key)
+        if meta is not None and meta.get("sha256") and file_digest(str(path)) != meta["sha256"]:
+            print(f"Dropping cached audio {path}: checksum mismatch")
+            self.discard(key)
+            self.count(hit=False)
+            return None
+
+        method = LocalFileService.link_or_copy(str(path), destination)
+        self.count(hit=method is not None)
+        return method
+
+    def store(self, key: str, source: str, meta: Optional[Dict[str, Any]] = None) -> bool:
+        """Add `source` to the cache; `meta` (e.g. its checksum record) is kept alongside."""
+        temp_path = self.temp_path_for(key)
+        try:
+            if LocalFileService.link_or_copy(source, str(temp_path)) is None:
+                raise Exception(f"Could not add {source} to the cache")
+            if meta is not None:
+                self.write_meta(key, meta)
+            self.commit(key, temp_path)
+            return True
+
+        except Exception as e:
+            print(f"Error caching audio: {e}")
+            temp_path.unlink(missing_ok=True)
+            return False
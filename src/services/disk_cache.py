@@ -0,0 +1,129 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def file_digest(path: str, algorithm: str = "sha256") -> str:
+    """Hash a file in fixed-size chunks without loading it into memory."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, algorithm).hexdigest()
+
+
+class DiskCache:
+    """
+    Size-bounded cache storing one file per entry under `directory`.
+
+    Entry mtimes are the LRU clock: hits touch the file and eviction removes the
+    least recently used entries until the total size fits in `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.metrics: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+
+    def temp_path_for(self, key: str) -> Path:
+        """A unique path next to the entry, so `commit` is a same-directory rename."""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    def locate(self, key: str) -> Optional[Path]:
+        """Path of the entry for `key`, touched for the LRU clock, without counting a hit or miss."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def count(self, hit: bool) -> None:
+        with self._lock:
+            self.metrics["hits" if hit else "misses"] += 1
+
+    def lookup(self, key: str) -> Optional[Path]:
+        path = self.locate(key)
+        self.count(path is not None)
+        return path
+
+    def commit(self, key: str, temp_path: Path) -> Path:
+        path = self.path_for(key)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.metrics["stores"] += 1
+        self.evict()
+        return path
+
+    def discard(self, key: str) -> None:
+        """Drop the entry for `key` and its sidecar, e.g. when it no longer matches its checksum."""
+        self.path_for(key).unlink(missing_ok=True)
+        self.meta_path_for(key).unlink(missing_ok=True)
+        with self._lock:
+            self.metrics["evictions"] += 1
+
+    def meta_path_for(self, key: str) -> Path:
+        path = self.path_for(key)
+        return path.with_name(f"{path.name}.meta.json")
+
+    def write_meta(self, key: str, meta: Dict[str, Any]) -> None:
+        """Small JSON sidecar stored and evicted together with the entry."""
+        temp_path = self.temp_path_for(key)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self.meta_path_for(key))
+
+    def read_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.meta_path_for(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def entries(self):
+        return [p for p in self.directory.glob(f"*/*{self.suffix}") if not p.name.startswith(".")]
+
+    def size_bytes(self) -> int:
+        total = 0
+        for path in self.entries():
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                continue
+        return total
+
+    def evict(self) -> int:
+        with self._lock:
+            stats = []
+            for path in self.entries():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                stats.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in stats)
+            evicted = 0
+            for _, size, path in sorted(stats, key=lambda entry: entry[0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                path.with_name(f"{path.name}.meta.json").unlink(missing_ok=True)
+                total -= size
+                evicted += 1
+
+            self.metrics["evictions"] += evicted
+            return evicted
@@ -1,53 +1,361 @@
-from typing import Any, Optional, List, Dict, Literal, Iterator
-
-from elevenlabs.client import ElevenLabs
+import re
+import time
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Optional, List, Dict, Literal, AsyncIterator, Callable
 
 from src.core.settings import Settings
+from src.services.audio_cache import AudioCache
+from src.utils.mp3 import FrameCounter, audio_frames
+from src.utils.artifacts import add_artifact, hashed_open, record_file
+from src.utils.metrics import TTS_CACHE_HITS, record_tts_stream
+from src.utils.deadlines import DeadlineExceeded, within_deadline
+from src.utils.tracing import set_attributes, start_span
+
+if TYPE_CHECKING:
+    from elevenlabs.client import AsyncElevenLabs
+    from src.utils.scheduler import ProviderScheduler
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
 
 
 class ElevenLabsService:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        cache: Optional[AudioCache] = None,
+        scheduler: Optional["ProviderScheduler"] = None,
+    ) -> None:
         self.settings = settings
-        self.client = ElevenLabs(api_key=self.settings.ELEVENLABS_API_KEY)
+        self.cache = cache
+        self.scheduler = scheduler
+        self.model_id = self.settings.ELEVENLABS_MODEL_ID
+        self.output_format = self.settings.ELEVENLABS_OUTPUT_FORMAT
 
         self.voices: Dict[str, str] = {
             "female": "Qvbf0AoA7UZSgJUp8Ba5",
             "male": "l1zE9xgNpUTaQCZzpNJa",
         }
 
-    def text_to_speech(self, text: str, voice: Literal['female', 'male']) -> Optional[bytes]:
+        # Cumulative streaming metrics plus the stats of the latest stream.
+        self.metrics: Dict[str, float] = {"streams": 0, "bytes": 0, "seconds": 0.0, "cache_hits": 0}
+        self.last_stream: Dict[str, Any] = {}
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """A slot of the shared ElevenLabs capacity, held while a stream is received, up to the deadline."""
+        async with (
+            within_deadline("ElevenLabs stream"),
+            self.scheduler.slot("elevenlabs") if self.scheduler is not None else nullcontext(),
+        ):
+            yield
+
+    @cached_property
+    def client(self) -> "AsyncElevenLabs":
+        # The SDK is imported on first use, so importing this module stays cheap.
+        from elevenlabs.client import AsyncElevenLabs
+
+        return AsyncElevenLabs(
+            api_key=self.settings.ELEVENLABS_API_KEY,
+            base_url=self.settings.ELEVENLABS_BASE_URL,
+        )
+
+    def _cache_key(self, text: str, voice: Literal['female', 'male'], variant: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(text, self.voices[voice], f"{self.model_id}:{variant}", self.output_format)
+
+    def _serve_from_cache(self, key: Optional[str], filename: str, artifacts: Optional[List[Dict[str, Any]]]) -> bool:
+        if key is None:
+            return False
+
+        method = self.cache.serve(key, filename)
+        if method is None:
+            return False
+
+        record = self.cache.read_meta(key)
+        if record:
+            record = {name: value for name, value in record.items() if name != "chunks"}
+        add_artifact(artifacts, {**record, "path": filename} if record else record_file(filename))
+
+        self.metrics["cache_hits"] += 1
+        TTS_CACHE_HITS.inc()
+        set_attributes({"tts.cache_hit": True})
+        self.last_stream = {"cache_hit": True, "link": method}
+        return True
+
+    def text_to_speech(
+        self,
+        text: str,
+        voice: Literal['female', 'male'],
+        previous_text: Optional[str] = None,
+        next_text: Optional[str] = None,
+    ) -> Optional[AsyncIterator[bytes]]:
         try:
-            return self.client.generate(
+            return self.client.text_to_speech.convert_as_stream(
+                voice_id=self.voices[voice],
                 text=text,
-                voice=self.voices[voice]
+                model_id=self.model_id,
+                output_format=self.output_format,
+                previous_text=previous_text,
+                next_text=next_text,
             )
         except Exception as e:
             print(f"Error generating audio: {str(e)}")
             return None
-        
-    def save_audio(self, audio: Iterator[bytes], filename: str) -> bool:
+
+    def _record_stream(self, started: float, first_byte: Optional[float], total_bytes: int) -> None:
+        elapsed = time.perf_counter() - started
+        self.last_stream = {
+            "ttfb_seconds": None if first_byte is None else first_byte - started,
+            "bytes": total_bytes,
+            "seconds": elapsed,
+            "bytes_per_second": total_bytes / elapsed if elapsed > 0 else 0.0,
+        }
+        self.metrics["streams"] += 1
+        self.metrics["bytes"] += total_bytes
+        self.metrics["seconds"] += elapsed
+        record_tts_stream(total_bytes, elapsed)
+        set_attributes({
+            "tts.bytes": total_bytes,
+            "tts.ttfb_seconds": self.last_stream["ttfb_seconds"],
+            "tts.bytes_per_second": self.last_stream["bytes_per_second"],
+        })
+
+    async def save_audio(
+        self,
+        audio: AsyncIterator[bytes],
+        filename: str,
+        on_first_chunk: Optional[Callable[[str], Any]] = None,
+        artifacts: Optional[List[Dict[str, Any]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Write chunks to `filename` as they arrive.
+
+        Every chunk is flushed, so readers may start on the partially written file;
+        `on_first_chunk` is called with the filename once the first bytes are on disk.
+        Checksum and duration are computed on the fly; returns the artifact record.
+        """
+        started = time.perf_counter()
+        first_byte = None
+        total_bytes = 0
+        frame_counter = FrameCounter()
         try:
-            with open(filename, "wb") as f:
-                for chunk in audio:
+            with hashed_open(filename, progressive=True) as f:
+                async for chunk in audio:
+                    if not chunk:
+                        continue
+
                     f.write(chunk)
+                    f.flush()
+                    frame_counter.feed(chunk)
+                    total_bytes += len(chunk)
+
+                    if first_byte is None:
+                        first_byte = time.perf_counter()
+                        if on_first_chunk is not None:
+                            on_first_chunk(filename)
+
+            if total_bytes == 0:
+                raise Exception("Empty audio stream")
+
+            record = f.record(filename, duration=frame_counter.duration)
+            add_artifact(artifacts, record)
+            return record
 
-            return True
-        
         except Exception as e:
             print(f"Error saving audio: {str(e)}")
-            return False
+            return None
+
+        finally:
+            self._record_stream(started, first_byte, total_bytes)
+
+    async def get_speech_on_file(
+        self,
+        filename: str,
+        text: str,
+        voice: Literal['female', 'male'],
+        on_first_chunk: Optional[Callable[[str], Any]] = None,
+        artifacts: Optional[List[Dict[str, Any]]] = None,
+    ) -> Optional[str]:
+        with start_span("tts stream", {"tts.voice": voice, "tts.chars": len(text)}):
+            return await self._get_speech_on_file(filename, text, voice, on_first_chunk, artifacts)
 
-    def get_speech_on_file(self, filename: str, text: str, voice: Literal['female', 'male']) -> Optional[str]:
+    async def _get_speech_on_file(
+        self,
+        filename: str,
+        text: str,
+        voice: Literal['female', 'male'],
+        on_first_chunk: Optional[Callable[[str], Any]],
+        artifacts: Optional[List[Dict[str, Any]]],
+    ) -> Optional[str]:
         try:
-            bytes_iterator = self.text_to_speech(text, voice)
-            if bytes_iterator is None:
-                raise Exception("Error generating audio")
+            cache_key = self._cache_key(text, voice, "stream")
+            if self._serve_from_cache(cache_key, filename, artifacts):
+                if on_first_chunk is not None:
+                    on_first_chunk(filename)
+                return filename
+
+            async with self._slot():
+                bytes_iterator = self.text_to_speech(text, voice)
+                if bytes_iterator is None:
+                    raise Exception("Error generating audio")
 
-            if self.save_audio(bytes_iterator, filename):
+                record = await self.save_audio(bytes_iterator, filename, on_first_chunk, artifacts)
+            if record:
+                if cache_key is not None:
+                    self.cache.store(cache_key, filename, meta=record)
                 return filename
-            
+
             raise Exception("Error saving audio")
-        
+
         except Exception as e:
             print(f"Error getting speech on file: {str(e)}")
             return None
+
+    @staticmethod
+    def split_text(text: str, max_chars: int) -> List[str]:
+        """
+        Split `text` at sentence boundaries into chunks of at most `max_chars`.
+        Sentences longer than the budget are split on whitespace.
+        """
+        chunks: List[str] = []
+        current = ""
+        for sentence in SENTENCE_END.split(text.strip()):
+            pieces = [sentence]
+            if len(sentence) > max_chars:
+                pieces, piece = [], ""
+                for word in sentence.split():
+                    if piece and len(piece) + 1 + len(word) > max_chars:
+                        pieces.append(piece)
+                        piece = word
+                    else:
+                        piece = f"{piece} {word}" if piece else word
+                pieces.append(piece)
+
+            for piece in pieces:
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = piece
+                else:
+                    current = f"{current} {piece}" if current else piece
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _synthesize_chunk(self, chunks: List[str], index: int, voice: Literal['female', 'male']) -> bytes:
+        with start_span("tts chunk", {"tts.chunk": index, "tts.chars": len(chunks[index])}):
+            return await self._receive_chunk(chunks, index, voice)
+
+    async def _receive_chunk(self, chunks: List[str], index: int, voice: Literal['female', 'male']) -> bytes:
+        data = bytearray()
+        async with self._slot():
+            audio = self.text_to_speech(
+                chunks[index],
+                voice,
+                previous_text=chunks[index - 1] if index > 0 else None,
+                next_text=chunks[index + 1] if index + 1 < len(chunks) else None,
+            )
+            if audio is None:
+                raise Exception(f"Error generating audio for chunk {index}")
+
+            async for chunk in audio:
+                data.extend(chunk)
+        if not data:
+            raise Exception(f"Empty audio stream for chunk {index}")
+        return bytes(data)
+
+    async def get_speech_on_file_chunked(
+        self,
+        filename: str,
+        text: str,
+        voice: Literal['female', 'male'],
+        max_chars: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        retries: Optional[int] = None,
+        artifacts: Optional[List[Dict[str, Any]]] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Synthesize `text` in sentence-aligned chunks concurrently and concatenate them.
+
+        Only failed chunks are retried. Chunks are joined on MP3 frame boundaries (tags
+        and Xing/Info frames dropped) and the returned list holds each chunk's text with
+        its start/end offset in seconds within `filename`. Cached audio is served whole,
+        as a single chunk.
+        """
+        max_chars = max_chars or self.settings.ELEVENLABS_CHUNK_MAX_CHARS
+        concurrency = concurrency or self.settings.ELEVENLABS_CHUNK_CONCURRENCY
+        retries = self.settings.ELEVENLABS_CHUNK_RETRIES if retries is None else retries
+
+        with start_span("tts chunked", {"tts.voice": voice, "tts.chars": len(text), "tts.max_chars": max_chars}):
+            return await self._get_speech_on_file_chunked(filename, text, voice, max_chars, concurrency, retries, artifacts)
+
+    async def _get_speech_on_file_chunked(
+        self,
+        filename: str,
+        text: str,
+        voice: Literal['female', 'male'],
+        max_chars: int,
+        concurrency: int,
+        retries: int,
+        artifacts: Optional[List[Dict[str, Any]]],
+    ) -> Optional[List[Dict[str, Any]]]:
+        started = time.perf_counter()
+        try:
+            cache_key = self._cache_key(text, voice, f"chunked:{max_chars}")
+            # Hits return the chunk timings stored with the entry; entries without them are synthesized again.
+            meta = self.cache.read_meta(cache_key) if cache_key is not None else None
+            if meta and meta.get("chunks") and self._serve_from_cache(cache_key, filename, artifacts):
+                return meta["chunks"]
+
+            chunks = self.split_text(text, max_chars)
+            if not chunks:
+                raise Exception("Nothing to synthesize")
+
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def synthesize(index: int) -> bytes:
+                async with semaphore:
+                    return await self._synthesize_chunk(chunks, index, voice)
+
+            results: Dict[int, bytes] = {}
+            pending = list(range(len(chunks)))
+            for attempt in range(retries + 1):
+                outcomes = await asyncio.gather(*(synthesize(i) for i in pending), return_exceptions=True)
+                failed = []
+                for index, outcome in zip(pending, outcomes):
+                    if isinstance(outcome, BaseException):
+                        print(f"Chunk {index} failed on attempt {attempt + 1}: {outcome}")
+                        failed.append(index)
+                    else:
+                        results[index] = outcome
+                pending = failed
+                if not pending or any(isinstance(outcome, DeadlineExceeded) for outcome in outcomes):
+                    break
+
+            if pending:
+                raise Exception(f"Chunks {pending} failed after {retries + 1} attempts")
+
+            timings: List[Dict[str, Any]] = []
+            offset = 0.0
+            total_bytes = 0
+            with hashed_open(filename) as f:
+                for index, chunk_text in enumerate(chunks):
+                    frames, duration = audio_frames(results[index])
+                    f.write(frames)
+                    total_bytes += len(frames)
+                    timings.append({"index": index, "text": chunk_text, "start": offset, "end": offset + duration})
+                    offset += duration
+
+            record = f.record(filename, duration=offset)
+            add_artifact(artifacts, record)
+            self._record_stream(started, None, total_bytes)
+            if cache_key is not None:
+                self.cache.store(cache_key, filename, meta={**record, "chunks": timings})
+            return timings
+
+        except Exception as e:
+            print(f"Error getting chunked speech on file: {str(e)}")
+            return None
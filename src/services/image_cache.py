@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+from src.services.localfile_service import LocalFileService
+
+HASH_BANDS = 4
+BAND_BITS = 64 // HASH_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompts (
+    key TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    images INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prompts_last_access ON prompts (last_access);
+
+CREATE TABLE IF NOT EXISTS images (
+    key TEXT NOT NULL REFERENCES prompts (key) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    phash INTEGER NOT NULL,
+    band0 INTEGER NOT NULL,
+    band1 INTEGER NOT NULL,
+    band2 INTEGER NOT NULL,
+    band3 INTEGER NOT NULL,
+    PRIMARY KEY (key, position)
+);
+CREATE INDEX IF NOT EXISTS images_band0 ON images (band0);
+CREATE INDEX IF NOT EXISTS images_band1 ON images (band1);
+CREATE INDEX IF NOT EXISTS images_band2 ON images (band2);
+CREATE INDEX IF NOT EXISTS images_band3 ON images (band3);
+"""
+
+
+def dhash(path: str, size: int = 8) -> int:
+    """64-bit difference hash: brightness gradients of a 9x8 grayscale thumbnail."""
+    with Image.open(path) as image:
+        pixels = list(image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS).getdata())
+
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def _signed(value: int) -> int:
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _bands(value: int) -> List[int]:
+    return [(value >> (band * BAND_BITS)) & BAND_MASK for band in range(HASH_BANDS)]
+
+
+class ImageCache:
+    """
+    Midjourney images keyed by normalized prompt, with an SQLite index.
+
+    Exact prompt hits are linked into the run workspace. Every stored image also gets
+    a perceptual hash (dHash) split into four 16-bit bands, each indexed: two hashes
+    within Hamming distance 3 share at least one band, so near-duplicate lookups only
+    compare a handful of candidates however many images are stored. Whole prompts are
+    evicted least recently used first once the total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, namespace: str = "", near_duplicate_distance: int = 3) -> None:
+        if near_duplicate_distance >= HASH_BANDS:
+            raise ValueError(f"near_duplicate_distance must be below {HASH_BANDS} for band lookups to find every match")
+
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        self.near_duplicate_distance = near_duplicate_distance
+        self.metrics: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "near_duplicates": 0}
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.directory / "index.sqlite3", check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        return " ".join(unicodedata.normalize("NFC", prompt).casefold().split())
+
+    def make_key(self, prompt: str) -> str:
+        payload = [self.normalize_prompt(prompt), self.namespace]
+        return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str, position: int, suffix: str) -> Path:
+        return self.directory / key[:2] / f"{key}_{position}{suffix}"
+
+    def serve(self, key: str, directory: str, stem: str) -> Optional[List[str]]:
+        """Link the images cached for `key` into `directory` as `<stem>_<n><ext>`; None on a miss."""
+        with self._lock:
+            rows = self._db.execute("SELECT position, path FROM images WHERE key = ? ORDER BY position", (key,)).fetchall()
+            if rows:
+                self._db.execute("UPDATE prompts SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        served = []
+        for position, path in rows:
+            source = self.directory / path
+            destination = os.path.join(directory, f"{stem}_{position}{source.suffix}")
+            if LocalFileService.link_or_copy(str(source), destination) is None:
+                # e.g. evicted meanwhile; partial sets would be published with the regenerated images.
+                for image in [*served, destination]:
+                    Path(image).unlink(missing_ok=True)
+                served = []
+                break
+            served.append(destination)
+
+        with self._lock:
+            self.metrics["hits" if served else "misses"] += 1
+        return served or None
+
+    def store(self, key: str, prompt: str, images: List[str]) -> List[Dict[str, Any]]:
+        """
+        Add the images generated for `prompt`; returns the near duplicates found among the
+        images of other prompts, as {"image", "duplicate_of", "prompt", "distance"} records.
+        """
+        rows, duplicates, total = [], [], 0
+        try:
+            for position, image in enumerate(images):
+                phash = dhash(image)
+                duplicates.extend(
+                    {"image": image, **duplicate}
+                    for duplicate in self.near_duplicates(phash, exclude_key=key)
+                )
+
+                path = self._path_for(key, position, Path(image).suffix.lower())
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = path.with_name(f".{path.name}.tmp")
+                if LocalFileService.link_or_copy(image, str(temp_path)) is None:
+                    raise Exception(f"Could not add {image} to the cache")
+                os.replace(temp_path, path)
+
+                total += path.stat().st_size
+                rows.append((key, position, path.relative_to(self.directory).as_posix(), _signed(phash), *_bands(phash)))
+
+            now = time.time()
+            with self._lock:
+                self._db.execute("BEGIN")
+                self._db.execute("DELETE FROM prompts WHERE key = ?", (key,))
+                self._db.execute(
+                    "INSERT INTO prompts (key, prompt, images, bytes, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, prompt, len(rows), total, now, now),
+                )
+                self._db.executemany(
+                    "INSERT INTO images (key, position, path, phash, band0, band1, band2, band3) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.execute("COMMIT")
+                self.metrics["stores"] += 1
+                self.metrics["near_duplicates"] += len(duplicates)
+
+        except Exception as e:
+            print(f"Error caching images: {e}")
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            return duplicates
+
+        self.evict()
+        return duplicates
+
+    def near_duplicates(self, phash: int, exclude_key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Stored images within `near_duplicate_distance` bits of `phash`."""
+        bands = _bands(phash)
+        with self._lock:
+            candidates = self._db.execute(
+                "SELECT images.key, images.path, images.phash, prompts.prompt FROM images JOIN prompts USING (key) "
+                "WHERE band0 = ? OR band1 = ? OR band2 = ? OR band3 = ?",
+                bands,
+            ).fetchall()
+
+        matches = []
+        for key, path, stored, prompt in candidates:
+            distance = bin((stored & (2**64 - 1)) ^ phash).count("1")
+            if key != exclude_key and distance <= self.near_duplicate_distance:
+                matches.append({"duplicate_of": str(self.directory / path), "prompt": prompt, "distance": distance})
+        return matches
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM prompts").fetchone()[0]
+
+    def evict(self) -> int:
+        evicted = 0
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM prompts").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = self._db.execute(
+                    "SELECT key, bytes FROM prompts ORDER BY last_access LIMIT 64"
+                ).fetchall()
+                if not oldest:
+                    break
+
+                for key, size in oldest:
+                    if total <= self.max_bytes:
+                        break
+                    paths = [row[0] for row in self._db.execute("SELECT path FROM images WHERE key = ?", (key,))]
+                    self._db.execute("DELETE FROM prompts WHERE key = ?", (key,))
+                    for path in paths:
+                        (self.directory / path).unlink(missing_ok=True)
+                    total -= size
+                    evicted += 1
+
+            self.metrics["evictions"] += evicted
+        return evicted
+
+    @staticmethod
+    def assign(images: List[str], prompt_nums: List[int]) -> Optional[Dict[int, List[str]]]:
+        """
+        Attribute generated images to their prompts: by a prompt number in the file name
+        (e.g. image_03.png), else in order when every prompt got the same number of images.
+        None when the images cannot be attributed reliably.
+        """
+        images = sorted(images)
+        by_number: Dict[int, List[str]] = {num: [] for num in prompt_nums}
+        for image in images:
+            numbers = [int(n) for n in re.findall(r"\d+", Path(image).stem) if int(n) in by_number]
+            if len(numbers) != 1:
+                break
+            by_number[numbers[0]].append(image)
+        else:
+            if all(by_number.values()):
+                return by_number
+
+        if images and len(images) % len(prompt_nums) == 0:
+            per_prompt = len(images) // len(prompt_nums)
+            return {num: images[i * per_prompt:(i + 1) * per_prompt] for i, num in enumerate(sorted(prompt_nums))}
+        return None
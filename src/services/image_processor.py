@@ -0,0 +1,124 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from src.core.settings import Settings
+from src.utils.artifacts import hashed_open
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+FORMAT_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+
+def _crop_to_aspect(image: Image.Image, aspect: Tuple[int, int]) -> Image.Image:
+    width, height = image.size
+    target = aspect[0] / aspect[1]
+    if width / height > target:
+        new_width = round(height * target)
+        left = (width - new_width) // 2
+        return image.crop((left, 0, left + new_width, height))
+    new_height = round(width / target)
+    top = (height - new_height) // 2
+    return image.crop((0, top, width, top + new_height))
+
+
+def _fit(image: Image.Image, max_edge: int) -> Image.Image:
+    if max(image.size) <= max_edge:
+        return image
+    scale = max_edge / max(image.size)
+    return image.resize((round(image.width * scale), round(image.height * scale)), Image.Resampling.LANCZOS)
+
+
+def process_image(
+    source: str,
+    output_dir: str,
+    aspects: List[str],
+    formats: List[str],
+    max_edge: int,
+    thumbnail_edge: int,
+    quality: int,
+) -> List[Dict[str, Any]]:
+    """
+    Produce the derived versions of one image: a web-sized copy, one crop per target
+    aspect ratio and a thumbnail, each encoded in every configured format.
+
+    Pixels are copied into a fresh image, so EXIF/XMP/ICC metadata is never written.
+    Runs in worker processes; returns the artifact records of the files it wrote.
+    """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened).convert("RGB")
+
+    variants = {"web": _fit(image, max_edge)}
+    for aspect in aspects:
+        width, height = (int(part) for part in aspect.split(":"))
+        variants[f"{width}x{height}"] = _fit(_crop_to_aspect(image, (width, height)), max_edge)
+    variants["thumb"] = _fit(image, thumbnail_edge)
+
+    records = []
+    for name, variant in variants.items():
+        clean = Image.new("RGB", variant.size)
+        clean.paste(variant)
+        for image_format in formats:
+            buffer = io.BytesIO()
+            clean.save(buffer, format=image_format.upper(), quality=quality, optimize=image_format == "jpeg")
+
+            path = os.path.join(output_dir, f"{stem}_{name}.{FORMAT_EXTENSIONS[image_format]}")
+            with hashed_open(path) as f:
+                f.write(buffer.getvalue())
+            records.append(f.record(path, width=clean.width, height=clean.height, source=source))
+
+    return records
+
+
+class ImageProcessor:
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.settings.IMAGE_WORKERS)
+        return self._executor
+
+    @staticmethod
+    def list_images(folder: str) -> List[str]:
+        return sorted(
+            os.path.join(folder, name)
+            for name in os.listdir(folder)
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+        )
+
+    def process_images(self, images: List[str], output_dir: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            futures = [
+                self.executor.submit(
+                    process_image,
+                    image,
+                    output_dir,
+                    self.settings.IMAGE_TARGET_ASPECTS,
+                    self.settings.IMAGE_FORMATS,
+                    self.settings.IMAGE_MAX_EDGE,
+                    self.settings.IMAGE_THUMBNAIL_EDGE,
+                    self.settings.IMAGE_QUALITY,
+                )
+                for image in images
+            ]
+
+            records = []
+            for future in futures:
+                records.extend(future.result())
+            return records
+
+        except Exception as e:
+            print(f"Error processing images: {e}")
+            return None
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -1,7 +1,11 @@
 import os
+import sys
+import uuid
+import errno
 import shutil
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
 class LocalFileService:
 
@@ -46,6 +50,43 @@ class LocalFileService:
             print(f"Error moving file: {e}")
             return False
         
+    @staticmethod
+    def link_or_copy(source_path: str, destination_path: str) -> Optional[str]:
+        """
+        Make destination_path share source_path's data without copying when possible.
+        Tries a hardlink, then a reflink (FICLONE, Linux), then falls back to a copy.
+
+        Returns:- "hardlink", "reflink" or "copy", or None on failure.
+        """
+        try:
+            if os.path.lexists(destination_path):
+                os.remove(destination_path)
+
+            try:
+                os.link(source_path, destination_path)
+                return "hardlink"
+            except OSError:
+                pass
+
+            if sys.platform.startswith("linux"):
+                import fcntl
+
+                FICLONE = 0x40049409
+                try:
+                    with open(source_path, "rb") as src, open(destination_path, "wb") as dst:
+                        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                    return "reflink"
+                except OSError:
+                    if os.path.exists(destination_path):
+                        os.remove(destination_path)
+
+            shutil.copyfile(source_path, destination_path)
+            return "copy"
+
+        except Exception as e:
+            print(f"Error linking file: {e}")
+            return None
+
     @staticmethod
     def create_folder(path: str, folder_name: str) -> Optional[str]:
         """
@@ -116,4 +157,159 @@ class LocalFileService:
         
         except Exception as e:
             print(f"Error moving files: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    @staticmethod
+    def write_file_atomic(path: str, data: bytes) -> bool:
+        """
+        Write data to path through a fsynced temporary file renamed over it,
+        so readers see either the old content or the complete new one.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        temp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+            LocalFileService._fsync_dir(directory)
+            return True
+
+        except Exception as e:
+            print(f"Error writing file atomically: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+    @staticmethod
+    def _fsync_dir(path: str) -> None:
+        if os.name != "posix":
+            return
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _kernel_copy(src_fd: int, dst_fd: int, size: int) -> bool:
+        """Copy with copy_file_range, else sendfile. Returns False if neither is usable here."""
+        for name in ("copy_file_range", "sendfile"):
+            if not hasattr(os, name):
+                continue
+
+            offset = 0
+            try:
+                while offset < size:
+                    if name == "copy_file_range":
+                        sent = os.copy_file_range(src_fd, dst_fd, size - offset, offset, offset)
+                    else:
+                        sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                if offset == size:
+                    return True
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                    raise
+
+            os.ftruncate(dst_fd, 0)
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+
+        return False
+
+    @staticmethod
+    def copy_file_durable(source_path: str, destination_path: str) -> None:
+        """
+        Copy a file in kernel space when possible, else with a buffered copy, and fsync it.
+        """
+        with open(source_path, "rb") as src, open(destination_path, "wb") as dst:
+            size = os.fstat(src.fileno()).st_size
+            if not LocalFileService._kernel_copy(src.fileno(), dst.fileno(), size):
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+                dst.flush()
+            os.fsync(dst.fileno())
+
+    @staticmethod
+    def publish_folder(src_folder: str, dest_folder: str, workers: int = 4) -> bool:
+        """
+        Publish every file under src_folder as dest_folder, all or nothing.
+
+        Files are staged in a sibling of dest_folder (same filesystem) by hardlink when
+        possible, else by parallel kernel-space copies that are fsynced. The staged folder
+        is then renamed into place, and the sources are removed only after that.
+
+        Returns:- True if the folder was published, False otherwise.
+        """
+        dest_folder = os.path.abspath(dest_folder)
+        parent, name = os.path.split(dest_folder)
+        staging = os.path.join(parent, f".{name}.staging-{uuid.uuid4().hex[:8]}")
+
+        try:
+            if not os.path.isdir(src_folder):
+                print("The source folder does not exist.")
+                return False
+
+            files: List[Tuple[str, str]] = []
+            for root, _, filenames in os.walk(src_folder):
+                for filename in filenames:
+                    src_file = os.path.join(root, filename)
+                    files.append((src_file, os.path.join(staging, os.path.relpath(src_file, src_folder))))
+
+            if not files:
+                return False
+
+            os.makedirs(parent, exist_ok=True)
+            os.makedirs(staging)
+            to_copy = []
+            for src_file, staged_file in files:
+                os.makedirs(os.path.dirname(staged_file), exist_ok=True)
+                try:
+                    os.link(src_file, staged_file)
+                except OSError:
+                    to_copy.append((src_file, staged_file))
+
+            if to_copy:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(lambda pair: LocalFileService.copy_file_durable(*pair), to_copy))
+                for root, _, _ in os.walk(staging):
+                    LocalFileService._fsync_dir(root)
+
+            LocalFileService._swap_into_place(staging, dest_folder)
+            LocalFileService._fsync_dir(parent)
+
+            for src_file, _ in files:
+                os.remove(src_file)
+
+            return True
+
+        except Exception as e:
+            print(f"Error publishing folder: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+
+    @staticmethod
+    def _swap_into_place(staging: str, dest_folder: str) -> None:
+        try:
+            # Atomic on POSIX, also when dest_folder exists but is empty.
+            os.rename(staging, dest_folder)
+            return
+        except OSError:
+            if not os.path.isdir(dest_folder):
+                raise
+
+        if not os.listdir(dest_folder):
+            os.rmdir(dest_folder)
+            os.rename(staging, dest_folder)
+            return
+
+        # dest_folder already has content: merge entry by entry, each replace being atomic.
+        for entry in os.listdir(staging):
+            target = os.path.join(dest_folder, entry)
+            if os.path.isdir(os.path.join(staging, entry)) and os.path.isdir(target):
+                LocalFileService._swap_into_place(os.path.join(staging, entry), target)
+            else:
+                os.replace(os.path.join(staging, entry), target)
+        os.rmdir(staging)
@@ -0,0 +1,153 @@
+import json
+import time
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from anthropic import AsyncAnthropic
+
+# custom_id -> (completion, None) on success, (None, error message) on failure.
+BatchResults = dict[str, tuple[Any, str | None]]
+
+
+class BatchJobError(Exception):
+    pass
+
+
+def _tool_description(model: type[BaseModel]) -> str:
+    return (model.__doc__ or f"Correctly extracted `{model.__name__}` with all the required parameters").strip()
+
+
+class OpenAIBatchAPI:
+    """OpenAI Batch API over /v1/chat/completions: JSONL upload, batch job, output/error files."""
+
+    provider = "openai"
+
+    def __init__(self, client: "AsyncOpenAI", poll_seconds: float, max_wait_seconds: float, completion_window: str) -> None:
+        self.client = client
+        self.poll_seconds = poll_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.completion_window = completion_window
+
+    def request(
+        self, custom_id: str, model: str, messages: list[dict[str, Any]], return_model: type[BaseModel] | None
+    ) -> dict[str, Any]:
+        body: dict[str, Any] = {"model": model, "messages": messages, "temperature": 0}
+        if return_model is not None:
+            body["tools"] = [{
+                "type": "function",
+                "function": {
+                    "name": return_model.__name__,
+                    "description": _tool_description(return_model),
+                    "parameters": return_model.model_json_schema(),
+                },
+            }]
+            body["tool_choice"] = {"type": "function", "function": {"name": return_model.__name__}}
+        return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+    async def run(self, requests: list[dict[str, Any]]) -> tuple[str, BatchResults]:
+        data = "\n".join(json.dumps(request, ensure_ascii=False) for request in requests).encode()
+        input_file = await self.client.files.create(file=("requests.jsonl", data), purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        logger.info(f"Submitted OpenAI batch {batch.id} with {len(requests)} requests")
+
+        started = time.monotonic()
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if time.monotonic() - started > self.max_wait_seconds:
+                await self.client.batches.cancel(batch.id)
+                raise BatchJobError(f"Batch {batch.id} still {batch.status} after {self.max_wait_seconds}s; cancelled")
+            await asyncio.sleep(self.poll_seconds)
+            batch = await self.client.batches.retrieve(batch.id)
+
+        if batch.status in ("failed", "cancelled"):
+            raise BatchJobError(f"Batch {batch.id} {batch.status}: {batch.errors}")
+
+        # Expired batches still return whatever completed in time.
+        results: BatchResults = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                for line in content.text.splitlines():
+                    if line.strip():
+                        results.update(self._result(json.loads(line)))
+        return batch.id, results
+
+    @staticmethod
+    def _result(line: dict[str, Any]) -> BatchResults:
+        from openai.types.chat import ChatCompletion
+
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            error = line.get("error") or (response.get("body") or {}).get("error") or response
+            return {line["custom_id"]: (None, str(error))}
+        return {line["custom_id"]: (ChatCompletion.model_validate(response["body"]), None)}
+
+    @staticmethod
+    def parse(completion: Any, return_model: type[BaseModel] | None) -> Any:
+        message = completion.choices[0].message
+        if return_model is None:
+            return message.content
+        if not message.tool_calls:
+            raise ValueError(f"No {return_model.__name__} tool call in the response")
+        return return_model.model_validate_json(message.tool_calls[0].function.arguments)
+
+
+class AnthropicBatchAPI:
+    """Anthropic Message Batches API."""
+
+    provider = "anthropic"
+
+    def __init__(self, client: "AsyncAnthropic", poll_seconds: float, max_wait_seconds: float) -> None:
+        self.client = client
+        self.poll_seconds = poll_seconds
+        self.max_wait_seconds = max_wait_seconds
+
+    def request(
+        self, custom_id: str, model: str, messages: list[dict[str, Any]], return_model: type[BaseModel] | None
+    ) -> dict[str, Any]:
+        params: dict[str, Any] = {"model": model, "max_tokens": 4096, "temperature": 0, "messages": messages}
+        if return_model is not None:
+            params["tools"] = [{
+                "name": return_model.__name__,
+                "description": _tool_description(return_model),
+                "input_schema": return_model.model_json_schema(),
+            }]
+            params["tool_choice"] = {"type": "tool", "name": return_model.__name__}
+        return {"custom_id": custom_id, "params": params}
+
+    async def run(self, requests: list[dict[str, Any]]) -> tuple[str, BatchResults]:
+        batch = await self.client.messages.batches.create(requests=requests)
+        logger.info(f"Submitted Anthropic batch {batch.id} with {len(requests)} requests")
+
+        started = time.monotonic()
+        while batch.processing_status != "ended":
+            if time.monotonic() - started > self.max_wait_seconds:
+                await self.client.messages.batches.cancel(batch.id)
+                raise BatchJobError(f"Batch {batch.id} still {batch.processing_status} after {self.max_wait_seconds}s; cancelled")
+            await asyncio.sleep(self.poll_seconds)
+            batch = await self.client.messages.batches.retrieve(batch.id)
+
+        results: BatchResults = {}
+        async for entry in await self.client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = (entry.result.message, None)
+            else:
+                results[entry.custom_id] = (None, f"{entry.result.type}: {getattr(entry.result, 'error', '')}")
+        return batch.id, results
+
+    @staticmethod
+    def parse(message: Any, return_model: type[BaseModel] | None) -> Any:
+        if return_model is None:
+            return next((block.text for block in message.content if block.type == "text"), "")
+        tool_use = next((block for block in message.content if block.type == "tool_use"), None)
+        if tool_use is None:
+            raise ValueError(f"No {return_model.__name__} tool use in the response")
+        return return_model.model_validate(tool_use.input)
@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Any
+from typing import Any, Literal
 
 from loguru import logger
 from pydantic import BaseModel, Field, PrivateAttr
@@ -10,6 +10,9 @@ class ClientPrompt(BaseModel):
     prompt: str
     content_keys: list[str] = Field(default_factory=list)
     return_model: type[BaseModel] | None = None
+    # "inline" splices variables into the prompt text; "cached" keeps the prompt text (and
+    # schema) as a static prefix and sends the variables after it, so provider prompt caching hits.
+    layout: Literal["inline", "cached"] = "inline"
 
 
 class ChainPromptManager(BaseModel):
@@ -31,22 +34,31 @@ class ChainPromptManager(BaseModel):
                     "prompt": prompt.prompt,
                     "content_keys": prompt.content_keys,
                     "return_model": None,
+                    "layout": prompt.layout,
                 }
                 for prompt in prompts
             ]
         }
 
-        with open(file_path, "w") as f:
+        with open(file_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
 
     def get_prompt_chain(self, name: str) -> list[ClientPrompt]:
         file_path = self._get_file_path(name, "prompt")
         logger.info(f"Looking for prompt chain file: {file_path}")
         if os.path.exists(file_path):
-            with open(file_path) as f:
+            with open(file_path, encoding="utf-8") as f:
                 data = json.load(f)
             prompts = [ClientPrompt(**prompt) for prompt in data.get("prompts", [])]
             return prompts
         else:
             logger.info(f"File not found: {file_path}")
-        return []
\ No newline at end of file
+        return []
+
+    def get_chain_routing(self, name: str) -> dict[str, Any] | None:
+        """The chain's "routing" overrides (see RoutingPolicy), if its file has any."""
+        file_path = self._get_file_path(name, "prompt")
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, encoding="utf-8") as f:
+            return json.load(f).get("routing")
\ No newline at end of file
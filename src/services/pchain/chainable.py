@@ -1,18 +1,38 @@
+import re
 import json
-from typing import Any, Literal
+import time
+from contextlib import asynccontextmanager, nullcontext
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, AsyncIterator, Literal
 
-import instructor
 from loguru import logger
-from openai import AsyncOpenAI
 from pydantic import BaseModel
-from anthropic import AsyncAnthropic
-from anthropic.types.text_block import TextBlock
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 
 from src.core.settings import Settings
+from src.utils.costs import current_ledger, record_cost
+from src.utils.deadlines import DeadlineExceeded, stop_at_deadline, within_deadline
+from src.utils.metrics import observe_llm_call, record_llm_usage
+from src.utils.scheduler import AdmissionRejected
+from src.utils.tracing import set_attributes, start_span
+from src.services.pchain.batch import AnthropicBatchAPI, OpenAIBatchAPI
+from src.services.pchain.pricing import llm_cost
 from src.services.pchain.responses import Response
 from src.services.pchain.chain_prompt_manager import ClientPrompt
 
+if TYPE_CHECKING:
+    import instructor
+    from openai import AsyncOpenAI
+    from anthropic import AsyncAnthropic
+    from src.services.pchain.routing import RoutingPolicy
+    from src.utils.scheduler import ProviderScheduler
+
+
+PLACEHOLDER = re.compile(r"\{\{(.+?)\}\}")
+
+# Provider slot refusals are final: retrying would only queue the call again.
+NOT_RETRIED = (AdmissionRejected, DeadlineExceeded)
+
 
 class UnsupportedContentTypeError(Exception):
     pass
@@ -23,8 +43,15 @@ class APICallError(Exception):
 
 
 class MinimalChainable:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        routing_policy: "RoutingPolicy | None" = None,
+        scheduler: "ProviderScheduler | None" = None,
+    ) -> None:
         self.settings = settings
+        self.routing_policy = routing_policy
+        self.scheduler = scheduler
         self.model_supported_types = {
             "openai": {"text", "image"},
             "anthropic": {"text", "image"},
@@ -37,18 +64,118 @@ class MinimalChainable:
             "deepseek": {"deepseek-chat", "deepseek-reasoner"},
         }
 
-        self.openai_client = AsyncOpenAI(api_key=self.settings.OPENAI_API_KEY)
-        self.anthropic_client = AsyncAnthropic(api_key=self.settings.ANTHROPIC_API_KEY)
-        self.deepseek_client = AsyncOpenAI(api_key=self.settings.DEEPSEEK_API_KEY, base_url="https://api.deepseek.com")
+    # Provider SDKs are imported on first use, so importing this module stays cheap.
+    @cached_property
+    def openai_client(self) -> "AsyncOpenAI":
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=self.settings.OPENAI_API_KEY, base_url=self.settings.OPENAI_BASE_URL)
+
+    @cached_property
+    def anthropic_client(self) -> "AsyncAnthropic":
+        from anthropic import AsyncAnthropic
+
+        return AsyncAnthropic(api_key=self.settings.ANTHROPIC_API_KEY, base_url=self.settings.ANTHROPIC_BASE_URL)
+
+    @cached_property
+    def deepseek_client(self) -> "AsyncOpenAI":
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=self.settings.DEEPSEEK_API_KEY, base_url=self.settings.DEEPSEEK_BASE_URL)
+
+    def warm_up(self) -> None:
+        """Import the SDKs and build the clients ahead of the first call."""
+        import instructor  # noqa: F401
+        from anthropic.types.text_block import TextBlock  # noqa: F401
+
+        self.openai_client, self.anthropic_client, self.deepseek_client
 
     def _get_instructor(
-        self, client: AsyncOpenAI | AsyncAnthropic
-    ) -> instructor.AsyncInstructor:
+        self, client: "AsyncOpenAI | AsyncAnthropic"
+    ) -> "instructor.AsyncInstructor":
+        import instructor
+        from openai import AsyncOpenAI
+        from anthropic import AsyncAnthropic
+
         if isinstance(client, AsyncOpenAI):
             return instructor.from_openai(client)
         elif isinstance(client, AsyncAnthropic):
             return instructor.from_anthropic(client)
 
+    @staticmethod
+    def _usage(completion: Any) -> dict[str, int] | None:
+        """
+        Token usage of an OpenAI-compatible or Anthropic completion, in OpenAI's field names.
+        `cached_tokens` (prompt tokens read from the provider's prompt cache) and
+        `cache_write_tokens` (Anthropic cache writes) are included in `prompt_tokens`.
+        """
+        usage = getattr(completion, "usage", None)
+        if usage is None:
+            return None
+
+        cached_tokens = (
+            getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)  # OpenAI
+            or getattr(usage, "prompt_cache_hit_tokens", None)  # DeepSeek
+            or getattr(usage, "cache_read_input_tokens", None)  # Anthropic
+            or 0
+        )
+        cache_write_tokens = getattr(usage, "cache_creation_input_tokens", None) or 0
+        if getattr(usage, "input_tokens", None) is not None:
+            # Anthropic counts cache reads and writes apart from input_tokens.
+            prompt_tokens = usage.input_tokens + cached_tokens + cache_write_tokens
+        else:
+            prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", 0) or 0,
+            "cached_tokens": cached_tokens,
+            "cache_write_tokens": cache_write_tokens,
+        }
+
+    @asynccontextmanager
+    async def _attempt(self, provider: str, model: str) -> AsyncIterator[None]:
+        """
+        One API attempt: a provider slot, its own span (tenacity retries show up as siblings) and
+        latency metrics. The slot is taken per attempt, so retry waits do not hold it.
+        """
+        async with self.scheduler.slot(provider) if self.scheduler is not None else nullcontext():
+            with start_span("llm attempt", {"llm.provider": provider, "llm.model": model}), observe_llm_call(provider, model):
+                yield
+
+    def _response(self, provider: str, model: str, response: Any, completion: Any) -> Response:
+        usage = self._usage(completion)
+        cost = llm_cost(provider, model, usage, self.settings.LLM_PRICES)
+        record_llm_usage(provider, model, usage, cost)
+        record_cost(provider, model, usage, cost)
+        return Response(
+            response=response,
+            metadata={"usage": usage, "cost_usd": cost, "provider": provider, "model": model},
+        )
+
+    def _supports(self, client: str, model: str, prompts: list[ClientPrompt]) -> bool:
+        if model not in self.model_supported_by_client.get(client, set()):
+            return False
+        # deepseek-reasoner has no structured output (see _handle_deepseek_reasoner_call).
+        return not (model == "deepseek-reasoner" and any(prompt.return_model is not None for prompt in prompts))
+
+    def _route(
+        self, chain: str | None, client: str, model: str, prompts: list[ClientPrompt]
+    ) -> tuple[str, str]:
+        """The (client, model) the routing policy picks for `chain`; the caller's choice without one."""
+        if self.routing_policy is None or chain is None:
+            return client, model
+
+        candidates = [
+            route for route in self.routing_policy.candidates(chain, (client, model))
+            if self._supports(*route, prompts)
+        ]
+        if not candidates:
+            return client, model
+
+        ledger = current_ledger()
+        return self.routing_policy.choose(chain, candidates, ledger.remaining_usd if ledger else None)
+
     def _convert_value_to_string(self, value: Any) -> str:
         """Convert any value to a string representation"""
         if isinstance(value, dict | BaseModel):
@@ -122,85 +249,155 @@ class MinimalChainable:
         # Return the message in DeepSeek's expected format
         return content
 
+    def _variables_block(self, prompt: ClientPrompt, context: dict[str, Any]) -> str:
+        """Per-run values of a cached-layout prompt: its {{placeholders}}, then its content keys."""
+        names = dict.fromkeys(PLACEHOLDER.findall(prompt.prompt) + prompt.content_keys)
+        return "\n\n".join(
+            f"{name}:\n{self._convert_value_to_string(context[name])}"
+            for name in names
+            if name in context
+        )
+
+    def _chat_messages(
+        self, prompt: ClientPrompt, context: dict[str, Any], prepare_content
+    ) -> list[dict[str, Any]]:
+        """
+        OpenAI-compatible messages. The cached layout sends the static instructions and schema
+        as the system message, identical on every run, so OpenAI and DeepSeek prefix caching hit.
+        """
+        if prompt.layout == "cached":
+            variables = self._variables_block(prompt, context)
+            if variables:
+                return [
+                    {"role": "system", "content": prompt.prompt},
+                    {"role": "user", "content": variables},
+                ]
+            return [{"role": "user", "content": prompt.prompt}]
+        return [{"role": "user", "content": prepare_content(prompt, context)}]
+
+    def _anthropic_messages(self, prompt: ClientPrompt, context: dict[str, Any]) -> list[dict[str, Any]]:
+        """
+        Anthropic messages. The cached layout puts a cache breakpoint after the static block;
+        it lives in the user turn rather than `system` so instructor passes it through untouched.
+        """
+        if prompt.layout != "cached":
+            return [{"role": "user", "content": self._prepare_content_for_anthropic(prompt, context)}]
+
+        content: list[dict[str, Any]] = [
+            {"type": "text", "text": prompt.prompt, "cache_control": {"type": "ephemeral"}}
+        ]
+        variables = self._variables_block(prompt, context)
+        if variables:
+            content.append({"type": "text", "text": variables})
+        return [{"role": "user", "content": content}]
+
+    @staticmethod
+    def _output_references(output: list[Response]) -> dict[str, str]:
+        """Values of the {{output[-n]}} and {{output[-n].key}} references to earlier prompts of the chain."""
+        references: dict[str, str] = {}
+        for i, previous_output in enumerate(output):
+            name = f"output[-{len(output)-i}]"
+            if isinstance(previous_output.response, dict):
+                references[name] = json.dumps(previous_output.response)
+                for key, value in previous_output.response.items():
+                    references[f"{name}.{key}"] = str(value)
+            else:
+                references[name] = str(previous_output.response)
+        return references
+
     @retry(
-        stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)
+        stop=stop_after_attempt(3) | stop_at_deadline,
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_not_exception_type(NOT_RETRIED),
     )
     async def _handle_anthropic_call(
         self, prompt: ClientPrompt, model: str, context: dict[str, Any]
     ) -> Response:
         try:
-            content = self._prepare_content_for_anthropic(prompt, context)
-
-            if prompt.return_model is not None:
-                llm = self._get_instructor(self.anthropic_client)
-                response = await llm.chat.completions.create(
-                    model=model,
-                    messages=[{"role": "user", "content": content}],
-                    response_model=prompt.return_model,
-                    max_tokens=4096,
-                    temperature=0,
-                )
+            messages = self._anthropic_messages(prompt, context)
+
+            async with self._attempt("anthropic", model):
+                if prompt.return_model is not None:
+                    llm = self._get_instructor(self.anthropic_client)
+                    response, message = await llm.chat.completions.create_with_completion(
+                        model=model,
+                        messages=messages,
+                        response_model=prompt.return_model,
+                        max_tokens=4096,
+                        temperature=0,
+                    )
 
-            else:
-                message = await self.anthropic_client.messages.create(
-                    model=model,
-                    max_tokens=4096,
-                    temperature=0,
-                    messages=[{"role": "user", "content": content}],
-                )
-
-                if isinstance(message.content[0], TextBlock):
-                    response = message.content[0].text
                 else:
-                    response = ""
+                    from anthropic.types.text_block import TextBlock
+
+                    message = await self.anthropic_client.messages.create(
+                        model=model,
+                        max_tokens=4096,
+                        temperature=0,
+                        messages=messages,
+                    )
 
-            return Response(response=response)
+                    if isinstance(message.content[0], TextBlock):
+                        response = message.content[0].text
+                    else:
+                        response = ""
+
+            return self._response("anthropic", model, response, message)
+        except NOT_RETRIED:
+            raise
         except Exception as e:
             logger.error(f"Error in Anthropic API call: {str(e)}")
             raise APICallError(f"Error in Anthropic API call: {str(e)}") from e
 
     @retry(
-        stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)
+        stop=stop_after_attempt(3) | stop_at_deadline,
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_not_exception_type(NOT_RETRIED),
     )
     async def _handle_openai_call(
         self, prompt: ClientPrompt, model: str, context: dict[str, Any]
     ) -> Response:
         try:
-            message = self._prepare_content_for_openai(prompt, context)
+            messages = self._chat_messages(prompt, context, self._prepare_content_for_openai)
+
+            async with self._attempt("openai", model):
+                if prompt.return_model is not None:
+                    llm = self._get_instructor(self.openai_client)
+                    response_obj, raw_response = await llm.chat.completions.create_with_completion(
+                        model=model,
+                        messages=messages,
+                        response_model=prompt.return_model,
+                        temperature=0,
+                    )
 
-            if prompt.return_model is not None:
-                llm = self._get_instructor(self.openai_client)
-                response_obj = await llm.chat.completions.create(
-                    model=model,
-                    messages=[{"role": "user", "content": message}],
-                    response_model=prompt.return_model,
-                    temperature=0,
-                )
-
-                return Response(response=response_obj)
-            else:
-                raw_response = await self.openai_client.chat.completions.create(
-                    model=model,
-                    messages=[{"role": "user", "content": message}],
-                    temperature=0,
-                )
+                    return self._response("openai", model, response_obj, raw_response)
+                else:
+                    raw_response = await self.openai_client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=0,
+                    )
 
-                response = raw_response.choices[0].message.content
+                    response = raw_response.choices[0].message.content
 
-                return Response(response=response)
+                    return self._response("openai", model, response, raw_response)
 
+        except NOT_RETRIED:
+            raise
         except Exception as e:
             logger.error(f"Error in OpenAI API call: {str(e)}")
             raise APICallError(f"Error in OpenAI API call: {str(e)}") from e
     
     @retry(
-        stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)
+        stop=stop_after_attempt(3) | stop_at_deadline,
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_not_exception_type(NOT_RETRIED),
     )
     async def _handle_deepseek_reasoner_call(
         self, prompt: ClientPrompt, context: dict[str, Any]
     ) -> Response:
         try:
-            message = self._prepare_content_for_deepseek(prompt, context)
+            messages = self._chat_messages(prompt, context, self._prepare_content_for_deepseek)
 
             if prompt.return_model is not None:
                 raise NotImplementedError("deepseek-reasoner does not support return_model yet")
@@ -226,50 +423,58 @@ class MinimalChainable:
 
                 # return Response(response=response)
             else:
-                raw_response = await self.deepseek_client.chat.completions.create(
-                    model="deepseek-reasoner",
-                    messages=[{"role": "user", "content": message}],
-                    temperature=0,
-                )
+                async with self._attempt("deepseek", "deepseek-reasoner"):
+                    raw_response = await self.deepseek_client.chat.completions.create(
+                        model="deepseek-reasoner",
+                        messages=messages,
+                        temperature=0,
+                    )
 
                 response = raw_response.choices[0].message.content
 
-                return Response(response=response)
+                return self._response("deepseek", "deepseek-reasoner", response, raw_response)
 
+        except NOT_RETRIED:
+            raise
         except Exception as e:
             logger.error(f"Error in DeepSeek API call: {str(e)}")
             raise APICallError(f"Error in DeepSeek API call: {str(e)}") from e
 
     @retry(
-        stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)
+        stop=stop_after_attempt(3) | stop_at_deadline,
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_not_exception_type(NOT_RETRIED),
     )
     async def _handle_deepseek_chat_call(
         self, prompt: ClientPrompt, context: dict[str, Any]
     ) -> Response:
         try:
-            message = self._prepare_content_for_deepseek(prompt, context)
+            messages = self._chat_messages(prompt, context, self._prepare_content_for_deepseek)
+
+            async with self._attempt("deepseek", "deepseek-chat"):
+                if prompt.return_model is not None:
+                    llm = self._get_instructor(self.deepseek_client)
+                    response_obj, raw_response = await llm.chat.completions.create_with_completion(
+                        model="deepseek-chat",
+                        messages=messages,
+                        response_model=prompt.return_model,
+                        temperature=0,
+                    )
 
-            if prompt.return_model is not None:
-                llm = self._get_instructor(self.deepseek_client)
-                response_obj = await llm.chat.completions.create(
-                    model="deepseek-chat",
-                    messages=[{"role": "user", "content": message}],
-                    response_model=prompt.return_model,
-                    temperature=0,
-                )
-
-                return Response(response=response_obj)
-            else:
-                raw_response = await self.deepseek_client.chat.completions.create(
-                    model="deepseek-chat",
-                    messages=[{"role": "user", "content": message}],
-                    temperature=0,
-                )
+                    return self._response("deepseek", "deepseek-chat", response_obj, raw_response)
+                else:
+                    raw_response = await self.deepseek_client.chat.completions.create(
+                        model="deepseek-chat",
+                        messages=messages,
+                        temperature=0,
+                    )
 
-                response = raw_response.choices[0].message.content
+                    response = raw_response.choices[0].message.content
 
-                return Response(response=response)
+                    return self._response("deepseek", "deepseek-chat", response, raw_response)
 
+        except NOT_RETRIED:
+            raise
         except Exception as e:
             logger.error(f"Error in DeepSeek API call: {str(e)}")
             raise APICallError(f"Error in DeepSeek API call: {str(e)}") from e
@@ -280,6 +485,22 @@ class MinimalChainable:
         model: str,
         prompt: ClientPrompt,
         context: dict[str, Any],
+    ) -> Response:
+        with start_span("llm prompt", {"llm.provider": client, "llm.model": model}):
+            # Queueing, attempts and retry waits are all cancelled at the node's deadline.
+            async with within_deadline(f"{client} {model} call"):
+                response = await self._dispatch_prompt(client, model, prompt, context)
+            set_attributes({
+                f"llm.{key}": value for key, value in ((response.metadata or {}).get("usage") or {}).items()
+            })
+            return response
+
+    async def _dispatch_prompt(
+        self,
+        client: Literal['openai', 'anthropic', 'deepseek'],
+        model: str,
+        prompt: ClientPrompt,
+        context: dict[str, Any],
     ) -> Response:
         if not model in self.model_supported_by_client[client]:
             raise ValueError(f"Unsupported model type: {model}")
@@ -301,6 +522,29 @@ class MinimalChainable:
         else:
             raise ValueError(f"Unsupported client type: {client}")
 
+    @staticmethod
+    def _attach_return_models(prompts: list[ClientPrompt], returns_model: dict[int, type[BaseModel]]) -> None:
+        for k, v in returns_model.items():
+            prompts[k].return_model = v
+            prompts[k].prompt = (
+                prompts[k].prompt
+                + "\n\n Model schema: "
+                + json.dumps(v.model_json_schema())
+            )
+
+    def _render(self, prompt: ClientPrompt, context: dict[str, Any], output: list[Response]) -> dict[str, Any]:
+        """Fill in the prompt's placeholders and return the context its call needs."""
+        if prompt.layout == "cached":
+            # The template stays static; placeholder values travel after it (see _variables_block).
+            return {**context, **self._output_references(output)}
+
+        for key, value in context.items():
+            prompt.prompt = prompt.prompt.replace(f"{{{{{key}}}}}", str(value))
+
+        for name, value in self._output_references(output).items():
+            prompt.prompt = prompt.prompt.replace(f"{{{{{name}}}}}", value)
+        return context
+
     async def run(
         self,
         client: Literal['openai', 'anthropic', 'deepseek'],
@@ -308,50 +552,135 @@ class MinimalChainable:
         prompts: list[ClientPrompt],
         context: dict[str, Any] | None = None,
         returns_model: dict[int, type[BaseModel]] | None = None,
+        chain: str | None = None,
     ) -> list[Response]:
-
-        logger.info(f"Run method called with client type: {client}")
+        """
+        Run the prompts in order. With a routing policy, `chain` names the prompt chain so
+        the policy can pick its (client, model); `client`/`model` are then the default route.
+        """
         output: list[Response] = []
 
         if context is None:
             context = {}
 
-        if returns_model is None:
-            returns_model = {}
+        self._attach_return_models(prompts, returns_model or {})
 
-        for k, v in returns_model.items():
-            prompts[k].return_model = v
-            prompts[k].prompt = (
-                prompts[k].prompt
-                + "\n\n Model schema: "
-                + json.dumps(v.model_json_schema())
-            )
+        client, model = self._route(chain, client, model, prompts)
+        logger.info(f"Run method called with client type: {client}")
 
         for prompt in prompts:
-            for key, value in context.items():
-                prompt.prompt = prompt.prompt.replace(f"{{{{{key}}}}}", str(value))
-
-            for i, previous_output in enumerate(output):
-                if isinstance(previous_output.response, dict):
-                    prompt.prompt = prompt.prompt.replace(
-                        f"{{{{output[-{len(output)-i}]}}}}",
-                        json.dumps(previous_output.response),
-                    )
-                    for key, value in previous_output.response.items():
-                        prompt.prompt = prompt.prompt.replace(
-                            f"{{{{output[-{len(output)-i}].{key}}}}}", str(value)
-                        )
-                else:
-                    prompt.prompt = prompt.prompt.replace(
-                        f"{{{{output[-{len(output)-i}]}}}}",
-                        str(previous_output.response),
-                    )
+            prompt_context = self._render(prompt, context, output)
 
+            started = time.perf_counter()
             try:
-                result = await self._handle_prompt(client, model, prompt, context)
+                result = await self._handle_prompt(client, model, prompt, prompt_context)
                 output.append(result)
+                if self.routing_policy is not None and chain is not None:
+                    self.routing_policy.record(
+                        chain, (client, model), True, time.perf_counter() - started, result.metadata["usage"]
+                    )
             except APICallError as e:
                 logger.error(f"Error in API call: {str(e)}")
                 output.append(Response(response=f"Error: {str(e)}"))
+                if self.routing_policy is not None and chain is not None:
+                    self.routing_policy.record(chain, (client, model), False, time.perf_counter() - started, None)
+
+        return output
+
+    def _batch_api(self, client: str) -> OpenAIBatchAPI | AnthropicBatchAPI:
+        if client == "openai":
+            return OpenAIBatchAPI(
+                self.openai_client,
+                self.settings.LLM_BATCH_POLL_SECONDS,
+                self.settings.LLM_BATCH_MAX_WAIT_SECONDS,
+                self.settings.LLM_BATCH_COMPLETION_WINDOW,
+            )
+        if client == "anthropic":
+            return AnthropicBatchAPI(
+                self.anthropic_client,
+                self.settings.LLM_BATCH_POLL_SECONDS,
+                self.settings.LLM_BATCH_MAX_WAIT_SECONDS,
+            )
+        raise ValueError(f"No batch API for client type: {client}")
+
+    def _batch_response(
+        self,
+        api: OpenAIBatchAPI | AnthropicBatchAPI,
+        model: str,
+        batch_id: str,
+        prompt: ClientPrompt,
+        result: tuple[Any, str | None] | None,
+    ) -> Response:
+        completion, error = result or (None, "Missing from the batch results")
+        if error is None:
+            try:
+                response = api.parse(completion, prompt.return_model)
+            except Exception as e:
+                error = f"Invalid response: {str(e)}"
+        if error is not None:
+            logger.error(f"Error in {api.provider} batch {batch_id}: {error}")
+            return Response(response=f"Error: {error}", error=error, metadata={"batch_id": batch_id})
+
+        usage = self._usage(completion)
+        cost = llm_cost(api.provider, model, usage, self.settings.LLM_PRICES, batch=True)
+        record_llm_usage(api.provider, model, usage, cost)
+        record_cost(api.provider, model, usage, cost)
+        return Response(
+            response=response,
+            metadata={"usage": usage, "cost_usd": cost, "provider": api.provider, "model": model, "batch_id": batch_id},
+        )
+
+    async def run_batch(
+        self,
+        client: Literal['openai', 'anthropic'],
+        model: str,
+        prompts: list[ClientPrompt],
+        contexts: list[dict[str, Any]],
+        returns_model: dict[int, type[BaseModel]] | None = None,
+    ) -> list[list[Response]]:
+        """
+        Run the prompt chain once per context through the provider's batch API, for work that
+        can wait: half the price and outside the interactive rate limits, but results only come
+        within the completion window. Each prompt of the chain is one batch job over every
+        context; a context whose prompt fails gets an error Response and stops there.
+        Returns one list of Responses per context, like `run` does for a single one.
+        """
+        if model not in self.model_supported_by_client.get(client, set()):
+            raise ValueError(f"Unsupported model type: {model}")
+
+        logger.info(f"Run batch called with client type: {client} for {len(contexts)} contexts")
+        api = self._batch_api(client)
+        self._attach_return_models(prompts, returns_model or {})
+        outputs: list[list[Response]] = [[] for _ in contexts]
+
+        for step, template in enumerate(prompts):
+            pending: dict[str, tuple[int, ClientPrompt]] = {}
+            requests: list[dict[str, Any]] = []
+            for index, context in enumerate(contexts):
+                if outputs[index] and outputs[index][-1].error is not None:
+                    continue
+                prompt = template.model_copy()
+                prompt_context = self._render(prompt, context, outputs[index])
+                if client == "anthropic":
+                    messages = self._anthropic_messages(prompt, prompt_context)
+                else:
+                    messages = self._chat_messages(prompt, prompt_context, self._prepare_content_for_openai)
+
+                custom_id = f"step{step}-item{index}"
+                pending[custom_id] = (index, prompt)
+                requests.append(api.request(custom_id, model, messages, prompt.return_model))
+
+            if not requests:
+                break
+
+            with start_span("llm batch", {"llm.provider": client, "llm.model": model, "llm.batch_size": len(requests)}):
+                try:
+                    batch_id, results = await api.run(requests)
+                except Exception as e:
+                    logger.error(f"Error in {client} batch: {str(e)}")
+                    batch_id, results = "", {custom_id: (None, str(e)) for custom_id in pending}
+
+            for custom_id, (index, prompt) in pending.items():
+                outputs[index].append(self._batch_response(api, model, batch_id, prompt, results.get(custom_id)))
 
-        return output
\ No newline at end of file
+        return outputs
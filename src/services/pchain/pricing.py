@@ -0,0 +1,39 @@
+from typing import Any, Dict, Optional
+
+# OpenAI and Anthropic bill batch API calls at half price.
+BATCH_DISCOUNT = 0.5
+
+# USD per million tokens. "cached_input" is billed for prompt-cache reads, "cache_write" for
+# Anthropic cache writes; both fall back to "input" when missing. Override with LLM_PRICES.
+DEFAULT_PRICES: Dict[str, Dict[str, float]] = {
+    "deepseek:deepseek-chat": {"input": 0.27, "cached_input": 0.07, "output": 1.10},
+    "deepseek:deepseek-reasoner": {"input": 0.55, "cached_input": 0.14, "output": 2.19},
+    "openai:gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "anthropic:claude-3-5-sonnet": {"input": 3.00, "cached_input": 0.30, "cache_write": 3.75, "output": 15.00},
+}
+
+
+def llm_cost(
+    provider: str,
+    model: str,
+    usage: Optional[Dict[str, Any]],
+    prices: Optional[Dict[str, Dict[str, float]]] = None,
+    batch: bool = False,
+) -> Optional[float]:
+    """Cost in USD of one call from its usage; None when the model has no price."""
+    if not usage:
+        return None
+    price = {**DEFAULT_PRICES, **(prices or {})}.get(f"{provider}:{model}")
+    if price is None:
+        return None
+
+    cached = usage.get("cached_tokens") or 0
+    cache_write = usage.get("cache_write_tokens") or 0
+    uncached = max((usage.get("prompt_tokens") or 0) - cached - cache_write, 0)
+    total = (
+        uncached * price["input"]
+        + cached * price.get("cached_input", price["input"])
+        + cache_write * price.get("cache_write", price["input"])
+        + (usage.get("completion_tokens") or 0) * price["output"]
+    )
+    return total / 1_000_000 * (BATCH_DISCOUNT if batch else 1.0)
@@ -0,0 +1,126 @@
+import time
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.core.settings import Settings
+from src.services.pchain.chain_prompt_manager import ChainPromptManager
+from src.services.pchain.pricing import llm_cost
+
+Route = Tuple[str, str]
+
+
+def parse_route(route: str) -> Route:
+    client, _, model = route.partition(":")
+    return client, model
+
+
+class RouteStats:
+    """Outcome, latency and token usage of the last calls of one chain on one route."""
+
+    def __init__(self, window: int) -> None:
+        self.calls: Deque[Tuple[bool, float, Optional[Dict[str, Any]]]] = deque(maxlen=window)
+        self.last_call = 0.0
+
+    def record(self, ok: bool, seconds: float, usage: Optional[Dict[str, Any]]) -> None:
+        self.calls.append((ok, seconds, usage))
+        self.last_call = time.monotonic()
+
+    @property
+    def samples(self) -> int:
+        return len(self.calls)
+
+    @property
+    def success_rate(self) -> float:
+        return sum(ok for ok, _, _ in self.calls) / len(self.calls) if self.calls else 1.0
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        latencies = [seconds for ok, seconds, _ in self.calls if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def usages(self) -> List[Dict[str, Any]]:
+        return [usage for ok, _, usage in self.calls if ok and usage]
+
+
+class RoutingPolicy:
+    """
+    Picks the (client, model) a chain runs on. Candidates come from the chain's prompt JSON:
+
+        "routing": {"candidates": ["deepseek:deepseek-chat", "openai:gpt-4o"],
+                    "max_latency_seconds": 30, "min_success_rate": 0.8}
+
+    in order of preference, defaulting to the route the caller asked for. Routes failing
+    too often or slower than `max_latency_seconds` over the recent window are skipped
+    while another one is healthy (and retried after ROUTING_COOLDOWN_SECONDS). When the run
+    has a budget, each route's cost is estimated by pricing the chain's mean observed token
+    usage at that route; the first one that fits what is left wins, else the cheapest.
+    """
+
+    def __init__(self, settings: Settings, chain_prompt_manager: ChainPromptManager) -> None:
+        self.settings = settings
+        self.chain_prompt_manager = chain_prompt_manager
+        self._stats: Dict[Tuple[str, Route], RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def candidates(self, chain: str, default: Route) -> List[Route]:
+        routing = self.chain_prompt_manager.get_chain_routing(chain) or {}
+        routes = [parse_route(route) for route in routing.get("candidates", [])]
+        return routes or [default]
+
+    def choose(self, chain: str, candidates: List[Route], remaining_usd: Optional[float] = None) -> Route:
+        routing = self.chain_prompt_manager.get_chain_routing(chain) or {}
+        max_latency = routing.get("max_latency_seconds")
+        min_success_rate = routing.get("min_success_rate", self.settings.ROUTING_MIN_SUCCESS_RATE)
+
+        healthy = []
+        for route in candidates:
+            stats = self._stats.get((chain, route))
+            if (
+                stats is None
+                or stats.samples < self.settings.ROUTING_MIN_SAMPLES
+                or time.monotonic() - stats.last_call > self.settings.ROUTING_COOLDOWN_SECONDS
+            ):
+                healthy.append(route)
+            elif stats.success_rate >= min_success_rate and (
+                max_latency is None or (stats.mean_latency or 0.0) <= max_latency
+            ):
+                healthy.append(route)
+        pool = healthy or candidates
+
+        if remaining_usd is None:
+            return pool[0]
+
+        usage = self._mean_usage(chain)
+        if usage is None:
+            return pool[0]
+
+        def expected_cost(route: Route) -> float:
+            cost = llm_cost(*route, usage, self.settings.LLM_PRICES)
+            return float("inf") if cost is None else cost
+
+        for route in pool:
+            if expected_cost(route) <= remaining_usd:
+                return route
+        cheapest = min(pool, key=expected_cost)
+        logger.warning(f"Run budget exhausted; routing {chain} to the cheapest route {cheapest[0]}:{cheapest[1]}")
+        return cheapest
+
+    def _mean_usage(self, chain: str) -> Optional[Dict[str, float]]:
+        """Mean token usage of the chain's recent calls on any route (prompts barely change between routes)."""
+        with self._lock:
+            usages = [usage for (name, _), stats in self._stats.items() if name == chain for usage in stats.usages()]
+        if not usages:
+            return None
+        return {
+            kind: sum(usage.get(kind) or 0 for usage in usages) / len(usages)
+            for kind in ("prompt_tokens", "completion_tokens", "cached_tokens", "cache_write_tokens")
+        }
+
+    def record(self, chain: str, route: Route, ok: bool, seconds: float, usage: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            stats = self._stats.setdefault((chain, route), RouteStats(self.settings.ROUTING_WINDOW))
+            stats.record(ok, seconds, usage)
+
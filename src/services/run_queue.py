@@ -0,0 +1,247 @@
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+
+from src.utils.subtitles import WordTimings
+
+DEFAULT_POOL = "default"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    pool TEXT NOT NULL,
+    entry_point TEXT NOT NULL,
+    state TEXT NOT NULL,
+    costs TEXT,
+    result TEXT,
+    error TEXT,
+    history TEXT NOT NULL DEFAULT '[]',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_claimable ON runs (status, pool, created_at);
+"""
+
+
+class StageHandoff(Exception):
+    """Raised before a graph stage this process does not serve; the run continues on another worker."""
+
+    def __init__(self, stage: str, pool: str, state: Dict[str, Any]) -> None:
+        super().__init__(f"{stage} runs on {pool} workers")
+        self.stage = stage
+        self.pool = pool
+        self.state = state
+
+
+class Lease(NamedTuple):
+    run_id: str
+    entry_point: str
+    state: Dict[str, Any]
+    costs: Optional[Dict[str, Any]]
+    attempt: int
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, WordTimings):
+        return {"__word_timings__": value.to_dict()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _decode(value: Dict[str, Any]) -> Any:
+    if "__word_timings__" in value:
+        return WordTimings.from_dict(value["__word_timings__"])
+    return value
+
+
+def dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_encode)
+
+
+def loads(value: Optional[str]) -> Any:
+    return None if value is None else json.loads(value, object_hook=_decode)
+
+
+class RunQueue:
+    """
+    Durable queue of pipeline runs in SQLite, shared by the API and any number of worker
+    processes (every process opens the same file, so workers on other machines need it on
+    shared storage, together with the run workspaces).
+
+    Workers claim runs of the pools they serve with a lease and keep it with heartbeats. A
+    run whose lease expires (its worker died or hung) is claimed again from its last
+    checkpoint, up to `max_attempts` times. Every write made on behalf of a lease is fenced
+    by worker id and attempt, so a worker that lost its lease cannot overwrite the new owner.
+
+    A run is checkpointed when it reaches a stage of another pool (`hand_off`): its state
+    is stored and it is queued again on that pool, entering the graph at that stage.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60, max_attempts: int = 3) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def _write(self, sql: str, params: Iterable[Any]) -> bool:
+        with self._lock:
+            return self._db.execute(sql, tuple(params)).rowcount > 0
+
+    def enqueue(
+        self,
+        state: Dict[str, Any],
+        entry_point: str = "choose_story",
+        pool: str = DEFAULT_POOL,
+        run_id: Optional[str] = None,
+    ) -> str:
+        run_id = run_id or uuid.uuid4().hex
+        now = time.time()
+        self._write(
+            "INSERT INTO runs (run_id, status, pool, entry_point, state, created_at, updated_at) "
+            "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+            (run_id, pool, entry_point, dumps(state), now, now),
+        )
+        return run_id
+
+    def claim(self, worker_id: str, pools: Iterable[str]) -> Optional[Lease]:
+        """Lease the oldest claimable run of `pools`: queued, or running with an expired lease."""
+        pools = list(pools)
+        marks = ", ".join("?" for _ in pools)
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE runs SET status = 'failed', error = 'Lease expired ' || attempts || ' times', "
+                    "worker_id = NULL, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                row = self._db.execute(
+                    f"SELECT run_id, entry_point, state, costs, attempts FROM runs "
+                    f"WHERE pool IN ({marks}) AND (status = 'queued' OR (status = 'running' AND lease_expires_at < ?)) "
+                    f"ORDER BY created_at LIMIT 1",
+                    (*pools, now),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE runs SET status = 'running', worker_id = ?, attempts = attempts + 1, "
+                        "lease_expires_at = ?, updated_at = ? WHERE run_id = ?",
+                        (worker_id, now + self.lease_seconds, now, row[0]),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        run_id, entry_point, state, costs, attempts = row
+        return Lease(run_id, entry_point, loads(state), loads(costs), attempts + 1)
+
+    def heartbeat(self, lease: Lease, worker_id: str) -> bool:
+        """Extend the lease; False once it was lost to another worker."""
+        now = time.time()
+        return self._write(
+            "UPDATE runs SET lease_expires_at = ?, updated_at = ? "
+            "WHERE run_id = ? AND status = 'running' AND worker_id = ? AND attempts = ?",
+            (now + self.lease_seconds, now, lease.run_id, worker_id, lease.attempt),
+        )
+
+    def _finish(self, lease: Lease, worker_id: str, assignments: str, params: Iterable[Any], segment: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT history FROM runs WHERE run_id = ? AND status = 'running' AND worker_id = ? AND attempts = ?",
+                    (lease.run_id, worker_id, lease.attempt),
+                ).fetchone()
+                if row is not None:
+                    history = json.loads(row[0]) + [{"worker_id": worker_id, "entry_point": lease.entry_point, **segment}]
+                    self._db.execute(
+                        f"UPDATE runs SET {assignments}, history = ?, worker_id = NULL, lease_expires_at = NULL, "
+                        f"updated_at = ? WHERE run_id = ?",
+                        (*params, json.dumps(history), time.time(), lease.run_id),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return row is not None
+
+    def complete(self, lease: Lease, worker_id: str, result: Dict[str, Any], segment: Dict[str, Any]) -> bool:
+        return self._finish(
+            lease, worker_id, "status = 'succeeded', result = ?, costs = ?",
+            (dumps(result), dumps(result.get("cost"))), {**segment, "outcome": "succeeded"},
+        )
+
+    def hand_off(self, lease: Lease, worker_id: str, handoff: StageHandoff, costs: Dict[str, Any], segment: Dict[str, Any]) -> bool:
+        """Checkpoint the run and queue it for the pool of the stage it reached."""
+        return self._finish(
+            lease, worker_id, "status = 'queued', pool = ?, entry_point = ?, state = ?, costs = ?, attempts = 0",
+            (handoff.pool, handoff.stage, dumps(handoff.state), dumps(costs)),
+            {**segment, "outcome": f"handed off to {handoff.pool} at {handoff.stage}"},
+        )
+
+    def fail(self, lease: Lease, worker_id: str, error: str, segment: Dict[str, Any], retry: bool = True) -> bool:
+        """Queue the run again from its checkpoint, or fail it once out of attempts."""
+        if retry and lease.attempt < self.max_attempts:
+            return self._finish(lease, worker_id, "status = 'queued', error = ?", (error,), {**segment, "outcome": "retrying", "error": error})
+        return self._finish(lease, worker_id, "status = 'failed', error = ?", (error,), {**segment, "outcome": "failed", "error": error})
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT run_id, status, pool, entry_point, attempts, worker_id, result, error, history, created_at, updated_at "
+                "FROM runs WHERE run_id = ?",
+                (run_id,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        run_id, status, pool, entry_point, attempts, worker_id, result, error, history, created_at, updated_at = row
+        return {
+            "run_id": run_id,
+            "status": status,
+            "pool": pool,
+            "stage": entry_point,
+            "attempts": attempts,
+            "worker_id": worker_id,
+            "result": loads(result),
+            "error": error,
+            "history": json.loads(history),
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM runs GROUP BY status").fetchall())
+
+    async def wait(self, run_id: str, poll_seconds: float = 1.0) -> Dict[str, Any]:
+        """Poll until the run succeeded or failed."""
+        while True:
+            run = await asyncio.to_thread(self.get, run_id)
+            if run is None:
+                raise KeyError(run_id)
+            if run["status"] in ("succeeded", "failed"):
+                return run
+            await asyncio.sleep(poll_seconds)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
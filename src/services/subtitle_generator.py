@@ -1,11 +1,49 @@
-from typing import List, Tuple, Any, Literal, Optional
+import time
+import threading
+from typing import TYPE_CHECKING, Dict, List, Tuple, Any, Literal, Optional
 
-from faster_whisper import WhisperModel
+from src.services.transcription_cache import TranscriptionCache
+from src.utils.artifacts import add_artifact, hashed_open
+from src.utils.deadlines import check_deadline
+from src.utils.metrics import record_transcription
+from src.utils.tracing import start_span
+from src.utils.subtitles import WordTimings, segment_word_timings, word_by_word_timings
+
+if TYPE_CHECKING:
+    from faster_whisper import WhisperModel
 
 class SubtitleGenerator:
 
-    def __init__(self):
-        self.model = WhisperModel("medium", compute_type="float32")
+    def __init__(
+        self,
+        cache: Optional[TranscriptionCache] = None,
+        num_workers: int = 1,
+        model_size: str = "medium",
+        compute_type: str = "float32",
+    ):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.beam_size = 5
+        self.num_workers = num_workers
+        self.cache = cache
+        self._model: Optional["WhisperModel"] = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self) -> "WhisperModel":
+        """The Whisper model, loaded on first use (or by a warm-up) and shared afterwards."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from faster_whisper import WhisperModel
+
+                    # num_workers > 1 lets concurrent transcribe() calls (e.g. one per language) run in parallel.
+                    self._model = WhisperModel(self.model_size, compute_type=self.compute_type, num_workers=self.num_workers)
+        return self._model
 
     def combine_word_segments(self, words: List[Any], max_words: int = 15, min_pause: int = 0.5) -> Optional[List[Tuple[float, float, str]]]:
             try:
@@ -54,6 +92,21 @@ class SubtitleGenerator:
             print(f"Error in word_by_word_segments: {e}")
             return None
 
+    def combine_word_timings(
+        self,
+        timings: WordTimings,
+        max_words: int = 15,
+        min_pause: float = 0.5,
+        max_chars: Optional[int] = None,
+        max_duration: Optional[float] = None,
+    ) -> Optional[List[Tuple[float, float, str]]]:
+        try:
+            return segment_word_timings(timings, max_words, min_pause, max_chars, max_duration)
+
+        except Exception as e:
+            print(f"Error in combine_word_timings: {e}")
+            return None
+
     def format_timestamp(self, seconds: int |  float) -> str:
         ms = int((seconds - int(seconds)) * 1000)
         s = int(seconds)
@@ -62,32 +115,83 @@ class SubtitleGenerator:
         s = s % 60
         return f"{h:02}:{m:02}:{s:02},{ms:03}"
 
+    def transcription_params(self, language: Optional[str] = None) -> dict:
+        return {
+            "model": self.model_size,
+            "compute_type": self.compute_type,
+            "beam_size": self.beam_size,
+            "word_timestamps": True,
+            "language": language,
+        }
+
+    def get_word_timings(self, audio_file: str, language: Optional[str] = None) -> WordTimings:
+        with start_span("whisper transcribe", {"whisper.language": language, "whisper.model": self.model_size}) as span:
+            return self._get_word_timings(audio_file, language, span)
+
+    def _get_word_timings(self, audio_file: str, language: Optional[str], span) -> WordTimings:
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(audio_file, self.transcription_params(language))
+            timings = self.cache.get(cache_key)
+            span.set_attribute("whisper.cache_hit", timings is not None)
+            if timings is not None:
+                return timings
+
+        started = time.perf_counter()
+        segments, info = self.model.transcribe(
+            audio_file, beam_size=self.beam_size, word_timestamps=True, language=language
+        )
+
+        # Segments are decoded lazily, so the transcription is only done once they are consumed.
+        all_words = []
+        for segment in segments:
+            check_deadline("Transcription")
+            if segment.words:
+                all_words.extend(segment.words)
+        elapsed = time.perf_counter() - started
+        record_transcription(language, elapsed, info.duration)
+        span.set_attribute("whisper.audio_seconds", info.duration)
+        if info.duration > 0:
+            span.set_attribute("whisper.real_time_factor", elapsed / info.duration)
+
+        timings = WordTimings.from_words(all_words)
+        if cache_key is not None:
+            self.cache.put(cache_key, timings)
+
+        return timings
+
     # 🧠 Transcribe and translate function
-    def get_subtitles(self, audio_file: str, str_name: str, segment_type: Literal['word', 'sentence']) -> Optional[str]:
+    def get_subtitles(
+        self,
+        audio_file: str,
+        str_name: str,
+        segment_type: Literal['word', 'sentence'],
+        artifacts: Optional[List[Dict[str, Any]]] = None,
+        timings: Optional[WordTimings] = None,
+        output_dir: str = "temp",
+    ) -> Optional[str]:
         try:
-            segments, info = self.model.transcribe(audio_file, beam_size=5, word_timestamps=True)
+            if timings is None:
+                timings = self.get_word_timings(audio_file)
 
             # Create SRT
-            all_words = []
-            for segment in segments:
-                if segment.words:
-                    all_words.extend(segment.words)
-
             if segment_type == 'word':
-                srt_chunks = self.word_by_word_segments(all_words)
+                srt_chunks = word_by_word_timings(timings)
             elif segment_type == 'sentence':
-                srt_chunks = self.combine_word_segments(all_words)
+                srt_chunks = self.combine_word_timings(timings)
             else:
                 raise ValueError("Invalid segment_type. Choose 'word' or 'sentence'.")
             
             if srt_chunks is None:
                 raise ValueError("No segments found.")
 
-            original_srt_path = f"temp/{str_name}.srt"
-            with open(original_srt_path, "w", encoding="utf-8") as f:
+            original_srt_path = f"{output_dir}/{str_name}.srt"
+            with hashed_open(original_srt_path) as f:
                 for idx, (start, end, text) in enumerate(srt_chunks, start=1):
                     f.write(f"{idx}\n{self.format_timestamp(start)} --> {self.format_timestamp(end)}\n{text}\n\n")
 
+            add_artifact(artifacts, f.record(original_srt_path, duration=srt_chunks[-1][1] if srt_chunks else 0.0))
+
             return original_srt_path
         
         except Exception as e:
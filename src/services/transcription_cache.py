@@ -0,0 +1,70 @@
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.services.disk_cache import DiskCache, file_digest
+from src.utils.subtitles import WordTimings
+
+
+class TranscriptionCache(DiskCache):
+    """
+    Word timings cached by audio content and transcription parameters.
+
+    The arrays are stored instead of the SRT so any segmentation or subtitle
+    format can be rebuilt without running Whisper again.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        super().__init__(directory, max_bytes, suffix=".npz")
+
+    @staticmethod
+    def make_key(audio_file: str, params: Dict[str, Any]) -> str:
+        key = hashlib.sha256()
+        key.update(file_digest(audio_file).encode())
+        key.update(json.dumps(params, sort_keys=True).encode())
+        return key.hexdigest()
+
+    def get(self, key: str) -> Optional[WordTimings]:
+        """Cached timings for `key`; unreadable entries are dropped and count as a miss."""
+        path = self.locate(key)
+        if path is None:
+            self.count(hit=False)
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                timings = WordTimings(
+                    starts=data["starts"],
+                    ends=data["ends"],
+                    token_ids=data["token_ids"],
+                    tokens=data["tokens"].tolist(),
+                )
+        except Exception as e:
+            print(f"Error reading cached transcription: {e}")
+            self.discard(key)
+            self.count(hit=False)
+            return None
+
+        self.count(hit=True)
+        return timings
+
+    def put(self, key: str, timings: WordTimings) -> bool:
+        temp_path = self.temp_path_for(key)
+        try:
+            with open(temp_path, "wb") as f:
+                np.savez(
+                    f,
+                    starts=timings.starts,
+                    ends=timings.ends,
+                    token_ids=timings.token_ids,
+                    tokens=np.asarray(timings.tokens, dtype=str),
+                )
+            self.commit(key, temp_path)
+            return True
+
+        except Exception as e:
+            print(f"Error caching transcription: {e}")
+            temp_path.unlink(missing_ok=True)
+            return False
@@ -0,0 +1,183 @@
+import os
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.settings import Settings
+from src.utils.deadlines import time_left
+from src.utils.subtitles import WordTimings, segment_word_timings
+
+# Ken Burns moves cycled over the images: zoom in, zoom out, pan left to right, pan right to left.
+KEN_BURNS_MOVES = [
+    ("min(1+0.15*on/{frames},1.15)", "iw/2-(iw/zoom/2)", "ih/2-(ih/zoom/2)"),
+    ("max(1.15-0.15*on/{frames},1)", "iw/2-(iw/zoom/2)", "ih/2-(ih/zoom/2)"),
+    ("1.12", "(iw-iw/zoom)*on/{frames}", "ih/2-(ih/zoom/2)"),
+    ("1.12", "(iw-iw/zoom)*(1-on/{frames})", "ih/2-(ih/zoom/2)"),
+]
+
+
+def format_srt_timestamp(seconds: float) -> str:
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02}:{m:02}:{s:02},{ms:03}"
+
+
+def escape_filter_path(path: str) -> str:
+    return path.replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+
+
+class VideoRenderer:
+    """
+    Builds a vertical video with local ffmpeg: one Ken Burns segment per image, encoded
+    in parallel with subtitles burnt in, then concatenated without re-encoding and muxed
+    with the narration.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+
+    def plan_segments(self, image_count: int, duration: float, timings: Optional[WordTimings]) -> List[Tuple[int, float, float]]:
+        """
+        Split the narration evenly between images, moving each cut to the nearest word start.
+        Returns (image index, start, end); images whose cuts snap together get no segment.
+        """
+        cuts = np.linspace(0.0, duration, image_count + 1)
+        if timings is not None and len(timings) > 1:
+            starts = timings.starts
+            inner = cuts[1:-1]
+            right = np.clip(np.searchsorted(starts, inner), 1, len(starts) - 1)
+            left = right - 1
+            nearest = np.where(inner - starts[left] <= starts[right] - inner, starts[left], starts[right])
+            cuts[1:-1] = np.maximum.accumulate(np.clip(nearest, 0.0, duration))
+
+        # Frame counts come from rounded cumulative times, so segments add up to the audio without drift.
+        fps = self.settings.VIDEO_FPS
+        frames = np.round(cuts * fps) / fps
+        return [(index, float(a), float(b)) for index, (a, b) in enumerate(zip(frames[:-1], frames[1:])) if b > a]
+
+    def _write_segment_srt(self, path: str, lines: List[Tuple[float, float, str]], start: float, end: float) -> bool:
+        entries = [(max(a, start) - start, min(b, end) - start, text) for a, b, text in lines if b > start and a < end]
+        if not entries:
+            return False
+
+        with open(path, "w", encoding="utf-8") as f:
+            for idx, (a, b, text) in enumerate(entries, start=1):
+                f.write(f"{idx}\n{format_srt_timestamp(a)} --> {format_srt_timestamp(b)}\n{text}\n\n")
+        return True
+
+    def _segment_command(self, index: int, image: str, start: float, end: float, srt: Optional[str], output: str) -> List[str]:
+        width, height, fps = self.settings.VIDEO_WIDTH, self.settings.VIDEO_HEIGHT, self.settings.VIDEO_FPS
+        frames = max(1, round((end - start) * fps))
+        zoom, x, y = (part.format(frames=frames) for part in KEN_BURNS_MOVES[index % len(KEN_BURNS_MOVES)])
+
+        # Upscale before zoompan to avoid its integer-pixel jitter.
+        filters = [
+            f"scale={width * 2}:{height * 2}:force_original_aspect_ratio=increase",
+            f"crop={width * 2}:{height * 2}",
+            f"zoompan=z='{zoom}':x='{x}':y='{y}':d={frames}:s={width}x{height}:fps={fps}",
+        ]
+        if srt is not None:
+            filters.append(f"subtitles='{escape_filter_path(srt)}':force_style='{self.settings.VIDEO_SUBTITLE_STYLE}'")
+        filters.append("format=yuv420p")
+
+        return [
+            self.settings.FFMPEG_BINARY, "-y", "-loglevel", "error",
+            "-i", image,
+            "-vf", ",".join(filters),
+            "-frames:v", str(frames),
+            "-c:v", "libx264",
+            "-preset", self.settings.VIDEO_PRESET,
+            "-crf", str(self.settings.VIDEO_CRF),
+            "-threads", str(self.settings.VIDEO_THREADS_PER_SEGMENT),
+            "-an",
+            output,
+        ]
+
+    def render(
+        self,
+        images: List[str],
+        audio_file: str,
+        duration: float,
+        output: str,
+        workdir: str,
+        timings: Optional[WordTimings] = None,
+    ) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            if not images:
+                raise ValueError("No images to render")
+
+            os.makedirs(workdir, exist_ok=True)
+            segments = self.plan_segments(len(images), duration, timings)
+            lines = []
+            if timings is not None:
+                lines = segment_word_timings(
+                    timings,
+                    max_words=self.settings.VIDEO_SUBTITLE_MAX_WORDS,
+                    max_chars=self.settings.VIDEO_SUBTITLE_MAX_CHARS,
+                )
+
+            commands = []
+            segment_files = []
+            for index, start, end in segments:
+                image = images[index]
+                srt = os.path.join(workdir, f"segment_{index:03}.srt")
+                if not self._write_segment_srt(srt, lines, start, end):
+                    srt = None
+                segment_file = os.path.join(workdir, f"segment_{index:03}.mp4")
+                segment_files.append(segment_file)
+                commands.append(self._segment_command(index, image, start, end, srt, segment_file))
+
+            # ffmpeg is killed at the deadline; the executor threads do not see it, so it is read here.
+            remaining = time_left()
+            ends_at = None if remaining is None else time.monotonic() + remaining
+
+            def run(command: List[str]) -> subprocess.CompletedProcess:
+                timeout = None if ends_at is None else max(ends_at - time.monotonic(), 0.001)
+                return subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+
+            with ThreadPoolExecutor(max_workers=self.settings.VIDEO_SEGMENT_WORKERS) as executor:
+                for result in executor.map(run, commands):
+                    if result.returncode != 0:
+                        raise RuntimeError(f"Segment encoding failed: {result.stderr.strip()}")
+            encoded = time.perf_counter()
+
+            concat_list = os.path.join(workdir, "segments.txt")
+            with open(concat_list, "w", encoding="utf-8") as f:
+                for segment_file in segment_files:
+                    f.write(f"file '{os.path.abspath(segment_file)}'\n")
+
+            result = run(
+                [
+                    self.settings.FFMPEG_BINARY, "-y", "-loglevel", "error",
+                    "-f", "concat", "-safe", "0", "-i", concat_list,
+                    "-i", audio_file,
+                    "-map", "0:v", "-map", "1:a",
+                    "-c:v", "copy",
+                    "-c:a", "aac", "-b:a", "192k",
+                    "-shortest",
+                    "-movflags", "+faststart",
+                    output,
+                ],
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"Concatenation failed: {result.stderr.strip()}")
+
+            elapsed = time.perf_counter() - started
+            return {
+                "output": output,
+                "segments": len(segment_files),
+                "duration": duration,
+                "encode_seconds": encoded - started,
+                "render_seconds": elapsed,
+                "real_time_factor": elapsed / duration if duration > 0 else None,
+            }
+
+        except Exception as e:
+            print(f"Error rendering video: {e}")
+            return None
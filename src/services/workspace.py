@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import shutil
+import socket
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from src.utils.metrics import (
+    DISK_FREE_BYTES,
+    WORKSPACE_ADMISSIONS,
+    WORKSPACE_BYTES,
+    WORKSPACE_PEAK_BYTES,
+    WORKSPACE_RECLAIMED_BYTES,
+    WORKSPACES,
+    directory_size,
+)
+
+logger = logging.getLogger(__name__)
+
+LEASES = ".leases"
+
+
+class WorkspaceQuotaExceeded(Exception):
+    pass
+
+
+class WorkspaceManager:
+    """
+    Per-run working directories under `root`, with disk accounting.
+
+    Every workspace has a lease in `root/.leases/` (outside the workspace, so it is never
+    published) that its owner renews while the run executes. A new run is only admitted
+    while the workspaces, each counted at least at `reserve_bytes`, fit in `quota_bytes`
+    and the disk keeps `min_free_bytes` free. The janitor deletes workspaces whose lease
+    expired (their process died) and unleased ones idle for `orphan_seconds`. Several
+    processes may share `root`: each renews only the leases it holds.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        quota_bytes: int,
+        reserve_bytes: int,
+        min_free_bytes: int,
+        lease_seconds: float = 120,
+        orphan_seconds: float = 6 * 3600,
+    ) -> None:
+        self.root = Path(root)
+        self.quota_bytes = quota_bytes
+        self.reserve_bytes = reserve_bytes
+        self.min_free_bytes = min_free_bytes
+        self.lease_seconds = lease_seconds
+        self.orphan_seconds = orphan_seconds
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+
+        self._held: Set[str] = set()
+        self._peaks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        (self.root / LEASES).mkdir(parents=True, exist_ok=True)
+        DISK_FREE_BYTES.set_function(self.disk_free)
+
+    def path_for(self, run_id: str) -> str:
+        return str(self.root / run_id)
+
+    def _lease_path(self, run_id: str) -> Path:
+        return self.root / LEASES / f"{run_id}.json"
+
+    def _write_lease(self, run_id: str, expires_at: float) -> None:
+        path = self._lease_path(run_id)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"owner": self.owner, "expires_at": expires_at}, f)
+        os.replace(temp_path, path)
+
+    def _read_lease(self, run_id: str) -> Optional[Dict[str, object]]:
+        try:
+            with open(self._lease_path(run_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def is_leased(self, run_id: str) -> bool:
+        lease = self._read_lease(run_id)
+        return lease is not None and lease["expires_at"] >= time.time()
+
+    def disk_free(self) -> int:
+        return shutil.disk_usage(self.root).free
+
+    def usage(self) -> Dict[str, int]:
+        """Bytes used by each workspace, by run id."""
+        sizes = {}
+        for entry in self.root.iterdir():
+            if entry.is_dir() and entry.name != LEASES:
+                sizes[entry.name] = directory_size(str(entry))
+        return sizes
+
+    def committed_bytes(self, sizes: Optional[Dict[str, int]] = None) -> int:
+        """Disk the workspaces use or may soon use: leased ones count at least `reserve_bytes`."""
+        sizes = self.usage() if sizes is None else sizes
+        total = 0
+        for run_id, size in sizes.items():
+            total += max(size, self.reserve_bytes) if self.is_leased(run_id) else size
+        return total
+
+    def admit(self) -> None:
+        """Raise WorkspaceQuotaExceeded unless one more run fits in the quota and on the disk."""
+        committed = self.committed_bytes()
+        free = self.disk_free()
+        if committed + self.reserve_bytes > self.quota_bytes:
+            reason = f"workspaces use {committed / 2**30:.1f} GiB of the {self.quota_bytes / 2**30:.1f} GiB quota"
+        elif free - self.reserve_bytes < self.min_free_bytes:
+            reason = f"only {free / 2**30:.1f} GiB free on disk"
+        else:
+            WORKSPACE_ADMISSIONS.labels("admitted").inc()
+            return
+        WORKSPACE_ADMISSIONS.labels("rejected").inc()
+        raise WorkspaceQuotaExceeded(f"No room for another run: {reason}")
+
+    def acquire(self, run_id: str, admit: bool = True) -> str:
+        """
+        Lease the workspace of `run_id` (created if needed) to this process and return its path.
+        New workspaces are admitted first, unless `admit` is False.
+        """
+        path = self.path_for(run_id)
+        if admit and not os.path.isdir(path):
+            self.admit()
+        os.makedirs(path, exist_ok=True)
+        self._write_lease(run_id, time.time() + self.lease_seconds)
+        with self._lock:
+            self._held.add(run_id)
+        return path
+
+    def ensure_space(self, run_id: str, needed_bytes: int) -> None:
+        """Raise WorkspaceQuotaExceeded if writing `needed_bytes` more would leave the disk short."""
+        free = self.disk_free()
+        if free - needed_bytes < self.min_free_bytes:
+            WORKSPACE_ADMISSIONS.labels("out_of_space").inc()
+            raise WorkspaceQuotaExceeded(
+                f"Run {run_id} needs {needed_bytes / 2**20:.0f} MiB but only {free / 2**20:.0f} MiB are free on disk"
+            )
+
+    def detach(self, run_id: str) -> None:
+        """Stop renewing the lease but keep the workspace for `orphan_seconds`, e.g. while the run waits in the queue."""
+        with self._lock:
+            self._held.discard(run_id)
+        if os.path.isdir(self.path_for(run_id)):
+            self._write_lease(run_id, time.time() + self.orphan_seconds)
+
+    def forget(self, run_id: str) -> None:
+        """Drop a run whose lease another process took over, leaving its workspace alone."""
+        with self._lock:
+            self._held.discard(run_id)
+            self._peaks.pop(run_id, None)
+
+    def release(self, run_id: str) -> None:
+        """Delete the workspace of a finished run and its lease; a no-op once done."""
+        with self._lock:
+            self._held.discard(run_id)
+            peak = self._peaks.pop(run_id, None)
+        path = self.path_for(run_id)
+        if os.path.isdir(path):
+            WORKSPACE_PEAK_BYTES.observe(max(directory_size(path), peak or 0))
+            shutil.rmtree(path, ignore_errors=True)
+        self._lease_path(run_id).unlink(missing_ok=True)
+
+    def _reclaim(self, path: Path, reason: str) -> None:
+        size = directory_size(str(path)) if path.is_dir() else path.stat().st_size
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+        self._lease_path(path.name).unlink(missing_ok=True)
+        WORKSPACE_RECLAIMED_BYTES.labels(reason).inc(size)
+        logger.info(f"Reclaimed {reason} workspace {path} ({size / 2**20:.1f} MiB)")
+
+    def sweep(self) -> Dict[str, int]:
+        """
+        Renew the leases this process holds, reclaim expired and orphaned workspaces and
+        refresh the disk gauges. Returns the number of workspaces by state.
+        """
+        now = time.time()
+        with self._lock:
+            held = set(self._held)
+        for run_id in held:
+            if os.path.isdir(self.path_for(run_id)):
+                self._write_lease(run_id, now + self.lease_seconds)
+
+        states = {"active": 0, "detached": 0, "reclaimed": 0}
+        sizes: Dict[str, int] = {}
+        for entry in self.root.iterdir():
+            if entry.name == LEASES:
+                continue
+            try:
+                if entry.is_file():
+                    # Leftovers of runs that shared `root` itself.
+                    if now - entry.stat().st_mtime > self.orphan_seconds:
+                        self._reclaim(entry, "orphaned")
+                    continue
+
+                lease = self._read_lease(entry.name)
+                if lease is None:
+                    if now - entry.stat().st_mtime > self.orphan_seconds:
+                        self._reclaim(entry, "orphaned")
+                        states["reclaimed"] += 1
+                        continue
+                elif lease["expires_at"] < now:
+                    self._reclaim(entry, "expired")
+                    states["reclaimed"] += 1
+                    continue
+                else:
+                    states["active" if lease["owner"] == self.owner and entry.name in held else "detached"] += 1
+                sizes[entry.name] = directory_size(str(entry))
+            except FileNotFoundError:
+                # Released while we looked at it.
+                continue
+
+        # Leases whose workspace is gone.
+        for lease_path in (self.root / LEASES).glob("*.json"):
+            if lease_path.stem not in sizes and not os.path.isdir(self.path_for(lease_path.stem)):
+                lease = self._read_lease(lease_path.stem)
+                if lease is None or lease["expires_at"] < now:
+                    lease_path.unlink(missing_ok=True)
+
+        with self._lock:
+            for run_id in held & sizes.keys():
+                self._peaks[run_id] = max(self._peaks.get(run_id, 0), sizes[run_id])
+        WORKSPACE_BYTES.set(sum(sizes.values()))
+        for state in ("active", "detached"):
+            WORKSPACES.labels(state).set(states[state])
+        return states
+
+    async def janitor(self, interval: float) -> None:
+        """Sweep every `interval` seconds until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.error(f"Workspace sweep failed: {e}")
+            await asyncio.sleep(interval)
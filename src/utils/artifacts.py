@@ -0,0 +1,102 @@
+import os
+import uuid
+import hashlib
+import mimetypes
+import contextlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+MEDIA_TYPES = {
+    ".srt": "application/x-subrip",
+    ".mp3": "audio/mpeg",
+    ".json": "application/json",
+    ".webp": "image/webp",
+}
+
+
+def media_type_for(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    return MEDIA_TYPES.get(extension) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+class HashingWriter:
+    """
+    Binary file wrapper that updates a sha256 digest and byte count on every write,
+    so artifacts never need to be re-read to be checksummed. `str` data is encoded.
+    """
+
+    def __init__(self, f, encoding: str = "utf-8") -> None:
+        self._f = f
+        self.encoding = encoding
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._f.write(data)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def fileno(self) -> int:
+        return self._f.fileno()
+
+    def record(self, path: str, duration: Optional[float] = None, **extra: Any) -> Dict[str, Any]:
+        return artifact_record(path, self.size, self.sha256.hexdigest(), duration, **extra)
+
+
+def artifact_record(path: str, size: int, sha256: str, duration: Optional[float] = None, **extra: Any) -> Dict[str, Any]:
+    record = {
+        "path": path,
+        "size": size,
+        "sha256": sha256,
+        "media_type": media_type_for(path),
+        "duration": duration,
+    }
+    record.update(extra)
+    return record
+
+
+@contextmanager
+def hashed_open(path: str, encoding: str = "utf-8", progressive: bool = False) -> Iterator[HashingWriter]:
+    """
+    Write `path` as a new file, never truncating the existing one in place: workspace
+    files may be hardlinked to cache entries and published copies, which share its data.
+    The file is written next to `path` and renamed over it on success, unless `progressive`,
+    where the old file is unlinked first so readers can follow the writes.
+    """
+    if progressive:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+        with open(path, "xb") as f:
+            yield HashingWriter(f, encoding)
+        return
+
+    directory, name = os.path.split(path)
+    temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, "xb") as f:
+            yield HashingWriter(f, encoding)
+        os.replace(temp_path, path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+
+
+def record_file(path: str) -> Dict[str, Any]:
+    """Checksum a file written by someone else (e.g. the Midjourney server) by reading it once."""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+            size += len(block)
+    return artifact_record(path, size, sha256.hexdigest())
+
+
+def add_artifact(artifacts: Optional[List[Dict[str, Any]]], record: Dict[str, Any]) -> None:
+    if artifacts is not None:
+        artifacts.append(record)
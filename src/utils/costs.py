@@ -0,0 +1,127 @@
+import inspect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional
+
+TOKEN_KINDS = ("prompt_tokens", "completion_tokens", "cached_tokens", "cache_write_tokens")
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"usd": 0.0, "calls": 0, **{kind: 0 for kind in TOKEN_KINDS}}
+
+
+class CostLedger:
+    """LLM usage and cost of one run, per node and per model. Safe to share with worker threads."""
+
+    def __init__(self, budget_usd: Optional[float] = None) -> None:
+        self.budget_usd = budget_usd
+        self.total = _empty_totals()
+        self.by_node: Dict[str, Dict[str, Any]] = {}
+        self.by_model: Dict[str, Dict[str, Any]] = {}
+        self.unpriced_calls = 0
+        self._lock = threading.Lock()
+
+    def record(self, node: Optional[str], provider: str, model: str, usage: Optional[Dict[str, Any]], cost: Optional[float]) -> None:
+        with self._lock:
+            if cost is None:
+                self.unpriced_calls += 1
+            for totals in (
+                self.total,
+                self.by_node.setdefault(node or "unknown", _empty_totals()),
+                self.by_model.setdefault(f"{provider}:{model}", _empty_totals()),
+            ):
+                totals["usd"] += cost or 0.0
+                totals["calls"] += 1
+                for kind in TOKEN_KINDS:
+                    totals[kind] += (usage or {}).get(kind) or 0
+
+    def restore(self, summary: Dict[str, Any]) -> None:
+        """Continue from the `summary()` of an earlier part of the run, e.g. on another worker."""
+        with self._lock:
+            self.unpriced_calls += summary.get("unpriced_calls", 0)
+            pairs = [(self.total, summary)]
+            pairs += [(self.by_node.setdefault(node, _empty_totals()), totals) for node, totals in summary.get("by_node", {}).items()]
+            pairs += [(self.by_model.setdefault(model, _empty_totals()), totals) for model, totals in summary.get("by_model", {}).items()]
+            for totals, previous in pairs:
+                for kind in ("usd", "calls", *TOKEN_KINDS):
+                    totals[kind] += previous.get(kind) or 0
+
+    @property
+    def spent_usd(self) -> float:
+        return self.total["usd"]
+
+    @property
+    def remaining_usd(self) -> Optional[float]:
+        if self.budget_usd is None:
+            return None
+        return self.budget_usd - self.total["usd"]
+
+    def summary(self) -> Dict[str, Any]:
+        def rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+            return {**totals, "usd": round(totals["usd"], 6)}
+
+        with self._lock:
+            return {
+                **rounded(self.total),
+                "budget_usd": self.budget_usd,
+                "unpriced_calls": self.unpriced_calls,
+                "by_node": {node: rounded(totals) for node, totals in self.by_node.items()},
+                "by_model": {model: rounded(totals) for model, totals in self.by_model.items()},
+            }
+
+
+_ledger: ContextVar[Optional[CostLedger]] = ContextVar("cost_ledger", default=None)
+_node: ContextVar[Optional[str]] = ContextVar("cost_node", default=None)
+
+
+@contextmanager
+def track_costs(budget_usd: Optional[float] = None, carried: Optional[Dict[str, Any]] = None) -> Iterator[CostLedger]:
+    """
+    Collect the cost of every LLM call made in this context (graph nodes included) into a ledger,
+    starting from `carried`, the summary of the run so far when it resumes from a checkpoint.
+    """
+    ledger = CostLedger(budget_usd)
+    if carried:
+        ledger.restore(carried)
+    token = _ledger.set(ledger)
+    try:
+        yield ledger
+    finally:
+        _ledger.reset(token)
+
+
+def current_ledger() -> Optional[CostLedger]:
+    return _ledger.get()
+
+
+def record_cost(provider: str, model: str, usage: Optional[Dict[str, Any]], cost: Optional[float]) -> None:
+    """Charge a call to the current run and node; a no-op outside `track_costs`."""
+    ledger = _ledger.get()
+    if ledger is not None:
+        ledger.record(_node.get(), provider, model, usage, cost)
+
+
+def attribute_costs(name: str, node: Callable) -> Callable:
+    """Charge LLM calls made while the node runs to `name`, keeping it sync or async as it was."""
+    if inspect.iscoroutinefunction(node):
+        @wraps(node)
+        async def async_wrapper(state):
+            token = _node.set(name)
+            try:
+                return await node(state)
+            finally:
+                _node.reset(token)
+
+        return async_wrapper
+
+    @wraps(node)
+    def wrapper(state):
+        token = _node.set(name)
+        try:
+            return node(state)
+        finally:
+            _node.reset(token)
+
+    return wrapper
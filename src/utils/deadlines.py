@@ -0,0 +1,220 @@
+import time
+import asyncio
+import inspect
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional
+
+from src.utils.metrics import DEADLINE_MISSES, NODE_BUDGET
+
+# Nodes that ignore the deadline are cancelled this long after it, so cooperative
+# cancellation (provider calls, retries) gets to end them first.
+CANCEL_GRACE_SECONDS = 1.0
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline_at(deadline: Optional[float]) -> Iterator[None]:
+    """
+    Bound every call made in this context (worker threads included) by `deadline`, in epoch
+    seconds. An earlier deadline already in effect wins.
+    """
+    current = _deadline.get()
+    if deadline is None or (current is not None and current <= deadline):
+        yield
+        return
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def check_deadline(what: str) -> None:
+    """Raise DeadlineExceeded once the current deadline has passed; for loops in sync code."""
+    remaining = time_left()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"{what} ran past its deadline")
+
+
+def stop_at_deadline(retry_state: Any) -> bool:
+    """Tenacity stop condition: no more attempts once the deadline has passed."""
+    remaining = time_left()
+    return remaining is not None and remaining <= 0
+
+
+@asynccontextmanager
+async def within_deadline(what: str) -> AsyncIterator[None]:
+    """Cancel the block when the current deadline passes, raising DeadlineExceeded."""
+    remaining = time_left()
+    if remaining is None:
+        yield
+        return
+
+    timeout = asyncio.timeout(remaining)
+    try:
+        async with timeout:
+            yield
+    except TimeoutError as e:
+        if not timeout.expired():
+            raise
+        raise DeadlineExceeded(f"{what} ran past its deadline") from e
+
+
+class NodeBudgets:
+    """
+    Time budget of each graph node from the latency it has shown in this process: the
+    `percentile` of its last `window` completed runs times `headroom`, at least
+    `floor_seconds` and at most its ceiling (`ceilings[node]`, else `ceilings["default"]`).
+    Until a node has `min_samples` runs, its ceiling is its budget.
+    """
+
+    def __init__(
+        self,
+        ceilings: Dict[str, float],
+        percentile: float = 99,
+        headroom: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+        floor_seconds: float = 5,
+    ) -> None:
+        self.ceilings = ceilings
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.window = window
+        self.floor_seconds = floor_seconds
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def ceiling(self, node: str) -> float:
+        return self.ceilings.get(node, self.ceilings.get("default", 600))
+
+    def observe(self, node: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(node, deque(maxlen=self.window)).append(seconds)
+
+    def _quantile(self, node: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(node, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+    def budget(self, node: str) -> float:
+        observed = self._quantile(node, self.percentile)
+        if observed is None:
+            return self.ceiling(node)
+        return min(max(observed * self.headroom, self.floor_seconds), self.ceiling(node))
+
+    def expected(self, node: str) -> float:
+        """Typical (median) latency of the node, 0 while unknown."""
+        return self._quantile(node, 50) or 0.0
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            nodes = {node: len(samples) for node, samples in self._samples.items()}
+        return {
+            node: {"samples": count, "p50": self.expected(node), "budget_seconds": self.budget(node)}
+            for node, count in nodes.items()
+        }
+
+
+def enforce_deadline(name: str, node: Callable, budgets: NodeBudgets, optional: bool, downstream: List[str]) -> Callable:
+    """
+    Run a node under min(its budget, the run's `deadline` from the state), keeping it sync or
+    async as it was. An optional node is skipped when what is left of the run, minus the typical
+    latency of the required `downstream` nodes, would not cover its own typical latency. A node
+    that runs out of time ends the run if required and is dropped if optional. Misses are
+    counted and appended to the state's `deadline_misses`.
+    """
+
+    def plan(state) -> tuple:
+        """(deadline, budget, reason to skip or None)."""
+        now = time.time()
+        budget = budgets.budget(name)
+        run_deadline = state.get("deadline")
+        if run_deadline is None:
+            return now + budget, budget, None
+
+        remaining = run_deadline - now
+        if optional:
+            remaining -= sum(budgets.expected(stage) for stage in downstream)
+            if remaining <= budgets.expected(name):
+                return now, budget, "skipped"
+        elif remaining <= 0:
+            return now, budget, "expired"
+        return now + min(budget, remaining), budget, None
+
+    def missed(state, action: str, budget: float, elapsed: float, result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        DEADLINE_MISSES.labels(name, action).inc()
+        record = {"node": name, "action": action, "budget_seconds": round(budget, 3), "elapsed_seconds": round(elapsed, 3)}
+        update = dict(result or {})
+        if action != "overran":
+            # A required node that could not finish ends the run; an optional one is dropped.
+            update = {"end": True} if not optional else {key: value for key, value in update.items() if key != "end"}
+        update["deadline_misses"] = [*(state.get("deadline_misses") or []), record]
+        return update
+
+    def finished(state, result, deadline: float, budget: float, started: float):
+        elapsed = time.time() - started
+        # The retrying decorators return only {"end": ...} once they give up.
+        gave_up = isinstance(result, dict) and list(result) == ["end"]
+        if time.time() < deadline:
+            if not gave_up:
+                budgets.observe(name, elapsed)
+            return result
+        return missed(state, "timed_out" if gave_up else "overran", budget, elapsed, result)
+
+    if inspect.iscoroutinefunction(node):
+        @wraps(node)
+        async def async_wrapper(state):
+            deadline, budget, skip = plan(state)
+            NODE_BUDGET.labels(name).set(budget)
+            if skip is not None:
+                return missed(state, skip, budget, 0.0)
+
+            started = time.time()
+            with deadline_at(deadline):
+                try:
+                    async with asyncio.timeout(deadline - time.time() + CANCEL_GRACE_SECONDS):
+                        result = await node(state)
+                # Nodes without a retrying decorator let their calls' DeadlineExceeded through.
+                except (TimeoutError, DeadlineExceeded):
+                    return missed(state, "timed_out", budget, time.time() - started)
+            return finished(state, result, deadline, budget, started)
+
+        return async_wrapper
+
+    # Sync nodes run in a worker thread that cannot be cancelled; they stop at their own deadline checks.
+    @wraps(node)
+    def wrapper(state):
+        deadline, budget, skip = plan(state)
+        NODE_BUDGET.labels(name).set(budget)
+        if skip is not None:
+            return missed(state, skip, budget, 0.0)
+
+        started = time.time()
+        with deadline_at(deadline):
+            try:
+                result = node(state)
+            except DeadlineExceeded:
+                return missed(state, "timed_out", budget, time.time() - started)
+        return finished(state, result, deadline, budget, started)
+
+    return wrapper
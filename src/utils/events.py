@@ -0,0 +1,111 @@
+import json
+import os
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Custom event names dispatched from inside nodes, surfaced by `astream_events` as `on_custom_event`.
+RETRY_EVENT = "node_retry"
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def emit_event(name: str, data: Dict[str, Any]) -> None:
+    """Dispatch a custom event to the surrounding graph run; a no-op outside of one."""
+    try:
+        from langchain_core.callbacks import dispatch_custom_event
+
+        dispatch_custom_event(name, data)
+    except Exception as e:
+        logger.debug(f"Custom event {name} not dispatched: {e}")
+
+
+async def aemit_event(name: str, data: Dict[str, Any]) -> None:
+    try:
+        from langchain_core.callbacks import adispatch_custom_event
+
+        await adispatch_custom_event(name, data)
+    except Exception as e:
+        logger.debug(f"Custom event {name} not dispatched: {e}")
+
+
+class ProgressTracker:
+    """
+    Turns LangGraph `astream_events` (v2) into client progress events: node start/end
+    with durations, retry attempts, and one `artifact` event per new artifact record
+    found in a node's output state.
+    """
+
+    def __init__(self, workspace: str) -> None:
+        self.workspace = workspace
+        self.folder_path: Optional[str] = None
+        self.output: Optional[Dict[str, Any]] = None
+        self._started: Dict[str, float] = {}
+        self._artifacts_seen = set()
+
+    def relative_path(self, path: str) -> str:
+        return Path(os.path.relpath(path, self.workspace)).as_posix()
+
+    def resolve(self, path: str) -> Optional[str]:
+        """Locate an artifact by its relative path: in the workspace, or in the story folder once published."""
+        for base in (self.workspace, self.folder_path):
+            if not base:
+                continue
+            root = Path(base).resolve()
+            candidate = (root / path).resolve()
+            if candidate.is_relative_to(root) and candidate.is_file():
+                return str(candidate)
+        return None
+
+    def translate(self, event: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        kind = event["event"]
+        name = event.get("name")
+        metadata = event.get("metadata", {})
+
+        if kind == "on_custom_event" and name == RETRY_EVENT:
+            return [("retry", event["data"])]
+
+        if kind == "on_chain_end" and not event.get("parent_ids"):
+            # The root graph run: its output is the final state.
+            output = event["data"].get("output")
+            if isinstance(output, dict):
+                self.output = output
+            return []
+
+        # Node runs are the chain events named after their own LangGraph node.
+        if name is None or metadata.get("langgraph_node") != name:
+            return []
+
+        if kind == "on_chain_start":
+            self._started[event["run_id"]] = time.perf_counter()
+            return [("node_start", {"node": name, "step": metadata.get("langgraph_step")})]
+
+        if kind == "on_chain_end":
+            started = self._started.pop(event["run_id"], None)
+            events = [("node_end", {
+                "node": name,
+                "step": metadata.get("langgraph_step"),
+                "duration_seconds": None if started is None else time.perf_counter() - started,
+            })]
+            output = event["data"].get("output")
+            if isinstance(output, dict):
+                self.folder_path = output.get("folder_path") or self.folder_path
+                events.extend(self._new_artifacts(name, output.get("artifacts") or []))
+            return events
+
+        return []
+
+    def _new_artifacts(self, node: str, artifacts: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+        events = []
+        for record in artifacts:
+            key = (record["path"], record.get("sha256"))
+            if key in self._artifacts_seen:
+                continue
+            self._artifacts_seen.add(key)
+            events.append(("artifact", {**record, "path": self.relative_path(record["path"]), "node": node}))
+        return events
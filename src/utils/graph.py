@@ -1,3 +1,17 @@
+from typing import Any, Dict
+
+
+def story_result(output: Dict[str, Any]) -> Dict[str, Any]:
+    result = {
+        "story_title": output["story_title"],
+        "story_content": output["story_content"],
+        "midjourney_prompts": output["midjourney_prompts"],
+    }
+    if output.get("deadline_misses"):
+        result["deadline_misses"] = output["deadline_misses"]
+    return result
+
+
 def check_story_edge(state):
     if state.get("end", False):
         return "end"
@@ -0,0 +1,62 @@
+import time
+import asyncio
+import inspect
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+from src.utils.metrics import STAGE_WAIT
+from src.utils.tracing import start_span
+
+
+class StageLimiter:
+    """
+    Caps how many runs may execute a graph stage at once. One limiter is shared by every
+    run in the process, so concurrent stories queue on scarce stages (Midjourney, TTS,
+    Whisper, ffmpeg) instead of oversubscribing them.
+    """
+
+    def __init__(self, limits: Dict[str, int]) -> None:
+        self.limits = limits
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def semaphore(self, stage: str) -> Optional[asyncio.Semaphore]:
+        limit = self.limits.get(stage)
+        if not limit:
+            return None
+        if stage not in self._semaphores:
+            self._semaphores[stage] = asyncio.Semaphore(limit)
+        return self._semaphores[stage]
+
+    def wrap(self, stage: str, node: Callable) -> Callable:
+        if not self.limits.get(stage):
+            return node
+
+        async def acquire() -> asyncio.Semaphore:
+            semaphore = self.semaphore(stage)
+            started = time.perf_counter()
+            with start_span(f"stage wait {stage}", {"node": stage, "limit": self.limits[stage]}):
+                await semaphore.acquire()
+            STAGE_WAIT.labels(stage).observe(time.perf_counter() - started)
+            return semaphore
+
+        if inspect.iscoroutinefunction(node):
+            @wraps(node)
+            async def async_wrapper(state):
+                semaphore = await acquire()
+                try:
+                    return await node(state)
+                finally:
+                    semaphore.release()
+
+            return async_wrapper
+
+        # Sync nodes run in a worker thread once they hold the stage slot.
+        @wraps(node)
+        async def wrapper(state):
+            semaphore = await acquire()
+            try:
+                return await asyncio.to_thread(node, state)
+            finally:
+                semaphore.release()
+
+        return wrapper
@@ -0,0 +1,170 @@
+import os
+import time
+import inspect
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Nodes range from sub-second file moves to multi-minute Midjourney and render steps.
+NODE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 40, 60, 120, 240)
+
+NODE_DURATION = Histogram(
+    "content_node_duration_seconds", "Wall time of a graph node, retries included.", ["node"], buckets=NODE_BUCKETS
+)
+NODE_RUNS = Counter(
+    "content_node_runs_total", "Graph node executions by outcome (returned or raised).", ["node", "outcome"]
+)
+NODE_RETRIES = Counter("content_node_retries_total", "Failed attempts inside retrying nodes.", ["node"])
+NODE_FAILURES = Counter(
+    "content_node_failures_total", "Retrying nodes that gave up, by whether the run ended.", ["node", "ended"]
+)
+STAGE_WAIT = Histogram(
+    "content_stage_wait_seconds", "Time a run queued for a stage concurrency slot.", ["node"], buckets=NODE_BUCKETS
+)
+NODE_BUDGET = Gauge("content_node_budget_seconds", "Current time budget of a graph node, from its observed latency.", ["node"])
+DEADLINE_MISSES = Counter(
+    "content_deadline_misses_total",
+    "Nodes that hit their deadline, by action (skipped/expired/timed_out/overran).",
+    ["node", "action"],
+)
+RUNS_IN_FLIGHT = Gauge("content_runs_in_flight", "Graph runs currently executing.")
+SCHEDULER_WAIT = Histogram(
+    "content_provider_queue_wait_seconds",
+    "Time a provider call waited for admission and a slot, by priority.",
+    ["provider", "priority"],
+    buckets=NODE_BUCKETS,
+)
+SCHEDULER_DECISIONS = Counter(
+    "content_provider_admissions_total",
+    "Provider call admission decisions (admitted/deferred/rejected/expired) by priority.",
+    ["provider", "priority", "decision"],
+)
+WORKER_SEGMENTS = Counter(
+    "content_worker_segments_total",
+    "Queued run segments executed by this worker, by outcome (succeeded/handed_off/retrying/failed/lease_lost).",
+    ["outcome"],
+)
+
+LLM_DURATION = Histogram(
+    "content_llm_request_duration_seconds", "Latency of one LLM API attempt.", ["provider", "model"], buckets=LLM_BUCKETS
+)
+LLM_REQUESTS = Counter("content_llm_requests_total", "LLM API attempts by outcome.", ["provider", "model", "outcome"])
+LLM_COST = Counter("content_llm_cost_usd_total", "LLM spend in USD, from token usage and the price table.", ["provider", "model"])
+LLM_TOKENS = Counter("content_llm_tokens_total", "LLM tokens by kind (prompt/completion/cached/cache_write); cached tokens are part of prompt.", ["provider", "model", "kind"])
+
+TTS_BYTES = Counter("content_tts_bytes_total", "Audio bytes received from the TTS provider.")
+TTS_SECONDS = Counter("content_tts_stream_seconds_total", "Time spent receiving TTS audio.")
+TTS_THROUGHPUT = Histogram(
+    "content_tts_bytes_per_second",
+    "Per-stream TTS throughput.",
+    buckets=(4_000, 8_000, 16_000, 32_000, 64_000, 128_000, 256_000, 512_000),
+)
+TTS_CACHE_HITS = Counter("content_tts_cache_hits_total", "TTS requests served from the audio cache.")
+
+MJ_CACHE_REQUESTS = Counter("content_mj_cache_requests_total", "Midjourney prompts looked up in the image cache.", ["outcome"])
+MJ_NEAR_DUPLICATES = Counter("content_mj_near_duplicates_total", "Generated images perceptually close to a cached image of another prompt.")
+
+WHISPER_RTF = Histogram(
+    "content_whisper_real_time_factor",
+    "Transcription time divided by audio duration.",
+    ["language"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4),
+)
+WHISPER_SECONDS = Counter("content_whisper_seconds_total", "Time spent transcribing.", ["language"])
+
+WORKSPACE_BYTES = Gauge("content_workspace_bytes", "Disk used by run workspaces, as of the last janitor sweep.")
+WORKSPACES = Gauge("content_workspaces", "Run workspaces by state (active: leased by this process, detached: leased elsewhere or queued).", ["state"])
+WORKSPACE_PEAK_BYTES = Histogram(
+    "content_workspace_peak_bytes",
+    "Largest size a run workspace reached, observed when it is released.",
+    buckets=(2**20, 16 * 2**20, 64 * 2**20, 256 * 2**20, 2**30, 2 * 2**30, 4 * 2**30, 8 * 2**30),
+)
+WORKSPACE_RECLAIMED_BYTES = Counter(
+    "content_workspace_reclaimed_bytes_total", "Bytes of abandoned workspaces deleted by the janitor.", ["reason"]
+)
+WORKSPACE_ADMISSIONS = Counter(
+    "content_workspace_admissions_total", "Workspace admission checks by outcome (admitted/rejected/out_of_space).", ["outcome"]
+)
+DISK_FREE_BYTES = Gauge("content_workspace_disk_free_bytes", "Free space on the filesystem holding the workspaces.")
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """Time a node and count whether it returned or raised, keeping it sync or async as it was."""
+    if inspect.iscoroutinefunction(node):
+        @wraps(node)
+        async def async_wrapper(state):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await node(state)
+                outcome = "success"
+                return result
+            finally:
+                NODE_DURATION.labels(name).observe(time.perf_counter() - started)
+                NODE_RUNS.labels(name, outcome).inc()
+
+        return async_wrapper
+
+    @wraps(node)
+    def wrapper(state):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = node(state)
+            outcome = "success"
+            return result
+        finally:
+            NODE_DURATION.labels(name).observe(time.perf_counter() - started)
+            NODE_RUNS.labels(name, outcome).inc()
+
+    return wrapper
+
+
+@contextmanager
+def observe_llm_call(provider: str, model: str) -> Iterator[None]:
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        LLM_DURATION.labels(provider, model).observe(time.perf_counter() - started)
+        LLM_REQUESTS.labels(provider, model, outcome).inc()
+
+
+def record_llm_usage(provider: str, model: str, usage: Optional[Dict[str, Any]], cost: Optional[float] = None) -> None:
+    if cost:
+        LLM_COST.labels(provider, model).inc(cost)
+    if not usage:
+        return
+    for kind in ("prompt_tokens", "completion_tokens", "cached_tokens", "cache_write_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(provider, model, kind.removesuffix("_tokens")).inc(usage[kind])
+
+
+def record_tts_stream(total_bytes: int, seconds: float) -> None:
+    TTS_BYTES.inc(total_bytes)
+    TTS_SECONDS.inc(seconds)
+    if seconds > 0 and total_bytes:
+        TTS_THROUGHPUT.observe(total_bytes / seconds)
+
+
+def record_transcription(language: Optional[str], seconds: float, audio_seconds: float) -> None:
+    label = language or "auto"
+    WHISPER_SECONDS.labels(label).inc(seconds)
+    if audio_seconds > 0:
+        WHISPER_RTF.labels(label).observe(seconds / audio_seconds)
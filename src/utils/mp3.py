@@ -0,0 +1,149 @@
+from typing import List, Optional, Tuple
+
+# Layer III bitrates in kbps, indexed by the 4-bit header field.
+BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    25: [11025, 12000, 8000],
+}
+
+
+class FrameHeader:
+    def __init__(self, version: int, bitrate: int, sample_rate: int, padding: int, channels: int) -> None:
+        self.version = version
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.padding = padding
+        self.channels = channels
+
+    @property
+    def samples(self) -> int:
+        return 1152 if self.version == 1 else 576
+
+    @property
+    def length(self) -> int:
+        return (self.samples // 8) * self.bitrate * 1000 // self.sample_rate + self.padding
+
+    @property
+    def side_info_size(self) -> int:
+        if self.version == 1:
+            return 17 if self.channels == 1 else 32
+        return 9 if self.channels == 1 else 17
+
+
+def parse_header(data: bytes, offset: int) -> Optional[FrameHeader]:
+    """Parse the MPEG Layer III frame header at `offset`, or return None."""
+    if offset + 4 > len(data):
+        return None
+
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = {3: 1, 2: 2, 0: 25}.get((b1 >> 3) & 0x03)
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version is None or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    return FrameHeader(
+        version=version,
+        bitrate=BITRATES[1 if version == 1 else 2][bitrate_index],
+        sample_rate=SAMPLE_RATES[version][sample_rate_index],
+        padding=(b2 >> 1) & 0x01,
+        channels=1 if (b3 >> 6) == 3 else 2,
+    )
+
+
+def _id3v2_size(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _is_info_frame(data: bytes, offset: int, header: FrameHeader) -> bool:
+    tag_offset = offset + 4 + header.side_info_size
+    return data[tag_offset:tag_offset + 4] in (b"Xing", b"Info", b"VBRI")
+
+
+def split_frames(data: bytes) -> Tuple[List[Tuple[int, int]], float]:
+    """
+    Locate the audio frames of an MP3 stream.
+
+    ID3v2/ID3v1 tags and Xing/Info/VBRI header frames are skipped, so the returned
+    (offset, length) spans can be concatenated with other streams. Also returns the
+    duration covered by those frames in seconds.
+    """
+    offset = _id3v2_size(data)
+    end = len(data) - 128 if data[-128:-125] == b"TAG" else len(data)
+
+    frames: List[Tuple[int, int]] = []
+    duration = 0.0
+    while offset + 4 <= end:
+        header = parse_header(data, offset)
+        if header is None or offset + header.length > end:
+            # Resynchronise on the next frame sync word.
+            offset = data.find(b"\xff", offset + 1, end)
+            if offset < 0:
+                break
+            continue
+
+        if frames or not _is_info_frame(data, offset, header):
+            frames.append((offset, header.length))
+            duration += header.samples / header.sample_rate
+        offset += header.length
+
+    return frames, duration
+
+
+def audio_frames(data: bytes) -> Tuple[bytes, float]:
+    """Return only the audio frames of `data`, and their duration in seconds."""
+    frames, duration = split_frames(data)
+    return b"".join(data[offset:offset + length] for offset, length in frames), duration
+
+
+class FrameCounter:
+    """Incremental duration of an MP3 stream, fed chunk by chunk as it is written."""
+
+    def __init__(self) -> None:
+        self.duration = 0.0
+        self.frames = 0
+        self._buffer = b""
+        self._skip = 0
+        self._started = False
+
+    def feed(self, data: bytes) -> None:
+        buffer = self._buffer + data
+        offset = 0
+
+        if not self._started:
+            if len(buffer) < 10:
+                self._buffer = buffer
+                return
+            self._skip = _id3v2_size(buffer)
+            self._started = True
+
+        skipped = min(self._skip, len(buffer))
+        offset += skipped
+        self._skip -= skipped
+
+        while offset + 4 <= len(buffer):
+            header = parse_header(buffer, offset)
+            if header is None:
+                offset += 1
+                continue
+            if offset + header.length > len(buffer):
+                break
+            if self.frames or not _is_info_frame(buffer, offset, header):
+                self.frames += 1
+                self.duration += header.samples / header.sample_rate
+            offset += header.length
+
+        self._buffer = buffer[offset:]
@@ -1,9 +1,15 @@
 import time
 import random
+import asyncio
+import inspect
 import logging
 from functools import wraps
 
 from src.langg.models import ExceptionDict
+from src.utils.deadlines import DeadlineExceeded, time_left
+from src.utils.events import RETRY_EVENT, aemit_event, emit_event
+from src.utils.metrics import NODE_FAILURES, NODE_RETRIES
+from src.utils.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
@@ -31,53 +37,87 @@ def exponential_backoff(tries, base_delay=1, max_delay=60):
         yield min(base_delay * (2**n) + random.uniform(0, 1), max_delay)
 
 
-def required_node(tries=3):
+def _retrying_node(tries, end):
+    def build_exception(f, e):
+        return ExceptionDict(
+            exception_node=f.__name__,
+            exception_type=str(type(e).__name__),
+            exception_text=str(e),
+            end=end,
+        )
+
+    def out_of_time(e, delay):
+        """No point in another attempt that would start after the deadline."""
+        remaining = time_left()
+        return isinstance(e, DeadlineExceeded) or (remaining is not None and remaining <= delay)
+
+    def retry_event(f, attempt, e, delay):
+        return {
+            "node": f.__name__,
+            "attempt": attempt,
+            "tries": tries,
+            "error": str(e),
+            "retry_in_seconds": delay if attempt < tries else None,
+        }
+
     def decorator(f):
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def async_wrapper(self, *args, **kwargs):
+                for attempt, delay in enumerate(exponential_backoff(tries), start=1):
+                    try:
+                        return await f(self, *args, **kwargs)
+                    except Exception as e:
+                        if out_of_time(e, delay):
+                            logger.warning(f"Attempt failed: {str(e)}. Out of time, not retrying")
+                            exception = build_exception(f, e)
+                            break
+                        logger.warning(
+                            f"Attempt failed: {str(e)}. Retrying in {delay:.2f} seconds..."
+                        )
+                        NODE_RETRIES.labels(f.__name__).inc()
+                        await aemit_event(RETRY_EVENT, retry_event(f, attempt, e, delay))
+                        with start_span("retry backoff", retry_event(f, attempt, e, delay)):
+                            await asyncio.sleep(delay)
+
+                        exception = build_exception(f, e)
+                NODE_FAILURES.labels(f.__name__, str(end).lower()).inc()
+                return {"end": notifier_and_define_end(exception)}
+
+            async_wrapper.optional = not end
+            return async_wrapper
+
         @wraps(f)
         def wrapper(self, *args, **kwargs):
-            for delay in exponential_backoff(tries):
+            for attempt, delay in enumerate(exponential_backoff(tries), start=1):
                 try:
                     return f(self, *args, **kwargs)
                 except Exception as e:
+                    if out_of_time(e, delay):
+                        logger.warning(f"Attempt failed: {str(e)}. Out of time, not retrying")
+                        exception = build_exception(f, e)
+                        break
                     logger.warning(
                         f"Attempt failed: {str(e)}. Retrying in {delay:.2f} seconds..."
                     )
-                    time.sleep(delay)
+                    NODE_RETRIES.labels(f.__name__).inc()
+                    emit_event(RETRY_EVENT, retry_event(f, attempt, e, delay))
+                    with start_span("retry backoff", retry_event(f, attempt, e, delay)):
+                        time.sleep(delay)
 
-                    exception = ExceptionDict(
-                        exception_node=f.__name__,
-                        exception_type=str(type(e).__name__),
-                        exception_text=str(e),
-                        end=True,
-                    )
+                    exception = build_exception(f, e)
+            NODE_FAILURES.labels(f.__name__, str(end).lower()).inc()
             return {"end": notifier_and_define_end(exception)}
 
+        wrapper.optional = not end
         return wrapper
 
     return decorator
 
 
-def optional_node(tries=3):
-    def decorator(f):
-        @wraps(f)
-        def wrapper(self, *args, **kwargs):
-            for delay in exponential_backoff(tries):
-                try:
-                    return f(self, *args, **kwargs)
-                except Exception as e:
-                    logger.warning(
-                        f"Attempt failed: {str(e)}. Retrying in {delay:.2f} seconds..."
-                    )
-                    time.sleep(delay)
-
-                    exception = ExceptionDict(
-                        exception_node=f.__name__,
-                        exception_type=str(type(e).__name__),
-                        exception_text=str(e),
-                        end=False,
-                    )
-            return {"end": notifier_and_define_end(exception)}
+def required_node(tries=3):
+    return _retrying_node(tries, end=True)
 
-        return wrapper
 
-    return decorator
\ No newline at end of file
+def optional_node(tries=3):
+    return _retrying_node(tries, end=False)
@@ -0,0 +1,48 @@
+import os
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RunProfiler:
+    """
+    Opt-in sampling profile of one run, written as a pyinstrument HTML flamegraph to
+    `<directory>/<run_id>.html`. pyinstrument samples the event loop thread, so time in
+    nodes offloaded to worker threads shows up as the awaiting frame.
+    """
+
+    def __init__(self, enabled: bool, directory: str, run_id: str) -> None:
+        self.enabled = enabled
+        self.directory = directory
+        self.run_id = run_id
+        self.path: Optional[str] = None
+        self._profiler = None
+
+    def __enter__(self) -> "RunProfiler":
+        if not self.enabled:
+            return self
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; running without a profile")
+            return self
+
+        self._profiler = Profiler(async_mode="enabled")
+        self._profiler.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._profiler is None:
+            return
+
+        self._profiler.stop()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{self.run_id}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+            self.path = path
+            logger.info(f"Profile of run {self.run_id} written to {path}")
+        except Exception as e:
+            logger.error(f"Could not write profile of run {self.run_id}: {e}")
@@ -0,0 +1,253 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Optional
+
+from src.utils.deadlines import DeadlineExceeded, time_left
+from src.utils.metrics import SCHEDULER_DECISIONS, SCHEDULER_WAIT
+from src.utils.tracing import start_span
+
+if TYPE_CHECKING:
+    from src.core.settings import Settings
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Hold times are smoothed with this weight on the newest sample.
+SERVICE_TIME_ALPHA = 0.2
+DEFER_POLL_SECONDS = 0.5
+
+
+class AdmissionRejected(Exception):
+    pass
+
+
+_priority: ContextVar[str] = ContextVar("run_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def run_priority(priority: str) -> Iterator[None]:
+    """Tag every provider call made in this context (graph nodes included) with `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class _Waiter:
+    """A queued acquire, woken from whichever thread (or event loop) frees a slot."""
+
+    def __init__(self, priority: str, loop: asyncio.AbstractEventLoop) -> None:
+        self.priority = priority
+        self.start = 0.0
+        self.finish = 0.0
+        self.granted = False
+        self.cancelled = False
+        self._loop = loop
+        self._future = loop.create_future()
+
+    def grant(self) -> None:
+        self.granted = True
+        self._loop.call_soon_threadsafe(lambda: self._future.done() or self._future.set_result(None))
+
+
+class FairQueue:
+    """
+    Weighted-fair queue in front of one provider's capacity (`capacity` calls at once).
+
+    Callers are served in order of virtual finish time (start-time fair queuing, one unit
+    per call), so under contention each priority class gets slots in proportion to its
+    weight whatever the arrival order. Before queuing, the wait is projected from the calls
+    that would be served first and the smoothed hold time; a class whose projected wait
+    exceeds its SLO is admitted, deferred (held back until the projection fits, for at most
+    `max_defer_seconds`) or rejected, as its overload action says. A call whose deadline
+    (see src.utils.deadlines) would pass before it got a slot is refused with DeadlineExceeded.
+
+    Waiters are woken thread-safely, so the queue may be shared by several event loops.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        weights: Dict[str, float],
+        slos: Dict[str, float],
+        overload: Dict[str, str],
+        max_defer_seconds: float = 300,
+    ) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.weights = weights
+        self.slos = slos
+        self.overload = overload
+        self.max_defer_seconds = max_defer_seconds
+
+        self.in_use = 0
+        self.service_seconds: Optional[float] = None
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._waiters: List[tuple] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _tags(self, priority: str) -> tuple:
+        start = max(self._virtual_time, self._last_finish.get(priority, 0.0))
+        return start, start + 1.0 / self.weights.get(priority, 1.0)
+
+    def projected_wait(self, priority: str) -> float:
+        """Seconds a call of `priority` queued now would wait for a slot."""
+        with self._lock:
+            if self.in_use < self.capacity and not self._waiters:
+                return 0.0
+            if self.service_seconds is None:
+                return 0.0
+            _, finish = self._tags(priority)
+            ahead = sum(1 for entry in self._waiters if entry[0] <= finish and not entry[2].cancelled)
+            return (ahead + 1) * self.service_seconds / self.capacity
+
+    def _admission(self, priority: str) -> Optional[str]:
+        """None to queue now, else the overload action."""
+        slo = self.slos.get(priority)
+        if slo is None or self.projected_wait(priority) <= slo:
+            return None
+        return self.overload.get(priority, "admit")
+
+    def _too_late(self, priority: str) -> bool:
+        """Whether a call queued now would not get a slot before the current deadline."""
+        remaining = time_left()
+        return remaining is not None and self.projected_wait(priority) > remaining
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        with self._lock:
+            waiter.start, waiter.finish = self._tags(waiter.priority)
+            self._last_finish[waiter.priority] = waiter.finish
+            if self.in_use < self.capacity and not self._waiters:
+                self.in_use += 1
+                self._virtual_time = waiter.start
+                waiter.granted = True
+            else:
+                heapq.heappush(self._waiters, (waiter.finish, next(self._sequence), waiter))
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the waiters with the smallest finish tags. Called with the lock held."""
+        while self.in_use < self.capacity and self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.cancelled:
+                continue
+            self.in_use += 1
+            self._virtual_time = waiter.start
+            waiter.grant()
+
+    def _cancel(self, waiter: _Waiter) -> None:
+        with self._lock:
+            waiter.cancelled = True
+            if waiter.granted:
+                self.in_use -= 1
+                self._dispatch()
+
+    def release(self, held_seconds: float) -> None:
+        with self._lock:
+            self.in_use -= 1
+            if self.service_seconds is None:
+                self.service_seconds = held_seconds
+            else:
+                self.service_seconds += SERVICE_TIME_ALPHA * (held_seconds - self.service_seconds)
+            self._dispatch()
+
+    def _decided(self, priority: str, decision: str, waited: float) -> None:
+        SCHEDULER_DECISIONS.labels(self.name, priority, decision).inc()
+        SCHEDULER_WAIT.labels(self.name, priority).observe(waited)
+
+    def _rejection(self, priority: str) -> AdmissionRejected:
+        return AdmissionRejected(
+            f"{self.name} is saturated: projected wait {self.projected_wait(priority):.1f}s "
+            f"exceeds the {priority} SLO of {self.slos[priority]}s"
+        )
+
+    async def acquire(self, priority: str) -> None:
+        started = time.perf_counter()
+        decision = "admitted"
+        action = self._admission(priority)
+        if action == "reject":
+            self._decided(priority, "rejected", 0.0)
+            raise self._rejection(priority)
+        if action == "defer":
+            decision = "deferred"
+            while (
+                action == "defer"
+                and time.perf_counter() - started < self.max_defer_seconds
+                and not self._too_late(priority)
+            ):
+                await asyncio.sleep(DEFER_POLL_SECONDS)
+                action = self._admission(priority)
+        if self._too_late(priority):
+            self._decided(priority, "expired", time.perf_counter() - started)
+            raise DeadlineExceeded(
+                f"{self.name} is saturated: projected wait {self.projected_wait(priority):.1f}s "
+                f"exceeds the {time_left():.1f}s left before the deadline"
+            )
+
+        waiter = _Waiter(priority, asyncio.get_running_loop())
+        self._enqueue(waiter)
+        if not waiter.granted:
+            try:
+                await waiter._future
+            except asyncio.CancelledError:
+                self._cancel(waiter)
+                raise
+        self._decided(priority, decision, time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            queued: Dict[str, int] = {}
+            for _, _, waiter in self._waiters:
+                if not waiter.cancelled:
+                    queued[waiter.priority] = queued.get(waiter.priority, 0) + 1
+            return {"capacity": self.capacity, "in_use": self.in_use, "queued": queued, "service_seconds": self.service_seconds}
+
+
+class ProviderScheduler:
+    """One FairQueue per provider with configured capacity; calls to other providers are not queued."""
+
+    def __init__(self, settings: "Settings") -> None:
+        self.queues = {
+            provider: FairQueue(
+                provider,
+                capacity,
+                weights=settings.PRIORITY_WEIGHTS,
+                slos=settings.PRIORITY_SLO_SECONDS,
+                overload=settings.PRIORITY_OVERLOAD,
+                max_defer_seconds=settings.PRIORITY_MAX_DEFER_SECONDS,
+            )
+            for provider, capacity in settings.PROVIDER_CONCURRENCY.items()
+            if capacity
+        }
+
+    @asynccontextmanager
+    async def slot(self, provider: str) -> AsyncIterator[None]:
+        """Hold one of `provider`'s slots for the current run's priority."""
+        queue = self.queues.get(provider)
+        if queue is None:
+            yield
+            return
+
+        priority = current_priority()
+        with start_span(f"provider wait {provider}", {"provider": provider, "priority": priority}):
+            await queue.acquire(priority)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            queue.release(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {provider: queue.stats() for provider, queue in self.queues.items()}
@@ -0,0 +1,86 @@
+import time
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class KeyConflict(Exception):
+    """An idempotency key was reused with a different request body."""
+
+
+def fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces identical jobs: while a job for a key is running, callers with the same key
+    await that job instead of starting another. Successful results are kept for `ttl`
+    seconds; failures are not, so a retry after an error runs again.
+
+    The shared job is shielded, so a caller that goes away does not cancel it for the others.
+    """
+
+    def __init__(self, ttl: float, max_results: int = 256) -> None:
+        self.ttl = ttl
+        self.max_results = max_results
+        self._inflight: Dict[str, Tuple[asyncio.Task, Optional[str]]] = {}
+        self._results: "OrderedDict[str, Tuple[float, Optional[str], Any]]" = OrderedDict()
+        self.metrics: Dict[str, int] = {"started": 0, "joined": 0, "cached": 0}
+
+    def _cached(self, key: str) -> Optional[Tuple[Optional[str], Any]]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        expires, body_hash, value = entry
+        if expires < time.monotonic():
+            del self._results[key]
+            return None
+        return body_hash, value
+
+    def _store(self, key: str, body_hash: Optional[str], value: Any) -> None:
+        self._results[key] = (time.monotonic() + self.ttl, body_hash, value)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    @staticmethod
+    def _check(key: str, expected: Optional[str], body_hash: Optional[str]) -> None:
+        if expected is not None and body_hash is not None and expected != body_hash:
+            raise KeyConflict(f"Key {key} was already used with a different request")
+
+    async def run(
+        self,
+        key: str,
+        job: Callable[[], Awaitable[Any]],
+        body_hash: Optional[str] = None,
+    ) -> Tuple[Any, str]:
+        """
+        Return `(result, outcome)` where outcome is "started", "joined" or "cached".
+        `body_hash` guards idempotency keys: reusing a key for another body raises KeyConflict.
+        """
+        cached = self._cached(key)
+        if cached is not None:
+            self._check(key, cached[0], body_hash)
+            self.metrics["cached"] += 1
+            return cached[1], "cached"
+
+        if key in self._inflight:
+            task, expected = self._inflight[key]
+            self._check(key, expected, body_hash)
+            self.metrics["joined"] += 1
+            return await asyncio.shield(task), "joined"
+
+        task = asyncio.create_task(job())
+        self._inflight[key] = (task, body_hash)
+        self.metrics["started"] += 1
+
+        def done(finished: asyncio.Task) -> None:
+            self._inflight.pop(key, None)
+            if not finished.cancelled() and finished.exception() is None:
+                self._store(key, body_hash, finished.result())
+
+        task.add_done_callback(done)
+        return await asyncio.shield(task), "started"
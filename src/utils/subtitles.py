@@ -0,0 +1,147 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PUNCTUATION_BREAKS = ".!?,"
+
+
+class WordTimings:
+    """
+    Compact representation of word level timings.
+
+    Start/end times live in float64 arrays and every word is stored as an index
+    into an interned token table, so repeated words are only kept (and stripped)
+    once.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, token_ids: np.ndarray, tokens: List[str]) -> None:
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.token_ids = np.asarray(token_ids, dtype=np.int32)
+        self.tokens = tokens
+
+    @classmethod
+    def from_words(cls, words: Sequence[Any]) -> "WordTimings":
+        """Build the arrays from faster-whisper `Word` objects (or anything with start/end/word)."""
+        n = len(words)
+        table: Dict[str, int] = {}
+        tokens: List[str] = []
+        token_ids = np.empty(n, dtype=np.int32)
+        starts = np.empty(n, dtype=np.float64)
+        ends = np.empty(n, dtype=np.float64)
+
+        for i, word in enumerate(words):
+            starts[i] = word.start
+            ends[i] = word.end
+            token_id = table.get(word.word)
+            if token_id is None:
+                token_id = table[word.word] = len(tokens)
+                tokens.append(word.word)
+            token_ids[i] = token_id
+
+        return cls(starts, ends, token_ids, tokens)
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+    def words(self) -> np.ndarray:
+        """Raw word strings in order, as an object array."""
+        return np.asarray(self.tokens, dtype=object)[self.token_ids]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form, e.g. for run state checkpointed to the run queue."""
+        return {
+            "starts": self.starts.tolist(),
+            "ends": self.ends.tolist(),
+            "token_ids": self.token_ids.tolist(),
+            "tokens": list(self.tokens),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WordTimings":
+        return cls(data["starts"], data["ends"], data["token_ids"], data["tokens"])
+
+
+def _token_table_lookups(tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    stripped = [token.strip() for token in tokens]
+    # `"" in PUNCTUATION_BREAKS` is True, matching the original `.strip()[-1:]` check.
+    is_break = np.fromiter((s[-1:] in PUNCTUATION_BREAKS for s in stripped), dtype=bool, count=len(stripped))
+    lengths = np.fromiter((len(token) for token in tokens), dtype=np.int64, count=len(tokens))
+    return is_break, lengths
+
+
+def segment_word_timings(
+    timings: WordTimings,
+    max_words: int = 15,
+    min_pause: float = 0.5,
+    max_chars: Optional[int] = None,
+    max_duration: Optional[float] = None,
+) -> List[Tuple[float, float, str]]:
+    """
+    Group words into subtitle lines.
+
+    A new line starts after a pause longer than `min_pause`, after a word ending in
+    punctuation, or when the line would exceed `max_words`, `max_chars` or `max_duration`.
+    Break candidates and the furthest allowed line end for every word are computed
+    with array ops (`searchsorted` over cumulative sums), leaving one step per line.
+    """
+    n = len(timings)
+    if n == 0:
+        return []
+
+    starts, ends = timings.starts, timings.ends
+    is_break_table, length_table = _token_table_lookups(timings.tokens)
+
+    hard_break = np.empty(n, dtype=bool)
+    hard_break[0] = True
+    hard_break[1:] = (starts[1:] - ends[:-1] > min_pause) | is_break_table[timings.token_ids[:-1]]
+    hard_starts = np.flatnonzero(hard_break)
+
+    if max_chars is None and max_duration is None:
+        # Only the word count limits a line: every max_words-th word of a hard segment starts one.
+        positions = np.arange(n)
+        segment_start = hard_starts[np.searchsorted(hard_starts, positions, side="right") - 1]
+        line_starts = np.flatnonzero((positions - segment_start) % max_words == 0)
+        line_ends = np.append(line_starts[1:], n)
+    else:
+        positions = np.arange(n)
+        next_hard = np.append(hard_starts[1:], n)[np.searchsorted(hard_starts, positions, side="right") - 1]
+        stops = np.minimum(next_hard, positions + max_words)
+        if max_chars is not None:
+            # Every word takes its raw length plus one joining space, an upper bound on the rendered line.
+            cum_chars = np.concatenate(([0], np.cumsum(length_table[timings.token_ids] + 1)))
+            stops = np.minimum(stops, np.searchsorted(cum_chars, cum_chars[:-1] + max_chars + 1, side="right") - 1)
+        if max_duration is not None:
+            stops = np.minimum(stops, np.searchsorted(np.maximum.accumulate(ends), starts + max_duration, side="right"))
+        stops = np.maximum(stops, positions + 1).tolist()
+
+        # Greedy lines only depend on where the previous one stopped, so follow the precomputed stops.
+        line_starts_list: List[int] = []
+        s = 0
+        while s < n:
+            line_starts_list.append(s)
+            s = stops[s]
+
+        line_starts = np.asarray(line_starts_list, dtype=np.int64)
+        line_ends = np.append(line_starts[1:], n)
+
+    words = timings.words().tolist()
+    line_start_times = starts[line_starts].tolist()
+    line_end_times = ends[line_ends - 1].tolist()
+
+    return [
+        (start, end, " ".join(words[a:b]).strip())
+        for start, end, a, b in zip(line_start_times, line_end_times, line_starts.tolist(), line_ends.tolist())
+    ]
+
+
+def word_by_word_timings(timings: WordTimings) -> List[Tuple[float, float, str]]:
+    """One subtitle entry per non-empty word."""
+    if len(timings) == 0:
+        return []
+
+    stripped = np.asarray([token.strip() for token in timings.tokens], dtype=object)
+    words = stripped[timings.token_ids]
+    keep = np.flatnonzero(np.asarray([bool(s) for s in stripped], dtype=bool)[timings.token_ids])
+
+    return list(zip(timings.starts[keep].tolist(), timings.ends[keep].tolist(), words[keep].tolist()))
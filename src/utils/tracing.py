@@ -0,0 +1,82 @@
+import os
+import inspect
+import logging
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from opentelemetry import trace
+
+from src.core.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("content_automation")
+
+_configured = False
+
+
+def configure_tracing(settings: Settings) -> None:
+    """
+    Install the SDK tracer provider once per process. TRACING_EXPORTER picks where spans
+    go: "file" writes one JSON span per line to TRACING_FILE, "otlp" sends them to an
+    OTLP/HTTP collector, "none" keeps the API's no-op tracer.
+    """
+    global _configured
+    if _configured or settings.TRACING_EXPORTER == "none":
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if settings.TRACING_EXPORTER == "file":
+        os.makedirs(os.path.dirname(settings.TRACING_FILE) or ".", exist_ok=True)
+        exporter = ConsoleSpanExporter(
+            out=open(settings.TRACING_FILE, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    elif settings.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter(endpoint=settings.OTLP_ENDPOINT)
+    else:
+        raise ValueError(f"Unsupported tracing exporter: {settings.TRACING_EXPORTER}")
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "content-automation"}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _configured = True
+    logger.info(f"Tracing spans exported via {settings.TRACING_EXPORTER}")
+
+
+@contextmanager
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[trace.Span]:
+    with tracer.start_as_current_span(name, attributes={k: v for k, v in (attributes or {}).items() if v is not None}) as span:
+        yield span
+
+
+def set_attributes(attributes: Dict[str, Any]) -> None:
+    """Annotate the current span; values that are None are skipped."""
+    span = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
+
+
+def trace_node(name: str, node: Callable) -> Callable:
+    """One span per node execution, tagged with the run id from the state."""
+    if inspect.iscoroutinefunction(node):
+        @wraps(node)
+        async def async_wrapper(state):
+            with start_span(f"node {name}", {"node": name, "run_id": state.get("run_id")}):
+                return await node(state)
+
+        return async_wrapper
+
+    @wraps(node)
+    def wrapper(state):
+        with start_span(f"node {name}", {"node": name, "run_id": state.get("run_id")}):
+            return node(state)
+
+    return wrapper
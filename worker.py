@@ -0,0 +1,54 @@
+"""
+Pipeline worker: claims runs from the run queue (RUN_QUEUE_PATH) and executes them.
+
+Start as many as the machines allow; each serves the stage pools it is given, so e.g.
+`--pools cpu` workers on CPU-heavy nodes take every `get_subtitles` while `--pools default`
+workers elsewhere run the rest of the graph (see STAGE_POOLS).
+
+Usage: python worker.py [--pools default cpu] [--concurrency 1]
+"""
+import signal
+import asyncio
+import argparse
+import logging
+
+from src.core.services import get_services
+from src.core.worker import Worker
+from src.services.run_queue import DEFAULT_POOL
+from src.utils.tracing import configure_tracing
+
+
+async def main(pools, concurrency: int) -> None:
+    services = get_services()
+    settings = services.settings
+    configure_tracing(settings)
+
+    pools = pools or settings.WORKER_POOLS
+    worker = Worker(
+        services,
+        services.run_queue,
+        pools=pools,
+        concurrency=concurrency or settings.WORKER_CONCURRENCY,
+        poll_seconds=settings.RUN_QUEUE_POLL_SECONDS,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    await asyncio.to_thread(services.warm_up, settings.STAGE_POOLS.get("get_subtitles", DEFAULT_POOL) in pools)
+    janitor = asyncio.create_task(services.workspaces.janitor(settings.WORKSPACE_JANITOR_INTERVAL_SECONDS))
+    try:
+        await worker.run()
+    finally:
+        janitor.cancel()
+        services.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pools", nargs="+", help="Stage pools to serve (default: WORKER_POOLS)")
+    parser.add_argument("--concurrency", type=int, help="Runs executed at once (default: WORKER_CONCURRENCY)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(args.pools, args.concurrency))